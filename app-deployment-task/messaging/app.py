@@ -1,7 +1,8 @@
 import os
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from task import send_email  # Import Celery task
+from log_reader import LogCache, LogQuery, LogQueryError, stream_logs
 from datetime import datetime
 
 app = Flask(__name__)
@@ -17,6 +18,9 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Repeated /logs polls are answered from here until the log file changes size
+log_cache = LogCache()
+
 @app.route("/sendmail")
 def send_email_route():
     """Handles email sending requests via Celery."""
@@ -60,16 +64,31 @@ def talktome():
 
 @app.route("/logs")
 def get_logs():
-    """Retrieves the last 100 lines of application logs."""
+    """
+    Retrieves application log lines, the last 100 by default.
+
+    Query parameters:
+        lines: how many lines (default 100)
+        before / after: byte-offset cursor from an earlier response, to page back or forward
+        level: lowest level shown, e.g. WARNING
+        since / until: time range, e.g. 2025-03-13 14:00:00
+        stream: 1 to stream NDJSON, one line per log line, instead of one JSON document
+    """
+    stream = request.args.get("stream") in ("1", "true")
     try:
-        with open(LOG_FILE_PATH, "r") as log_file:
-            # Read last 100 lines to prevent overwhelming response
-            logs = log_file.readlines()[-100:]
+        query = LogQuery(request.args, stream)
+    except LogQueryError as e:
         return jsonify({
-            "status": "success",
-            "total_log_lines": len(logs),
-            "logs": logs
-        }), 200
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    try:
+        if stream:
+            os.stat(LOG_FILE_PATH)  # Report a missing file before the response starts
+            return Response(stream_with_context(stream_logs(LOG_FILE_PATH, query)),
+                            mimetype="application/x-ndjson")
+        return jsonify(log_cache.get_logs(LOG_FILE_PATH, query)), 200
     except FileNotFoundError:
         logging.error("Log file not found when accessing /logs")
         return jsonify({
@@ -90,7 +109,7 @@ def home():
         "endpoints": {
             "/sendmail": "Send an email (use ?sendmail=your_email)",
             "/talktome": "Log current time",
-            "/logs": "View application logs"
+            "/logs": "View application logs (?lines=, ?before= / ?after= cursors, ?level=, ?since= / ?until=, ?stream=1)"
         }
     }), 200
 
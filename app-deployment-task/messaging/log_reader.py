@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# Log lines are read in blocks of this size, backwards from the end of the file
+BLOCK_SIZE = 64 * 1024
+DEFAULT_LINES = 100
+MAX_LINES = 10000  # Per JSON response
+MAX_STREAM_LINES = 1000000  # Per streamed response
+CACHE_ENTRIES = 32
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# "%(asctime)s - %(levelname)s - %(message)s", e.g. "2025-03-13 14:30:21,123 - INFO - ..."
+LOG_LINE = re.compile(rb"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d+ - ([A-Z]+) - ")
+
+class LogQueryError(ValueError):
+    """Raised for a /logs request with invalid parameters; the message is meant for the client."""
+
+def parse_time(value, name):
+    """Turn "2025-03-13", "2025-03-13 14:30" or ISO 8601 into the log's "YYYY-MM-DD HH:MM:SS"."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace("T", " ")).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise LogQueryError(f"{name} must be a date or time like 2025-03-13 14:30:00")
+
+def parse_offset(value, name):
+    """Parse a byte-offset cursor."""
+    if value is None or value == "":
+        return None
+    if not value.isdigit():
+        raise LogQueryError(f"{name} must be a byte offset from an earlier response's cursor")
+    return int(value)
+
+class LogQuery:
+    """What a /logs request asks for: how many lines, where, and which ones."""
+
+    def __init__(self, args, stream=False):
+        """Read the query from request.args; raises LogQueryError if it doesn't make sense."""
+        limit = MAX_STREAM_LINES if stream else MAX_LINES
+        lines = args.get("lines", str(DEFAULT_LINES))
+        if not lines.isdigit() or not 1 <= int(lines) <= limit:
+            raise LogQueryError(f"lines must be between 1 and {limit}")
+        self.lines = int(lines)
+
+        self.before = parse_offset(args.get("before"), "before")
+        self.after = parse_offset(args.get("after"), "after")
+        if self.before is not None and self.after is not None:
+            raise LogQueryError("Use either before or after, not both")
+
+        level = args.get("level", "").upper()
+        if level and level not in LEVELS:
+            raise LogQueryError(f"level must be one of {', '.join(LEVELS)}")
+        self.level = LEVELS.get(level)
+        self.since = parse_time(args.get("since"), "since")
+        self.until = parse_time(args.get("until"), "until")
+        self.filtered = bool(self.level or self.since or self.until)
+
+    def key(self):
+        """Hashable form of the query, for the response cache."""
+        return (self.lines, self.before, self.after, self.level, self.since, self.until)
+
+    def matches(self, line):
+        """Whether a line passes the level and time filters."""
+        if not self.filtered:
+            return True
+        header = LOG_LINE.match(line)
+        if not header:
+            return False  # Continuation lines (e.g. tracebacks) have no level or time
+        stamp = header.group(1).decode("ascii")
+        if self.since and stamp < self.since:
+            return False
+        if self.until and stamp > self.until:
+            return False
+        return not self.level or LEVELS.get(header.group(2).decode("ascii"), 0) >= self.level
+
+    def too_old(self, line):
+        """Whether a line (and so everything before it) is older than `since`."""
+        stamp = self.since and line_time(line)
+        return bool(stamp) and stamp < self.since
+
+    def too_new(self, line):
+        """Whether a line (and so everything after it) is newer than `until`."""
+        stamp = self.until and line_time(line)
+        return bool(stamp) and stamp > self.until
+
+def lines_backward(log_file, end, block_size=BLOCK_SIZE):
+    """Yield (offset, line) for each line ending before byte `end`, newest first, reading fixed-size blocks."""
+    position = end
+    pending = b""  # Start of the newest line not yet yielded (its beginning isn't read yet)
+    first = True
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        log_file.seek(position)
+        pieces = (log_file.read(size) + pending).split(b"\n")
+        if first and pieces[-1] == b"":
+            pieces.pop()  # The file ends with a newline
+        first = False
+        offsets = [position]
+        for piece in pieces[:-1]:
+            offsets.append(offsets[-1] + len(piece) + 1)
+        # pieces[0] may continue in the previous block; the rest are whole lines
+        for index in range(len(pieces) - 1, 0, -1):
+            yield offsets[index], pieces[index] + b"\n"
+        pending = pieces[0]
+    if pending:
+        yield 0, pending + b"\n"
+
+def lines_forward(log_file, start, end):
+    """Yield (offset, line) for each line from byte `start` up to byte `end`."""
+    log_file.seek(start)
+    offset = start
+    while offset < end:
+        line = log_file.readline(end - offset)
+        if not line:
+            break
+        yield offset, line
+        offset += len(line)
+
+def line_time(line):
+    """Timestamp of a log line as "YYYY-MM-DD HH:MM:SS", or None for continuation lines."""
+    header = LOG_LINE.match(line)
+    return header.group(1).decode("ascii") if header else None
+
+def seek_time(log_file, stamp, size, inclusive=True):
+    """Byte offset of the first line logged at `stamp` or later (later only, if not inclusive), by binary search."""
+    def before_target(line_stamp):
+        return line_stamp < stamp if inclusive else line_stamp <= stamp
+
+    def first_stamp(position):
+        # Skip the line `position` falls in, then any continuation lines
+        log_file.seek(position)
+        log_file.readline()
+        for line in iter(log_file.readline, b""):
+            line_stamp = line_time(line)
+            if line_stamp:
+                return line_stamp
+        return None
+
+    low, high = 0, size
+    while high - low > BLOCK_SIZE:
+        middle = (low + high) // 2
+        line_stamp = first_stamp(middle)
+        if line_stamp is not None and before_target(line_stamp):
+            low = middle
+        else:
+            high = middle
+
+    log_file.seek(low)
+    if low:
+        low += len(log_file.readline())
+    for offset, line in lines_forward(log_file, low, size):
+        line_stamp = line_time(line)
+        if line_stamp and not before_target(line_stamp):
+            return offset
+    return size
+
+def find_range(log_file, query, size):
+    """Find the byte range [start, end) holding the lines a query asks for, without keeping any of them."""
+    if query.after is not None:
+        # Past the end means the log was rotated or truncated, so start over
+        start = query.after if query.after <= size else 0
+        if query.since:
+            start = max(start, seek_time(log_file, query.since, size))
+        end, found = start, 0
+        for offset, line in lines_forward(log_file, start, size):
+            if query.too_new(line):
+                break
+            end = offset + len(line)
+            if query.matches(line):
+                found += 1
+                if found == query.lines:
+                    break
+        return start, end
+
+    end = size if query.before is None else min(query.before, size)
+    if query.until:
+        end = min(end, seek_time(log_file, query.until, size, inclusive=False))
+    start, found = end, 0
+    for offset, line in lines_backward(log_file, end):
+        if query.too_old(line):
+            break
+        start = offset
+        if query.matches(line):
+            found += 1
+            if found == query.lines:
+                break
+    return start, end
+
+def read_logs(path, query, size=None):
+    """Return the lines a query asks for, oldest first, with cursors for the next pages."""
+    with open(path, "rb") as log_file:
+        size = os.fstat(log_file.fileno()).st_size if size is None else size
+        start, end = find_range(log_file, query, size)
+        logs = [line.decode("utf-8", "replace") for _, line in lines_forward(log_file, start, end)
+                if query.matches(line)]
+    return {
+        "status": "success",
+        "total_log_lines": len(logs),
+        "logs": logs,
+        "cursor": {"before": start, "after": end},
+        "file_size": size
+    }
+
+def stream_logs(path, query):
+    """Yield the lines a query asks for as NDJSON, oldest first, ending with a cursor line."""
+    with open(path, "rb") as log_file:
+        size = os.fstat(log_file.fileno()).st_size
+        start, end = find_range(log_file, query, size)
+        count = 0
+        for offset, line in lines_forward(log_file, start, end):
+            if query.matches(line):
+                count += 1
+                yield json.dumps({"offset": offset, "line": line.decode("utf-8", "replace")}) + "\n"
+    yield json.dumps({"total_log_lines": count, "cursor": {"before": start, "after": end},
+                      "file_size": size}) + "\n"
+
+class LogCache:
+    """Recent /logs responses, keyed on the log file's identity and size, so repeated polls skip reading it."""
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_logs(self, path, query):
+        """Return read_logs(path, query), from the cache while the file hasn't changed size."""
+        status = os.stat(path)
+        key = (status.st_dev, status.st_ino, status.st_size) + query.key()
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+
+        body = read_logs(path, query, status.st_size)
+        with self.lock:
+            self.entries[key] = body
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return body
@@ -0,0 +1,193 @@
+import os
+import time
+import smtplib
+import logging
+import threading
+from contextlib import contextmanager
+
+# Connections are replaced after this many messages or seconds, whichever comes first
+MAX_MESSAGES = 100
+MAX_AGE = 300
+# A connection idle longer than this is checked with NOOP before it's used again
+CHECK_IDLE = 5
+CONNECT_TIMEOUT = 30
+
+def is_connection_error(error):
+    """Whether an error means the connection itself can't be trusted any more."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421  # Service closing the connection
+    # Socket errors; SMTPException is an OSError too, but the others leave the session usable
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+class PooledConnection:
+    """An authenticated SMTP session and what the pool needs to know about it."""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.messages = 0
+        self.broken = False
+
+class SMTPPool:
+    """
+    Keeps authenticated SMTP sessions open between tasks.
+
+    Each worker process gets its own connections (they're dropped after a fork), so
+    the TLS handshake, EHLO and LOGIN happen once per connection instead of once per
+    email. A connection idle for more than `check_idle` seconds is checked with NOOP
+    before use, a broken one is replaced, and every connection is closed and replaced
+    after `max_messages` emails or `max_age` seconds.
+    """
+
+    def __init__(self, host, port, user=None, password=None, use_ssl=True,
+                 max_messages=MAX_MESSAGES, max_age=MAX_AGE, check_idle=CHECK_IDLE,
+                 timeout=CONNECT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.check_idle = check_idle
+        self.timeout = timeout
+        self.idle = []  # Most recently used last
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.stats = {"connects": 0, "reuses": 0, "recycled": 0, "failed_checks": 0}
+
+    @classmethod
+    def from_env(cls, user=None, password=None):
+        """Create a pool configured by the SMTP_* environment variables."""
+        return cls(
+            host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "465")),
+            user=user,
+            password=password,
+            use_ssl=os.getenv("SMTP_SSL", "1").lower() not in ("0", "false", "no"),
+            max_messages=int(os.getenv("SMTP_MAX_MESSAGES", str(MAX_MESSAGES))),
+            max_age=float(os.getenv("SMTP_MAX_AGE", str(MAX_AGE))),
+            check_idle=float(os.getenv("SMTP_CHECK_IDLE", str(CHECK_IDLE)))
+        )
+
+    def connect(self):
+        """Open and log in a new session."""
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if not self.use_ssl and smtp.has_extn("starttls"):
+                smtp.starttls()
+                smtp.ehlo()
+            # A local sink without AUTH needs no login
+            if self.user and smtp.has_extn("auth"):
+                smtp.login(self.user, self.password)
+        except BaseException:
+            self.discard(PooledConnection(smtp), quit=False)
+            raise
+        self.stats["connects"] += 1
+        logging.info(f"SMTP connection opened to {self.host}:{self.port} (pid {os.getpid()})")
+        return PooledConnection(smtp)
+
+    def worn_out(self, connection, now):
+        """Whether a connection has sent enough messages or lived long enough to be replaced."""
+        return connection.messages >= self.max_messages or now - connection.created >= self.max_age
+
+    def healthy(self, connection):
+        """Whether an idle connection is still worth using, checking it with NOOP if it's been idle a while."""
+        now = time.monotonic()
+        if self.worn_out(connection, now):
+            self.stats["recycled"] += 1
+            return False
+        if now - connection.last_used < self.check_idle:
+            return True
+        try:
+            if connection.smtp.noop()[0] == 250:
+                return True
+        except Exception:
+            pass
+        connection.broken = True
+        self.stats["failed_checks"] += 1
+        return False
+
+    def acquire(self):
+        """Take a healthy connection from the pool, or open a new one."""
+        while True:
+            with self.lock:
+                if self.pid != os.getpid():
+                    # Forked: the parent's sockets aren't ours to use or to close cleanly
+                    self.idle = []
+                    self.pid = os.getpid()
+                if not self.idle:
+                    break
+                connection = self.idle.pop()
+            if self.healthy(connection):
+                self.stats["reuses"] += 1
+                return connection
+            self.discard(connection, quit=not connection.broken)
+        return self.connect()
+
+    def release(self, connection):
+        """Give a connection back, or close it if it has done its share."""
+        connection.last_used = time.monotonic()
+        if self.worn_out(connection, connection.last_used):
+            self.stats["recycled"] += 1
+            self.discard(connection)
+            return
+        with self.lock:
+            self.idle.append(connection)
+
+    def discard(self, connection, quit=True):
+        """Close a connection, politely if it's still answering."""
+        try:
+            if quit:
+                connection.smtp.quit()
+            else:
+                connection.smtp.close()
+        except OSError:  # Includes SMTPException
+            connection.smtp.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for a `with` block; it's dropped if the block fails on the connection."""
+        connection = self.acquire()
+        try:
+            yield connection.smtp
+        except Exception as error:
+            if is_connection_error(error):
+                self.discard(connection, quit=False)
+                raise
+            # The server refused something (e.g. a recipient); the session is fine once reset
+            try:
+                connection.smtp.rset()
+            except Exception:
+                self.discard(connection, quit=False)
+                raise error
+            self.release(connection)
+            raise
+        else:
+            connection.messages += 1
+            self.release(connection)
+
+    def send_message(self, msg):
+        """Send a message over a pooled connection, reconnecting once if the connection was lost."""
+        for attempt in range(2):
+            try:
+                with self.connection() as smtp:
+                    return smtp.send_message(msg)
+            except Exception as error:
+                if attempt or not is_connection_error(error):
+                    raise
+                logging.warning(f"SMTP connection to {self.host}:{self.port} lost, reconnecting")
+
+    def close(self):
+        """Close every idle connection (e.g. when the worker process shuts down)."""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            self.discard(connection)
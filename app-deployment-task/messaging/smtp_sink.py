@@ -0,0 +1,97 @@
+import argparse
+import threading
+import socketserver
+
+# A local SMTP server that accepts every message and throws it away, for testing the
+# email task without sending real mail:
+#
+#   python smtp_sink.py --port 1025
+#   SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_SSL=0 celery -A task worker --loglevel=info
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP (EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT) to accept mail."""
+
+    # Replies are small writes; don't let Nagle hold them back
+    disable_nagle_algorithm = True
+
+    def reply(self, text):
+        self.wfile.write(text.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.server.count("connections")
+        self.reply("220 smtp-sink ready")
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-smtp-sink")
+                if self.server.auth:
+                    self.reply("250-AUTH PLAIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 smtp-sink")
+            elif verb == "AUTH":
+                self.server.count("logins")
+                self.reply("235 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET"):
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.server.count("noops")
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                self.server.count("messages")
+                self.reply("250 OK: queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    """Threaded SMTP sink that counts connections, logins, NOOPs and messages."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, host="127.0.0.1", auth=True):
+        super().__init__((host, port), SinkHandler)
+        self.auth = auth
+        self.stats = {"connections": 0, "logins": 0, "noops": 0, "messages": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve on a daemon thread (for use from scripts)."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP server that accepts and discards mail")
+    parser.add_argument("--port", type=int, default=1025, help="Port to listen on (default: 1025)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--no-auth", action="store_true", help="Don't offer AUTH (no login needed)")
+    args = parser.parse_args()
+
+    server = SinkServer(args.port, args.host, auth=not args.no_auth)
+    print(f"SMTP sink on {args.host}:{server.port} (press Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n{server.stats}")
+
+if __name__ == "__main__":
+    main()
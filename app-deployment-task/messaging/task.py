@@ -1,8 +1,9 @@
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from celery import Celery
+from celery.signals import worker_process_shutdown
+from smtp_pool import SMTPPool
 import logging
 
 # Load environment variables for email credentials
@@ -25,6 +26,16 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Logged-in SMTP connections reused across tasks, one set per worker process.
+# SMTP_HOST / SMTP_PORT / SMTP_SSL choose the server (default smtp.gmail.com:465 over SSL);
+# SMTP_MAX_MESSAGES / SMTP_MAX_AGE set when a connection is replaced.
+smtp_pool = SMTPPool.from_env(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
+
+@worker_process_shutdown.connect
+def close_smtp_connections(**kwargs):
+    """Say QUIT on the pooled connections when a worker process exits."""
+    smtp_pool.close()
+
 @celery.task(bind=True, max_retries=3)
 def send_email(self, to_email):
     """Send an email using SMTP via Celery with enhanced error handling."""
@@ -39,15 +50,8 @@ def send_email(self, to_email):
         body = f"Hello!\n\nThis is a test email sent to {to_email} via our messaging system.\n\nRegards,\nMessaging System"
         msg.attach(MIMEText(body, 'plain'))
 
-        # Establish secure connection
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.ehlo()
-            print("EHLO successful")
-            print(f"Attempting login with {EMAIL_HOST_USER}")
-            server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-            print("Login successful")
-            server.send_message(msg)
-            print("Message sent successfully")
+        # Send over a pooled, already logged-in connection (opened on first use)
+        smtp_pool.send_message(msg)
 
         logging.info(f"✅ Email successfully sent to {to_email}")
         return f"Email sent to {to_email}"
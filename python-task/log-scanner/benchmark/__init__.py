@@ -0,0 +1,7 @@
+"""
+Log File Error Scanner - Benchmarks
+
+Deterministic synthetic logs plus a harness that measures how fast, and with
+how much memory, each scanner engine gets through them. Run from the
+log-scanner directory with `python -m benchmark`.
+"""
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Benchmark Runner
+
+Generates (or reuses) synthetic logs, runs the benchmark cases on them and
+writes a JSON report. With --compare the report is checked against an earlier
+one and the exit status is 1 if any case got slower or bigger than allowed.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from log_formats import FORMATS
+from benchmark.generate import (DEFAULT_LEVEL_MIX, DEFAULT_SPAN_DAYS, ensure_log,
+                                parse_level_mix, parse_size)
+from benchmark.harness import CASES, compare_reports, run_benchmarks
+
+
+def print_result(result):
+    """Print one finished case as a table row."""
+    rss = f"{result['peak_rss_kb'] / 1024:,.0f}" if result["peak_rss_kb"] else "-"
+    print(f"{result['dataset']:<30} {result['case']:<20} {result['seconds']:>9.3f} "
+          f"{result['lines_per_sec'] or 0:>13,} {rss:>9} {result['result']:>10}", flush=True)
+
+
+def print_comparison(rows, threshold):
+    """Print the case-by-case ratios from compare_reports."""
+    print(f"\n{'dataset':<30} {'case':<20} {'time':>7} {'rss':>7}")
+    for dataset, case, time_ratio, rss_ratio, regressed in rows:
+        time_text = f"{time_ratio:.2f}x" if time_ratio else "-"
+        rss_text = f"{rss_ratio:.2f}x" if rss_ratio else "-"
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{dataset:<30} {case:<20} {time_text:>7} {rss_text:>7}{flag}")
+    if not rows:
+        print("No cases in common with the baseline")
+    print(f"(ratios are current / baseline; regression above {threshold:.0%})")
+
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the log scanners on synthetic logs")
+    parser.add_argument("--size", default="64M",
+                        help="Approximate size of each generated log, e.g. 64M or 2G (default: 64M)")
+    parser.add_argument("--formats", nargs="+", default=["simple"], choices=list(FORMATS),
+                        help="Line formats to generate one log each for (default: simple)")
+    parser.add_argument("--levels", default=",".join(f"{name}={weight}" for name, weight
+                                                     in DEFAULT_LEVEL_MIX.items()),
+                        help="Level mix as LEVEL=weight pairs (default: %(default)s)")
+    parser.add_argument("--span-days", type=float, default=DEFAULT_SPAN_DAYS,
+                        help="Days covered by each log (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "log-scanner-bench"),
+                        help="Where generated logs are kept and reused (default: %(default)s)")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), metavar="CASE",
+                        help="Cases to run (default: all; see --list)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per case, the fastest is reported (default: 3)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Compare with an earlier JSON report")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown or RSS growth treated as a regression (default: 0.10)")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, case in CASES.items():
+            print(f"{name:<20} {case.description}")
+        return 0
+
+    try:
+        size = parse_size(args.size)
+        level_mix = parse_level_mix(args.levels)
+        baseline = None
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        datasets = []
+        for log_format in args.formats:
+            print(f"Preparing {args.size} {log_format} log in {args.data_dir} ...", flush=True)
+            datasets.append(ensure_log(args.data_dir, size, level_mix, log_format,
+                                       args.span_days, args.seed))
+
+        print(f"\n{'dataset':<30} {'case':<20} {'seconds':>9} {'lines/s':>13} "
+              f"{'rss MiB':>9} {'result':>10}")
+        report = run_benchmarks(datasets, args.cases, args.repeat, progress=print_result)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 2
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if baseline is not None:
+        rows = compare_reports(baseline, report, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
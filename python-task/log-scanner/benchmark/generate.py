@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Synthetic Log Generator
+
+Writes deterministic synthetic logs for the benchmarks. The same size, level
+mix, date span, format and seed always give a byte-identical file, so results
+from different runs and machines are measured on the same data.
+"""
+
+import os
+import json
+import zlib
+import random
+from datetime import datetime, timedelta
+
+from log_formats import get_format
+
+# Share of lines per level when no mix is given
+DEFAULT_LEVEL_MIX = {"INFO": 85, "WARNING": 10, "ERROR": 5}
+
+DEFAULT_START = datetime(2025, 3, 1)
+DEFAULT_SPAN_DAYS = 7
+
+# Message shapes; the placeholders are filled with random values so the
+# templating in log_aggregate has real work to do
+MESSAGES = [
+    "Request {id} handled in {ms}ms",
+    "User {n} logged in from 10.0.{octet}.{octet2}",
+    "Cache miss for key session:{hex}",
+    "Memory usage at {pct}%",
+    "Disk usage at {pct}% on /dev/sda{digit}",
+    "Connection to db-{digit} reset after {ms}ms",
+    "Retrying job {id} (attempt {digit})",
+    "Payment {hex} failed with status {status}",
+]
+
+# Lines written per batch
+WRITE_BATCH = 10000
+
+# Suffix of the JSON file describing a generated log
+META_SUFFIX = ".meta.json"
+
+
+def parse_size(text):
+    """
+    Parse a size such as "512K", "64M" or "2G".
+
+    Args:
+        text (str): Number of bytes with an optional K, M or G suffix
+
+    Returns:
+        int: Size in bytes
+
+    Raises:
+        ValueError: If the size can't be parsed
+    """
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    number = text.strip().upper().rstrip("B")
+    try:
+        if number and number[-1] in units:
+            return int(float(number[:-1]) * units[number[-1]])
+        return int(number)
+    except ValueError:
+        raise ValueError(f"Invalid size: {text}. Use e.g. 512K, 64M or 2G.")
+
+
+def parse_level_mix(text):
+    """
+    Parse a level mix such as "INFO=85,WARNING=10,ERROR=5".
+
+    Args:
+        text (str): Comma separated LEVEL=weight pairs
+
+    Returns:
+        dict: Mapping of level name to relative weight
+
+    Raises:
+        ValueError: If a pair can't be parsed
+    """
+    mix = {}
+    for pair in text.split(","):
+        name, _, weight = pair.partition("=")
+        try:
+            mix[name.strip().upper()] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid level weight: {pair}. Use LEVEL=weight.")
+    return mix
+
+
+def _message(rng):
+    """Build one random message."""
+    return rng.choice(MESSAGES).format(
+        id=rng.randrange(10 ** 6), ms=rng.randrange(1, 5000), n=rng.randrange(10 ** 4),
+        octet=rng.randrange(256), octet2=rng.randrange(256), pct=rng.randrange(100),
+        digit=rng.randrange(10), hex=f"{rng.getrandbits(48):012x}",
+        status=rng.choice([402, 500, 502, 503]))
+
+
+def generate_log(path, size_bytes, level_mix=None, log_format="simple",
+                 start=DEFAULT_START, span=timedelta(days=DEFAULT_SPAN_DAYS), seed=0):
+    """
+    Write a synthetic log of roughly the given size.
+
+    Timestamps grow evenly from `start` to `start + span`, so the file is in
+    time order like a real log. A JSON description of the log (line count,
+    lines per level, time range) is written next to it as <path>.meta.json.
+
+    Args:
+        path (str): File to write
+        size_bytes (int): Approximate file size; writing stops at the first
+            line boundary past it
+        level_mix (dict, optional): Relative weight of each level name
+        log_format (str): Name of a registered format (see log_formats.FORMATS)
+        start (datetime): Timestamp of the first line
+        span (timedelta): Time covered by the whole file
+        seed (int): Random seed; equal arguments give identical files
+
+    Returns:
+        dict: The description written to the .meta.json file
+
+    Raises:
+        ValueError: If the format is unknown or the level mix is empty
+    """
+    writer = get_format(log_format)
+    level_mix = level_mix or DEFAULT_LEVEL_MIX
+    levels = [name for name, weight in level_mix.items() if weight > 0]
+    if not levels:
+        raise ValueError("The level mix needs at least one level with a positive weight")
+    weights = [level_mix[name] for name in levels]
+    rng = random.Random(seed)
+
+    # Estimate the line count up front so the timestamps spread over the span
+    sample = [writer.format_line(start, rng.choice(levels), _message(rng)) for _ in range(1000)]
+    expected_lines = max(1, size_bytes // (sum(len(line) + 1 for line in sample) // len(sample)))
+    step = span / expected_lines
+    rng.seed(seed)
+
+    written = 0
+    lines = 0
+    per_level = dict.fromkeys(levels, 0)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        while written < size_bytes:
+            batch = []
+            for level_name in rng.choices(levels, weights, k=WRITE_BATCH):
+                line = writer.format_line(start + step * lines, level_name, _message(rng))
+                batch.append(line)
+                per_level[level_name] += 1
+                lines += 1
+                written += len(line) + 1
+                if written >= size_bytes:
+                    break
+            f.write("\n".join(batch) + "\n")
+
+    meta = {
+        "path": os.path.abspath(path),
+        "format": log_format,
+        "seed": seed,
+        "size_bytes": os.path.getsize(path),
+        "lines": lines,
+        "levels": per_level,
+        "start": start.isoformat(),
+        "end": (start + step * max(0, lines - 1)).isoformat(),
+    }
+    with open(path + META_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def ensure_log(directory, size_bytes, level_mix=None, log_format="simple",
+               span_days=DEFAULT_SPAN_DAYS, seed=0):
+    """
+    Generate a synthetic log in a directory unless an identical one is there.
+
+    Args:
+        directory (str): Directory the log is kept in
+        size_bytes (int): Approximate file size
+        level_mix (dict, optional): Relative weight of each level name
+        log_format (str): Name of a registered format
+        span_days (float): Days covered by the whole file
+        seed (int): Random seed
+
+    Returns:
+        dict: Description of the log, including its path
+    """
+    level_mix = level_mix or DEFAULT_LEVEL_MIX
+    # Short file name that still changes with every generation parameter
+    params = json.dumps([sorted(level_mix.items()), span_days, seed])
+    name = f"{log_format}-{size_bytes}-{zlib.crc32(params.encode()):08x}.log"
+    path = os.path.join(directory, name)
+
+    try:
+        with open(path + META_SUFFIX, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta["size_bytes"] == os.path.getsize(path):
+            meta["path"] = os.path.abspath(path)
+            return meta
+    except (OSError, ValueError, KeyError):
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    return generate_log(path, size_bytes, level_mix, log_format,
+                        span=timedelta(days=span_days), seed=seed)
+
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Benchmark Harness
+
+Every benchmark case runs in a fresh Python process so its peak RSS is its own
+and not left over from earlier cases. The child process times only the scan
+itself (not interpreter start-up) and reports wall time, peak RSS and a result
+count as one line of JSON. The result count lets runs of different engines on
+the same log be checked against each other.
+
+Run a single case directly with:
+
+    python -m benchmark.harness CASE LOG_FILE [--query-date YYYY-MM-DD]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Directory holding the scanner modules; child processes run from here
+SCANNER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {}
+
+
+def register_case(name, description):
+    """
+    Decorator adding a function to the benchmark cases.
+
+    The function takes the log path and the day used by date-range queries,
+    and returns an int to compare across engines (usually the ERROR count).
+    It may return (result, seconds) to time only part of its work.
+
+    Args:
+        name (str): Unique case name
+        description (str): One line shown in the case list
+
+    Returns:
+        callable: Decorator returning the function unchanged
+    """
+    def decorator(function):
+        function.description = description
+        CASES[name] = function
+        return function
+    return decorator
+
+
+@register_case("basic-text", "log_scanner_basic.count_errors, text engine")
+def _basic_text(path, query_day):
+    from log_scanner_basic import count_errors
+    return count_errors(path, engine="text")
+
+
+@register_case("basic-mmap", "log_scanner_basic.count_errors, mmap engine")
+def _basic_mmap(path, query_day):
+    from log_scanner_basic import count_errors
+    return count_errors(path, engine="mmap")
+
+
+@register_case("basic-mmap-parallel", "count_errors, mmap engine, one process per core")
+def _basic_mmap_parallel(path, query_day):
+    from log_scanner_basic import count_errors
+    return count_errors(path, workers=0, engine="mmap")
+
+
+@register_case("analyzer-load", "LogAnalyzer loading every entry into the columnar store")
+def _analyzer_load(path, query_day):
+    from log_scanner_advance import LogAnalyzer, LogLevel
+    return LogAnalyzer(path).count_levels()[LogLevel.ERROR]
+
+
+@register_case("analyzer-stream", "LogAnalyzer.count_levels, streaming")
+def _analyzer_stream(path, query_day):
+    from log_scanner_advance import LogAnalyzer, LogLevel
+    return LogAnalyzer(path, streaming=True).count_levels()[LogLevel.ERROR]
+
+
+@register_case("analyzer-parallel", "LogAnalyzer.count_levels, streaming, one process per core")
+def _analyzer_parallel(path, query_day):
+    from log_scanner_advance import LogAnalyzer, LogLevel
+    return LogAnalyzer(path, streaming=True, workers=0).count_levels()[LogLevel.ERROR]
+
+
+@register_case("analyzer-index", "one-day query through a prebuilt sidecar index")
+def _analyzer_index(path, query_day):
+    from log_scanner_advance import LogAnalyzer
+    analyzer = LogAnalyzer(path, streaming=True, use_index=True)
+    # Build or refresh the index outside the timed part
+    analyzer.count_levels()
+    began = time.perf_counter()
+    matched = sum(1 for _ in analyzer.query(start_date=query_day, end_date=query_day))
+    return matched, time.perf_counter() - began
+
+
+@register_case("analyzer-aggregate", "LogAnalyzer.aggregate, per-minute histogram and templates")
+def _analyzer_aggregate(path, query_day):
+    from log_scanner_advance import LogAnalyzer
+    return LogAnalyzer(path, streaming=True).aggregate(bucket_seconds=60).total
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process and of its finished children.
+
+    Returns:
+        tuple: (own peak in KiB, largest child peak in KiB), or (None, None)
+            where the resource module isn't available
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KiB on Linux but in bytes on macOS
+    scale = 1024 if sys.platform == "darwin" else 1
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return own, children
+
+
+def run_case_here(name, path, query_day):
+    """
+    Run one case in this process.
+
+    Args:
+        name (str): Case name
+        path (str): Log file to scan
+        query_day (datetime): Day used by date-range queries
+
+    Returns:
+        dict: result, seconds, peak_rss_kb and children_peak_rss_kb
+    """
+    began = time.perf_counter()
+    outcome = CASES[name](path, query_day)
+    seconds = time.perf_counter() - began
+    if isinstance(outcome, tuple):
+        outcome, seconds = outcome
+
+    own, children = peak_rss_kb()
+    return {"result": outcome, "seconds": seconds,
+            "peak_rss_kb": own, "children_peak_rss_kb": children}
+
+
+def run_case(name, path, query_day, repeat=3):
+    """
+    Run one case in fresh processes and keep the fastest run.
+
+    Args:
+        name (str): Case name
+        path (str): Log file to scan
+        query_day (datetime): Day used by date-range queries
+        repeat (int): Number of runs
+
+    Returns:
+        dict: Fastest run's result and seconds, plus the highest peak RSS
+            over all runs
+
+    Raises:
+        RuntimeError: If a run fails or the runs disagree on the result
+    """
+    command = [sys.executable, "-m", "benchmark.harness", name, os.path.abspath(path),
+               "--query-date", f"{query_day:%Y-%m-%d}"]
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run(command, cwd=SCANNER_DIR, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise RuntimeError(f"{name} failed: {process.stderr.strip()}")
+        runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    if len({run["result"] for run in runs}) > 1:
+        raise RuntimeError(f"{name} gave different results across runs")
+
+    best = min(runs, key=lambda run: run["seconds"])
+    rss = [run["peak_rss_kb"] for run in runs if run["peak_rss_kb"] is not None]
+    child_rss = [run["children_peak_rss_kb"] for run in runs
+                 if run["children_peak_rss_kb"] is not None]
+    return {
+        "result": best["result"],
+        "seconds": best["seconds"],
+        "peak_rss_kb": max(rss) if rss else None,
+        "children_peak_rss_kb": max(child_rss) if child_rss else None,
+    }
+
+
+def run_benchmarks(datasets, case_names=None, repeat=3, progress=None):
+    """
+    Run cases against generated logs.
+
+    Args:
+        datasets (list): Log descriptions from generate.ensure_log
+        case_names (list, optional): Cases to run; all of them if None
+        repeat (int): Runs per case; the fastest is reported
+        progress (callable, optional): Called with each finished result
+
+    Returns:
+        dict: Machine-readable report with the environment, the datasets and
+            one result per (dataset, case)
+    """
+    case_names = case_names or list(CASES)
+    results = []
+
+    for meta in datasets:
+        start = datetime.fromisoformat(meta["start"])
+        end = datetime.fromisoformat(meta["end"])
+        query_day = datetime.combine((start + (end - start) / 2).date(), datetime.min.time())
+
+        for name in case_names:
+            run = run_case(name, meta["path"], query_day, repeat)
+            result = {
+                "dataset": os.path.basename(meta["path"]),
+                "case": name,
+                "result": run["result"],
+                "seconds": round(run["seconds"], 4),
+                "lines_per_sec": round(meta["lines"] / run["seconds"]) if run["seconds"] else None,
+                "mb_per_sec": round(meta["size_bytes"] / 1048576 / run["seconds"], 1)
+                if run["seconds"] else None,
+                "peak_rss_kb": run["peak_rss_kb"],
+                "children_peak_rss_kb": run["children_peak_rss_kb"],
+            }
+            results.append(result)
+            if progress:
+                progress(result)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "datasets": datasets,
+        "results": results,
+    }
+
+
+def compare_reports(baseline, current, threshold=0.10):
+    """
+    Compare two reports case by case.
+
+    Args:
+        baseline (dict): Earlier report from run_benchmarks
+        current (dict): Newer report from run_benchmarks
+        threshold (float): Relative slowdown or RSS growth counted as a
+            regression (0.10 = 10%)
+
+    Returns:
+        list: (dataset, case, seconds ratio, RSS ratio, regressed) tuples for
+            every case present in both reports; ratios are current / baseline
+    """
+    earlier = {(result["dataset"], result["case"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = earlier.get((result["dataset"], result["case"]))
+        if old is None:
+            continue
+        time_ratio = result["seconds"] / old["seconds"] if old["seconds"] else None
+        rss_ratio = (result["peak_rss_kb"] / old["peak_rss_kb"]
+                     if result["peak_rss_kb"] and old["peak_rss_kb"] else None)
+        regressed = any(ratio is not None and ratio > 1 + threshold
+                        for ratio in (time_ratio, rss_ratio))
+        rows.append((result["dataset"], result["case"], time_ratio, rss_ratio, regressed))
+    return rows
+
+
+def main():
+    """
+    Run one case in this process and print its measurements as JSON.
+    """
+    parser = argparse.ArgumentParser(description="Run a single benchmark case")
+    parser.add_argument("case", choices=list(CASES))
+    parser.add_argument("log_file")
+    parser.add_argument("--query-date", help="Day for date-range queries (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    query_day = datetime.strptime(args.query_date, "%Y-%m-%d") if args.query_date else None
+    # The parent reads the last line, after anything the scanner printed
+    print(json.dumps(run_case_here(args.case, args.log_file, query_day)))
+
+
+if __name__ == "__main__":
+    main()
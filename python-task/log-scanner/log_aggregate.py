@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Aggregations
+
+Bounded-memory summaries built in a single pass over log entries:
+
+- TimeHistogram counts entries per level in fixed time buckets
+  ("errors per minute"), keeping at most a fixed number of buckets.
+- template_message masks the variable parts of a message (numbers, IDs,
+  percentages, addresses) so similar messages group together.
+- SpaceSaving tracks the most frequent templates with the space-saving
+  heavy-hitters algorithm in a fixed number of counters.
+
+LogAggregator ties the three together. Its memory use depends on the bucket
+and counter limits, never on the number of lines fed to it.
+"""
+
+import re
+import heapq
+from datetime import timedelta
+
+from log_index import EPOCH, to_epoch
+
+# Default number of time buckets kept before the oldest ones are dropped
+MAX_BUCKETS = 100000
+
+# Default number of message templates tracked per level
+TOP_CAPACITY = 1000
+
+# Variable parts of a message, most specific first
+TEMPLATE_RULES = [
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"), "<email>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b(?:0x)?[0-9a-fA-F]*\d[0-9a-fA-F]*[a-fA-F][0-9a-fA-F]*\b|"
+                r"\b(?:0x)?[0-9a-fA-F]*[a-fA-F][0-9a-fA-F]*\d[0-9a-fA-F]*\b"), "<id>"),
+    (re.compile(r"[-+]?\d+(?:\.\d+)?%"), "<pct>"),
+    (re.compile(r"[-+]?\b\d+(?:\.\d+)?"), "<num>"),
+]
+
+
+def template_message(message):
+    """
+    Mask the variable parts of a log message.
+
+    Args:
+        message (str): The log message
+
+    Returns:
+        str: The message with UUIDs, e-mail addresses, IP addresses, hex IDs,
+            percentages and numbers replaced by placeholders, e.g.
+            "Memory usage at 85%" becomes "Memory usage at <pct>"
+    """
+    for pattern, placeholder in TEMPLATE_RULES:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+class TimeHistogram:
+    """Per-level entry counts in fixed-width time buckets."""
+
+    def __init__(self, bucket_seconds=60, max_buckets=MAX_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            bucket_seconds (int): Width of each bucket in seconds
+            max_buckets (int): Most buckets kept; when exceeded, the oldest
+                tenth is dropped and counted in `dropped_entries`
+        """
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive")
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        # Bucket start (epoch seconds) -> {level name: count}
+        self.buckets = {}
+        self.dropped_entries = 0
+
+    def add(self, date, level_name, count=1):
+        """
+        Count an entry in its time bucket.
+
+        Args:
+            date (datetime): Timestamp of the entry
+            level_name (str): Severity level name
+            count (int): Number of entries to add
+        """
+        ts = to_epoch(date)
+        start = ts - ts % self.bucket_seconds
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            if len(self.buckets) >= self.max_buckets:
+                self._drop_oldest()
+            bucket = self.buckets[start] = {}
+        bucket[level_name] = bucket.get(level_name, 0) + count
+
+    def _drop_oldest(self):
+        """Drop the oldest tenth of the buckets to make room."""
+        for start in heapq.nsmallest(max(1, self.max_buckets // 10), self.buckets):
+            self.dropped_entries += sum(self.buckets.pop(start).values())
+
+    def rows(self):
+        """
+        List the buckets in time order.
+
+        Returns:
+            list: (bucket start datetime, {level name: count}) tuples
+        """
+        return [(EPOCH + timedelta(seconds=start), self.buckets[start])
+                for start in sorted(self.buckets)]
+
+
+class SpaceSaving:
+    """
+    Top-k frequent items in a fixed number of counters (space-saving algorithm).
+
+    Every tracked item's count is an upper bound on its true count; the gap is
+    at most its recorded error. Items more frequent than total / capacity are
+    guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            capacity (int): Number of items tracked at once
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Lazy min-heap of (count, item); stale pairs are skipped on eviction
+        self._heap = []
+
+    def add(self, item, count=1):
+        """
+        Count an occurrence of an item.
+
+        Args:
+            item (hashable): The item seen
+            count (int): Number of occurrences to add
+        """
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Replace the item with the smallest count; the newcomer inherits
+            # that count as its possible overestimate
+            while True:
+                smallest, victim = heapq.heappop(self._heap)
+                if self.counts.get(victim) == smallest:
+                    break
+            del self.counts[victim]
+            del self.errors[victim]
+            self.counts[item] = smallest + count
+            self.errors[item] = smallest
+
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, n=10):
+        """
+        The n most frequent items.
+
+        Args:
+            n (int): Number of items to return
+
+        Returns:
+            list: (item, estimated count, maximum overestimate) tuples,
+                most frequent first
+        """
+        best = heapq.nlargest(n, self.counts.items(), key=lambda pair: pair[1])
+        return [(item, count, self.errors[item]) for item, count in best]
+
+
+class LogAggregator:
+    """Time-bucket histogram plus top message templates per level."""
+
+    def __init__(self, bucket_seconds=60, top_capacity=TOP_CAPACITY, max_buckets=MAX_BUCKETS):
+        """
+        Initialize empty aggregations.
+
+        Args:
+            bucket_seconds (int): Width of each histogram bucket in seconds
+            top_capacity (int): Number of templates tracked per level
+            max_buckets (int): Most histogram buckets kept
+        """
+        self.histogram = TimeHistogram(bucket_seconds, max_buckets)
+        self.top_capacity = top_capacity
+        self.templates = {}
+        self.total = 0
+
+    def add(self, date, level_name, message):
+        """
+        Feed one entry into every aggregation.
+
+        Args:
+            date (datetime): Timestamp of the entry
+            level_name (str): Severity level name
+            message (str): The log message
+        """
+        self.total += 1
+        self.histogram.add(date, level_name)
+        sketch = self.templates.get(level_name)
+        if sketch is None:
+            sketch = self.templates[level_name] = SpaceSaving(self.top_capacity)
+        sketch.add(template_message(message))
+
+    def add_entries(self, entries):
+        """
+        Feed objects with date, level and message attributes (e.g. LogEntry).
+
+        Args:
+            entries (iterable): Entries whose `level` is an Enum member
+
+        Returns:
+            LogAggregator: self, so calls can be chained
+        """
+        for entry in entries:
+            self.add(entry.date, entry.level.name, entry.message)
+        return self
+
+    def top_templates(self, n=10, level_name=None):
+        """
+        The most frequent message templates.
+
+        Args:
+            n (int): Number of templates to return
+            level_name (str, optional): Only look at this level; otherwise the
+                per-level results are combined
+
+        Returns:
+            list: (template, estimated count, maximum overestimate) tuples,
+                most frequent first
+        """
+        if level_name is not None:
+            sketch = self.templates.get(level_name)
+            return sketch.top(n) if sketch else []
+
+        combined = {}
+        for sketch in self.templates.values():
+            for template, count, error in sketch.top(sketch.capacity):
+                total, total_error = combined.get(template, (0, 0))
+                combined[template] = (total + count, total_error + error)
+        best = heapq.nlargest(n, combined.items(), key=lambda pair: pair[1][0])
+        return [(template, count, error) for template, (count, error) in best]
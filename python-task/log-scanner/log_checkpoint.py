@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Checkpoints
+
+Remembers how far a log file has been scanned (its inode, the byte offset
+reached and running per-level counts) in a small JSON state file, so the next
+run only parses the bytes appended since then. Rotation (the path now points
+at a different inode) and truncation (the file shrank or was rewritten) are
+detected; the unread tail of a rotated file is finished from its new name when
+it can be found, and scanning then restarts at the start of the new file.
+"""
+
+import os
+import json
+
+from log_index import file_fingerprint
+
+
+class LogCheckpoint:
+    """Scan position and running per-level counts for one log file."""
+
+    def __init__(self, log_path, state_path=None):
+        """
+        Initialize a checkpoint at the start of the log.
+
+        Args:
+            log_path (str): Path to the log file
+            state_path (str, optional): JSON file the checkpoint is kept in;
+                if None, the checkpoint only lives in memory
+        """
+        self.log_path = log_path
+        self.state_path = state_path
+        self.inode = None
+        self.offset = 0
+        self.fingerprint = None
+        # Entries seen per level name since the checkpoint was created
+        self.counts = {}
+        # True if the last read_new() found the log rotated or truncated
+        self.restarted = False
+        # Lines skipped by this run because their timestamp wasn't a valid date
+        self.malformed = 0
+
+    @classmethod
+    def load(cls, log_path, state_path):
+        """
+        Load a checkpoint from its state file, or start a fresh one.
+
+        Args:
+            log_path (str): Path to the log file
+            state_path (str): JSON file the checkpoint is kept in
+
+        Returns:
+            LogCheckpoint: The saved checkpoint, or one at the start of the
+                log if the state file is missing, unreadable or for another log
+        """
+        checkpoint = cls(log_path, state_path)
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+
+        if data.get("log_path") == os.path.abspath(log_path):
+            checkpoint.inode = data["inode"]
+            checkpoint.offset = data["offset"]
+            checkpoint.fingerprint = data["fingerprint"]
+            checkpoint.counts = data["counts"]
+        return checkpoint
+
+    def save(self):
+        """Write the checkpoint to its state file (atomically)."""
+        if not self.state_path:
+            return
+        data = {
+            "log_path": os.path.abspath(self.log_path),
+            "inode": self.inode,
+            "offset": self.offset,
+            "fingerprint": self.fingerprint,
+            "counts": self.counts,
+        }
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.state_path)
+
+    def skip_to_end(self):
+        """Move the checkpoint to the end of the last complete line of the log."""
+        with open(self.log_path, 'rb') as file:
+            self.inode = os.fstat(file.fileno()).st_ino
+            size = os.fstat(file.fileno()).st_size
+            file.seek(max(0, size - 65536))
+            tail = file.read()
+            self.offset = size - len(tail) + tail.rfind(b"\n") + 1
+            self.fingerprint = file_fingerprint(file, self.offset)
+
+    def _find_rotated(self):
+        """Find the file the tracked inode was renamed to, if it still exists."""
+        directory = os.path.dirname(self.log_path) or "."
+        base = os.path.basename(self.log_path)
+        for name in sorted(os.listdir(directory)):
+            if name == base or not name.startswith(base):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if os.stat(path).st_ino == self.inode:
+                    return path
+            except OSError:
+                continue
+        return None
+
+    def _read_from(self, path, parse_line, final=False):
+        """
+        Parse the lines of a file after the checkpoint offset.
+
+        The offset and counts move forward with every line handed out, so a
+        consumer that stops early leaves the checkpoint at the right place.
+        Lines whose timestamp isn't a valid date are skipped and counted in
+        `malformed`, so one bad line can't stall the checkpoint.
+
+        Args:
+            path (str): File to read
+            parse_line (callable): Takes a line of text and returns a
+                (datetime, level name, message) tuple or None
+            final (bool): The file won't grow any more, so a last line
+                without a newline is parsed too
+
+        Yields:
+            tuple: Parsed (datetime, level name, message) entries
+        """
+        with open(path, 'rb') as file:
+            file.seek(self.offset)
+            try:
+                for raw in file:
+                    if not raw.endswith(b"\n") and not final:
+                        # Partial line still being written; pick it up next time
+                        break
+                    self.offset += len(raw)
+                    # Text mode also treats a lone "\r" as a line ending
+                    for line in raw.decode('utf-8', errors='replace').split('\r'):
+                        try:
+                            parsed = parse_line(line)
+                        except ValueError:
+                            self.malformed += 1
+                            continue
+                        if parsed is None:
+                            continue
+                        level_name = parsed[1]
+                        self.counts[level_name] = self.counts.get(level_name, 0) + 1
+                        yield parsed
+            finally:
+                self.fingerprint = file_fingerprint(file, self.offset)
+
+    def read_new(self, parse_line):
+        """
+        Parse everything appended to the log since the checkpoint.
+
+        Args:
+            parse_line (callable): Takes a line of text and returns a
+                (datetime, level name, message) tuple or None
+
+        Yields:
+            tuple: Parsed (datetime, level name, message) entries, oldest first
+        """
+        self.restarted = False
+        stat = os.stat(self.log_path)
+
+        if self.inode is not None and stat.st_ino != self.inode:
+            # Rotated: finish the old file under its new name, then start over
+            rotated = self._find_rotated()
+            if rotated:
+                yield from self._read_from(rotated, parse_line, final=True)
+            self.restarted = True
+        elif self.inode is not None:
+            with open(self.log_path, 'rb') as file:
+                truncated = (stat.st_size < self.offset
+                             or file_fingerprint(file, self.offset) != self.fingerprint)
+            self.restarted = truncated
+
+        if self.inode is None or self.restarted:
+            self.inode = stat.st_ino
+            self.offset = 0
+        yield from self._read_from(self.log_path, parse_line)
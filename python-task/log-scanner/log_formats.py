@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Log Formats
+
+Registry of the log line formats the scanner understands, with a sniffer that
+picks the right one from the first lines of a file. Every format has a
+precompiled pattern and turns its fixed-width timestamp into a datetime by
+slicing, caching the result for repeated timestamps; datetime.strptime is only
+used as a fallback.
+
+Run this file directly to see which format a log is detected as, or with
+--benchmark to measure lines/sec for every format.
+"""
+
+import re
+import sys
+import time
+import argparse
+from itertools import islice
+from datetime import datetime, timedelta
+
+from log_sources import open_log
+
+# Number of leading lines looked at when detecting the format of a file
+SNIFF_LINES = 50
+
+# Parsed timestamps are cached until the cache holds this many entries
+TIMESTAMP_CACHE_SIZE = 65536
+
+DEFAULT_FORMAT = "simple"
+
+MONTHS = {name: number for number, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+     "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+FORMATS = {}
+
+
+def register_format(format_class):
+    """
+    Class decorator adding a LogFormat subclass to the registry.
+
+    Args:
+        format_class (type): LogFormat subclass with a unique `name`
+
+    Returns:
+        type: The same class, so it can be used as a decorator
+    """
+    FORMATS[format_class.name] = format_class
+    return format_class
+
+
+def get_format(name, fast=True):
+    """
+    Create a parser for a registered format.
+
+    Args:
+        name (str): Name of the format
+        fast (bool): If False, always use the regex + strptime path
+
+    Returns:
+        LogFormat: A new parser instance with its own timestamp cache
+
+    Raises:
+        ValueError: If no format with that name is registered
+    """
+    try:
+        return FORMATS[name](fast=fast)
+    except KeyError:
+        raise ValueError(f"Unknown log format: {name}. Choose from {', '.join(FORMATS)}.")
+
+
+def detect_format(lines):
+    """
+    Pick the registered format that parses the most of the given lines.
+
+    Args:
+        lines (iterable): Sample lines, usually the start of a log file
+
+    Returns:
+        LogFormat: Parser for the best matching format (the default format if
+            nothing matches); ties go to the format registered first
+    """
+    lines = [line for line in lines if line.strip()]
+    best_name, best_hits = DEFAULT_FORMAT, 0
+
+    for name in FORMATS:
+        log_format = get_format(name)
+        hits = 0
+        for line in lines:
+            try:
+                if log_format.parse(line):
+                    hits += 1
+            except ValueError:
+                pass
+        if hits > best_hits:
+            best_name, best_hits = name, hits
+
+    return get_format(best_name)
+
+
+def sniff_file(path, sample_lines=SNIFF_LINES):
+    """
+    Detect the format of a (possibly gzip or bz2 compressed) log file from its first lines.
+
+    Args:
+        path (str): Path to the log file
+        sample_lines (int): Number of lines to look at
+
+    Returns:
+        LogFormat: Parser for the detected format
+    """
+    with open_log(path) as f:
+        return detect_format(islice(f, sample_lines))
+
+
+class LogFormat:
+    """Base class for a log line format."""
+
+    name = None
+    description = ""
+    # Precompiled pattern applied to the stripped line
+    pattern = None
+    # Format of the timestamp group for the strptime fallback
+    strptime_format = None
+
+    def __init__(self, fast=True):
+        """
+        Initialize the parser.
+
+        Args:
+            fast (bool): Slice timestamps and cache them; if False, every
+                timestamp goes through datetime.strptime
+        """
+        self.fast = fast
+        self._timestamps = {}
+
+    def parse(self, line):
+        """
+        Parse one log line.
+
+        Args:
+            line (str): Raw line from the log file
+
+        Returns:
+            tuple: (datetime, level name, message), or None if the line
+                doesn't match the format
+
+        Raises:
+            ValueError: If the line matches but its timestamp is not a valid date
+        """
+        raise NotImplementedError
+
+    def format_line(self, date, level_name, message):
+        """
+        Render an entry as a line in this format (used for synthetic logs).
+
+        Args:
+            date (datetime): Timestamp of the entry
+            level_name (str): Severity level name
+            message (str): The log message
+
+        Returns:
+            str: A log line without the trailing newline
+        """
+        raise NotImplementedError
+
+    def _fast_timestamp(self, stamp):
+        """Build a datetime by slicing the fixed-width timestamp."""
+        raise NotImplementedError
+
+    def timestamp(self, stamp):
+        """
+        Convert a timestamp string to a datetime.
+
+        Args:
+            stamp (str): Timestamp exactly as captured by the pattern
+
+        Returns:
+            datetime: The parsed timestamp
+
+        Raises:
+            ValueError: If the timestamp is not a valid date
+        """
+        if not self.fast:
+            return datetime.strptime(stamp, self.strptime_format)
+
+        date = self._timestamps.get(stamp)
+        if date is None:
+            try:
+                date = self._fast_timestamp(stamp)
+            except ValueError:
+                date = datetime.strptime(stamp, self.strptime_format)
+            if len(self._timestamps) >= TIMESTAMP_CACHE_SIZE:
+                self._timestamps.clear()
+            self._timestamps[stamp] = date
+        return date
+
+
+@register_format
+class SimpleFormat(LogFormat):
+    """The scanner's original format: YYYY-MM-DD HH:MM:SS LEVEL Message."""
+
+    name = "simple"
+    description = "YYYY-MM-DD HH:MM:SS LEVEL message"
+    pattern = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (INFO|WARNING|ERROR) (.+)")
+    strptime_format = "%Y-%m-%d %H:%M:%S"
+
+    def parse(self, line):
+        match = self.pattern.match(line.strip())
+        if not match:
+            return None
+        stamp, level_name, message = match.groups()
+        return self.timestamp(stamp), level_name, message
+
+    def format_line(self, date, level_name, message):
+        return f"{date:%Y-%m-%d %H:%M:%S} {level_name} {message}"
+
+    def _fast_timestamp(self, stamp):
+        return datetime(int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10]),
+                        int(stamp[11:13]), int(stamp[14:16]), int(stamp[17:19]))
+
+
+@register_format
+class PythonLoggingFormat(SimpleFormat):
+    """Python logging with "%(asctime)s - %(levelname)s - %(message)s"."""
+
+    name = "python"
+    description = "YYYY-MM-DD HH:MM:SS,mmm - LEVEL - message (Python logging)"
+    pattern = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - "
+                         r"(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)")
+    strptime_format = "%Y-%m-%d %H:%M:%S,%f"
+
+    def format_line(self, date, level_name, message):
+        return f"{date:%Y-%m-%d %H:%M:%S},{date.microsecond // 1000:03d} - {level_name} - {message}"
+
+    def _fast_timestamp(self, stamp):
+        return datetime(int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10]),
+                        int(stamp[11:13]), int(stamp[14:16]), int(stamp[17:19]),
+                        int(stamp[20:23]) * 1000)
+
+
+@register_format
+class ApacheCombinedFormat(LogFormat):
+    """Apache common/combined access log; the level comes from the status code."""
+
+    name = "apache"
+    description = 'host ident user [DD/Mon/YYYY:HH:MM:SS zone] "request" status size ...'
+    pattern = re.compile(r'(\S+) \S+ \S+ \[(\d{2}/[A-Z][a-z]{2}/\d{4}:\d{2}:\d{2}:\d{2}) '
+                         r'[+-]\d{4}\] "([^"]*)" (\d{3}) (\S+)')
+    strptime_format = "%d/%b/%Y:%H:%M:%S"
+
+    def parse(self, line):
+        match = self.pattern.match(line.strip())
+        if not match:
+            return None
+        host, stamp, request, status, size = match.groups()
+        if status[0] == "5":
+            level_name = "ERROR"
+        elif status[0] == "4":
+            level_name = "WARNING"
+        else:
+            level_name = "INFO"
+        return self.timestamp(stamp), level_name, f'{host} "{request}" {status} {size}'
+
+    def format_line(self, date, level_name, message):
+        status = {"ERROR": 500, "WARNING": 404}.get(level_name, 200)
+        path = "/" + "-".join(message.lower().split()[:4])
+        return (f'10.0.0.1 - - [{date:%d}/{date:%b}/{date:%Y:%H:%M:%S} +0000] '
+                f'"GET {path} HTTP/1.1" {status} 512 "-" "curl/8.0"')
+
+    def _fast_timestamp(self, stamp):
+        month = MONTHS.get(stamp[3:6])
+        if month is None:
+            raise ValueError(f"unknown month in {stamp!r}")
+        return datetime(int(stamp[7:11]), month, int(stamp[0:2]),
+                        int(stamp[12:14]), int(stamp[15:17]), int(stamp[18:20]))
+
+
+def benchmark(lines_per_format=200000, repeat=3):
+    """
+    Measure parse throughput for every registered format.
+
+    Args:
+        lines_per_format (int): Number of synthetic lines parsed per run
+        repeat (int): Runs per format; the best one is reported
+
+    Returns:
+        list: (format name, fast lines/sec, strptime lines/sec) tuples
+    """
+    levels = ["INFO", "INFO", "INFO", "WARNING", "ERROR"]
+    start = datetime(2025, 3, 1)
+    results = []
+
+    for name in FORMATS:
+        writer = get_format(name)
+        lines = [writer.format_line(start + timedelta(seconds=i // 4, milliseconds=i % 1000),
+                                    levels[i % len(levels)], f"Request {i} handled")
+                 for i in range(lines_per_format)]
+
+        rates = []
+        for fast in (True, False):
+            best = None
+            for _ in range(repeat):
+                parse = get_format(name, fast=fast).parse
+                began = time.perf_counter()
+                for line in lines:
+                    parse(line)
+                elapsed = time.perf_counter() - began
+                best = elapsed if best is None else min(best, elapsed)
+            rates.append(len(lines) / best)
+        results.append((name, rates[0], rates[1]))
+
+    return results
+
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Detect log formats and benchmark the parsers")
+    parser.add_argument("log_files", nargs="*", help="Log files to detect the format of")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Measure lines/sec for every registered format")
+    parser.add_argument("--lines", type=int, default=200000,
+                        help="Synthetic lines per format for --benchmark")
+    args = parser.parse_args()
+
+    for path in args.log_files:
+        try:
+            log_format = sniff_file(path)
+            print(f"{path}: {log_format.name} ({log_format.description})")
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+
+    if args.benchmark:
+        print(f"{'format':<10} {'fast lines/s':>14} {'strptime lines/s':>18} {'speedup':>8}")
+        for name, fast_rate, slow_rate in benchmark(args.lines):
+            print(f"{name:<10} {fast_rate:>14,.0f} {slow_rate:>18,.0f} {fast_rate / slow_rate:>7.1f}x")
+    elif not args.log_files:
+        parser.print_usage(sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
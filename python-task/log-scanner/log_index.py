@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Sidecar Index
+
+Builds and maintains a sparse index next to a log file (<log>.idx). The log is
+cut into blocks of roughly INDEX_BLOCK_BYTES and for every block the index
+keeps its byte range, its oldest and newest timestamp and how many entries of
+each level it holds. Date-range queries can then seek straight to the blocks
+that may contain matches instead of parsing the whole file.
+
+The index is tied to the log's inode, size and mtime. When the log has only
+been appended to, the existing blocks are kept and just the new bytes are
+indexed; after rotation or truncation the index is rebuilt from scratch.
+"""
+
+import os
+import json
+import zlib
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+
+# Roughly how many bytes of log each index block covers
+INDEX_BLOCK_BYTES = 1024 * 1024
+
+# Bytes before the end of the indexed region used to detect in-place rewrites
+FINGERPRINT_BYTES = 4096
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(date):
+    """
+    Convert a naive datetime to whole seconds since 1970-01-01.
+
+    Args:
+        date (datetime): Timestamp as written in the log (no timezone)
+
+    Returns:
+        int: Seconds since the epoch, treating the timestamp as UTC
+    """
+    return int((date - EPOCH).total_seconds())
+
+
+def file_fingerprint(file, end):
+    """
+    Checksum the bytes just before an offset to detect rewritten content.
+
+    Args:
+        file (file): Log file opened in binary mode
+        end (int): Offset the checksummed region ends at
+
+    Returns:
+        int: CRC32 of up to FINGERPRINT_BYTES bytes before `end`
+    """
+    start = max(0, end - FINGERPRINT_BYTES)
+    file.seek(start)
+    return zlib.crc32(file.read(end - start))
+
+
+class LogIndex:
+    """Sparse timestamp to byte offset index stored next to a log file."""
+
+    def __init__(self, log_path, parse_line, block_bytes=INDEX_BLOCK_BYTES, tag=""):
+        """
+        Initialize an empty index. Use LogIndex.open() to load or build one.
+
+        Args:
+            log_path (str): Path to the log file
+            parse_line (callable): Takes a line of text and returns a tuple
+                starting with (datetime, level name), or None if the line
+                isn't an entry
+            block_bytes (int): Approximate number of log bytes per block
+            tag (str): Identifies how lines are parsed; a saved index with a
+                different tag is discarded and rebuilt
+        """
+        self.log_path = log_path
+        self.index_path = log_path + INDEX_SUFFIX
+        self.parse_line = parse_line
+        self.block_bytes = block_bytes
+        self.tag = tag
+        self._reset()
+        self.inode = None
+        self.size = None
+        self.mtime_ns = None
+
+    @classmethod
+    def open(cls, log_path, parse_line, block_bytes=INDEX_BLOCK_BYTES, tag=""):
+        """
+        Load the sidecar index for a log and bring it up to date.
+
+        Args:
+            log_path (str): Path to the log file
+            parse_line (callable): See LogIndex.__init__
+            block_bytes (int): Approximate number of log bytes per block
+            tag (str): See LogIndex.__init__
+
+        Returns:
+            LogIndex: An index covering every complete line of the log
+        """
+        index = cls(log_path, parse_line, block_bytes, tag)
+        index._load()
+        index.refresh()
+        return index
+
+    def _reset(self):
+        """Forget every indexed block."""
+        # Each block is [start offset, end offset, min ts, max ts, {level: count}]
+        self.blocks = []
+        self.indexed_bytes = 0
+        self.fingerprint = None
+
+    def _load(self):
+        """Load the sidecar file, leaving the index empty if it's unusable."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if (data.get("version") != INDEX_VERSION
+                or data.get("block_bytes") != self.block_bytes
+                or data.get("tag") != self.tag):
+            return
+
+        self.inode = data["inode"]
+        self.size = data["size"]
+        self.mtime_ns = data["mtime_ns"]
+        self.indexed_bytes = data["indexed_bytes"]
+        self.fingerprint = data["fingerprint"]
+        self.blocks = data["blocks"]
+
+    def _save(self):
+        """Write the index next to the log; silently skip read-only locations."""
+        data = {
+            "version": INDEX_VERSION,
+            "block_bytes": self.block_bytes,
+            "tag": self.tag,
+            "inode": self.inode,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "indexed_bytes": self.indexed_bytes,
+            "fingerprint": self.fingerprint,
+            "blocks": self.blocks,
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def refresh(self):
+        """
+        Bring the index up to date with the log file.
+
+        Returns:
+            bool: True if any part of the log had to be (re)indexed
+        """
+        stat = os.stat(self.log_path)
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) == (self.inode, self.size, self.mtime_ns):
+            return False
+
+        with open(self.log_path, 'rb') as file:
+            appended = (stat.st_ino == self.inode
+                        and stat.st_size >= self.indexed_bytes
+                        and file_fingerprint(file, self.indexed_bytes) == self.fingerprint)
+            if not appended:
+                self._reset()
+            self._extend(file)
+            self.fingerprint = file_fingerprint(file, self.indexed_bytes)
+
+        self.inode = stat.st_ino
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self._save()
+        return True
+
+    def _extend(self, file):
+        """Index every complete line after the already indexed region."""
+        file.seek(self.indexed_bytes)
+        pos = self.indexed_bytes
+        block = None
+
+        for raw in file:
+            if not raw.endswith(b"\n"):
+                # Partial line still being written; pick it up next time
+                break
+            if block is None:
+                block = [pos, pos, None, None, {}]
+                self.blocks.append(block)
+            pos += len(raw)
+            block[1] = pos
+
+            # Text mode also treats a lone "\r" as a line ending
+            for line in raw.decode('utf-8').split('\r'):
+                try:
+                    parsed = self.parse_line(line)
+                except ValueError:
+                    continue  # Timestamp isn't a valid date; plain scans skip it too
+                if parsed is None:
+                    continue
+                date, level_name = parsed[0], parsed[1]
+                ts = to_epoch(date)
+                if block[2] is None or ts < block[2]:
+                    block[2] = ts
+                if block[3] is None or ts > block[3]:
+                    block[3] = ts
+                block[4][level_name] = block[4].get(level_name, 0) + 1
+
+            if pos - block[0] >= self.block_bytes:
+                block = None
+
+        self.indexed_bytes = pos
+
+    def locate(self, start_ts=None, end_ts=None):
+        """
+        Find the part of the indexed region that can hold entries in a time range.
+
+        Timestamps don't have to be sorted: a block is skipped only when every
+        entry before it is older than start_ts, or every entry after it is newer
+        than end_ts. For ordered logs that leaves just the matching blocks.
+
+        Args:
+            start_ts (int, optional): Oldest wanted timestamp (inclusive)
+            end_ts (int, optional): Newest wanted timestamp (inclusive)
+
+        Returns:
+            tuple: (start offset, end offset) to scan, or None if nothing matches
+        """
+        if not self.blocks:
+            return None
+
+        # Running maximum from the front and minimum from the back are both
+        # non-decreasing, so the bounds can be found with a binary search
+        prefix_max = []
+        newest = float("-inf")
+        for block in self.blocks:
+            if block[3] is not None:
+                newest = max(newest, block[3])
+            prefix_max.append(newest)
+
+        suffix_min = []
+        oldest = float("inf")
+        for block in reversed(self.blocks):
+            if block[2] is not None:
+                oldest = min(oldest, block[2])
+            suffix_min.append(oldest)
+        suffix_min.reverse()
+
+        first = bisect_left(prefix_max, start_ts) if start_ts is not None else 0
+        last = bisect_right(suffix_min, end_ts) - 1 if end_ts is not None else len(self.blocks) - 1
+        if first > last:
+            return None
+        return self.blocks[first][0], self.blocks[last][1]
+
+    def level_counts(self):
+        """
+        Total entries per level across the indexed region.
+
+        Returns:
+            dict: Mapping of level name to number of entries
+        """
+        totals = {}
+        for block in self.blocks:
+            for name, count in block[4].items():
+                totals[name] = totals.get(name, 0) + count
+        return totals
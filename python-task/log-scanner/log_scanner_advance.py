@@ -3,14 +3,29 @@
 Log File Error Scanner - Advanced Version
 
 This script scans a log file, counts occurrences of "ERROR", and can filter logs
-by date or severity level (INFO, WARNING, ERROR).
+by date or severity level (INFO, WARNING, ERROR). The line format is detected
+from the start of the file (see log_formats.py for the supported formats).
 """
 
 import os
-import re
+import time as clock
 import argparse
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
 from enum import Enum, auto
+from itertools import islice
+
+from log_aggregate import TOP_CAPACITY, LogAggregator
+from log_checkpoint import LogCheckpoint
+from log_formats import DEFAULT_FORMAT, FORMATS, get_format, sniff_file
+from log_index import LogIndex, to_epoch
+from log_sources import compression_of, expand_log_paths, merge_entries, open_log
+from log_store import LogStore
+from log_scanner_basic import MIN_PARALLEL_BYTES, split_file_ranges
+
+# Size of each byte range handed to a worker process in parallel mode
+PARALLEL_CHUNK_BYTES = 32 * 1024 * 1024
 
 
 class LogLevel(Enum):
@@ -18,6 +33,8 @@ class LogLevel(Enum):
     INFO = auto()
     WARNING = auto()
     ERROR = auto()
+    DEBUG = auto()
+    CRITICAL = auto()
 
 
 class LogEntry:
@@ -41,44 +58,435 @@ class LogEntry:
         return f"{self.date.strftime('%Y-%m-%d %H:%M:%S')} {self.level.name} {self.message}"
 
 
+_default_format = get_format(DEFAULT_FORMAT)
+
+
+def parse_log_line(line, log_format=None):
+    """
+    Parse a single log line.
+    
+    Args:
+        line (str): Raw line from the log file
+        log_format (LogFormat, optional): Parser for the line format
+            (defaults to YYYY-MM-DD HH:MM:SS LEVEL Message)
+        
+    Returns:
+        LogEntry: The parsed entry, or None if the line doesn't match the
+            format or its timestamp isn't a valid date
+    """
+    try:
+        parsed = (log_format or _default_format).parse(line)
+    except ValueError:
+        return None
+    if parsed is None:
+        return None
+    date, level_name, message = parsed
+    return LogEntry(date, LogLevel[level_name], message)
+
+
+def entry_matches(entry, level=None, start_day=None, end_day=None):
+    """
+    Check a log entry against level and day filters.
+    
+    Args:
+        entry (LogEntry): Entry to check
+        level (LogLevel, optional): Required severity level
+        start_day (date, optional): First day to accept (inclusive)
+        end_day (date, optional): Last day to accept (inclusive)
+        
+    Returns:
+        bool: True if the entry passes every given filter
+    """
+    if level is not None and entry.level != level:
+        return False
+    if start_day or end_day:
+        day = entry.date.date()
+        if start_day and day < start_day:
+            return False
+        if end_day and day > end_day:
+            return False
+    return True
+
+
+def _iter_range(path, log_format, start, end=None):
+    """
+    Parse the log entries between two newline-aligned byte offsets.
+    
+    Args:
+        path (str): Path to the log file
+        log_format (LogFormat): Parser for the line format
+        start (int): Offset of the first byte to parse
+        end (int, optional): Offset to stop at, or None to read to the end
+        
+    Yields:
+        LogEntry: Each successfully parsed log entry, in file order
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        pos = start
+        while end is None or pos < end:
+            raw = file.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            # Text mode also treats a lone "\r" as a line ending
+            for line in raw.decode('utf-8').split('\r'):
+                entry = parse_log_line(line, log_format)
+                if entry:
+                    yield entry
+
+
+def day_bounds(start_day=None, end_day=None):
+    """
+    Convert an inclusive day range to an inclusive epoch-second range.
+    
+    Args:
+        start_day (date, optional): First day of the range
+        end_day (date, optional): Last day of the range
+        
+    Returns:
+        tuple: (start_ts, end_ts), either of which is None if that day
+            wasn't given
+    """
+    start_ts = to_epoch(datetime.combine(start_day, time.min)) if start_day else None
+    end_ts = to_epoch(datetime.combine(end_day, time.max)) if end_day else None
+    return start_ts, end_ts
+
+
+def _entry_from_row(date, level_code, message):
+    """Build a LogEntry from a LogStore row."""
+    return LogEntry(date, LogLevel(level_code), message)
+
+
+def _scan_range(job):
+    """
+    Parse one newline-aligned byte range of a log file in a worker process.
+    
+    Args:
+        job (tuple): (path, format name, start, end, level name, start day,
+            end day, collect)
+        
+    Returns:
+        tuple: (per-level counts by name, matching (date, level name, message)
+            rows, error message or None if the range parsed cleanly)
+    """
+    path, format_name, start, end, level_name, start_day, end_day, collect = job
+    level = LogLevel[level_name] if level_name else None
+    counts = {lvl.name: 0 for lvl in LogLevel}
+    rows = []
+    
+    try:
+        for entry in _iter_range(path, get_format(format_name), start, end):
+            counts[entry.level.name] += 1
+            if collect and entry_matches(entry, level, start_day, end_day):
+                rows.append((entry.date, entry.level.name, entry.message))
+    except Exception as e:
+        return counts, rows, str(e)
+    
+    return counts, rows, None
+
+
 class LogAnalyzer:
     """Class for analyzing log files."""
     
-    def __init__(self, log_file_path):
+    def __init__(self, log_file_path, streaming=False, workers=1, use_index=False,
+                 log_format="auto"):
         """
         Initialize the log analyzer.
         
         Args:
-            log_file_path (str): Path to the log file
+            log_file_path (str): Path to the log file, a directory of log files,
+                or a glob pattern; rotated and gzip/bz2 compressed members are
+                merged into one stream in timestamp order
+            streaming (bool): If True, don't load the file up front; every query
+                re-reads the file lazily so memory use stays flat
+            workers (int): Number of processes used to parse large files
+                (0 or None means one per CPU core)
+            use_index (bool): In streaming mode, keep a sidecar index next to
+                the log so date-range queries only parse the matching region
+            log_format (str): Name of the line format (see log_formats.FORMATS),
+                or "auto" to detect it from the first lines of each file
+            
+        Note:
+            Parallel parsing and the sidecar index need byte offsets, so they
+            are only used when the path names a single uncompressed file.
             
         Raises:
-            FileNotFoundError: If the log file doesn't exist
+            FileNotFoundError: If no log file matches the path
         """
-        if not os.path.exists(log_file_path):
+        self.log_paths = expand_log_paths(log_file_path)
+        if not self.log_paths:
             raise FileNotFoundError(f"Log file not found: {log_file_path}")
         
         self.log_file_path = log_file_path
-        self.log_entries = []
-        self._parse_log_file()
+        self.log_formats = {path: sniff_file(path) if log_format == "auto"
+                            else get_format(log_format)
+                            for path in self.log_paths}
+        # Format of the newest file
+        self.log_format = self.log_formats[self.log_paths[-1]]
+        # The one plain file behind the path, if it can be read by offset
+        self.plain_path = None
+        if len(self.log_paths) == 1 and compression_of(self.log_paths[0]) is None:
+            self.plain_path = self.log_paths[0]
+        self.streaming = streaming
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.use_index = use_index
+        self.index = None
+        self.store = LogStore(_entry_from_row)
+        if not streaming:
+            self._parse_log_file()
     
-    def _parse_log_file(self):
-        """Parse the log file and populate log_entries list."""
-        # Regular expression to match log entries
-        # Format: YYYY-MM-DD HH:MM:SS LEVEL Message
-        log_pattern = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (INFO|WARNING|ERROR) (.+)"
+    @property
+    def log_entries(self):
+        """
+        All parsed entries, as a lazy sequence over the columnar store.
         
+        Returns:
+            LogStoreView: LogEntry objects are only built when a row is read
+        """
+        return self.store.select()
+    
+    def _use_parallel(self):
+        """Return True if the file is big enough to split across workers."""
+        return (self.plain_path is not None and self.workers > 1
+                and os.path.getsize(self.plain_path) >= MIN_PARALLEL_BYTES)
+    
+    def _use_index(self):
+        """Return True if date-range queries should go through the sidecar index."""
+        return self.streaming and self.use_index and self.plain_path is not None
+    
+    def _iter_file(self, path):
+        """
+        Parse one (possibly compressed) log file lazily, one line at a time.
+        
+        Args:
+            path (str): Path to the log file
+            
+        Yields:
+            LogEntry: Each successfully parsed log entry, in file order
+        """
+        log_format = self.log_formats[path]
+        with open_log(path) as file:
+            for line in file:
+                entry = parse_log_line(line, log_format)
+                if entry:
+                    yield entry
+    
+    def _iter_log_file(self):
+        """
+        Parse the log files lazily, one line at a time.
+        
+        Yields:
+            LogEntry: Each successfully parsed log entry, in file order for a
+                single file and in timestamp order across several files
+        """
         try:
-            with open(self.log_file_path, 'r', encoding='utf-8') as file:
-                for line in file:
-                    match = re.match(log_pattern, line.strip())
-                    if match:
-                        date_str, level_str, message = match.groups()
-                        date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                        level = LogLevel[level_str]
-                        self.log_entries.append(LogEntry(date, level, message))
+            if len(self.log_paths) == 1:
+                yield from self._iter_file(self.log_paths[0])
+            else:
+                yield from merge_entries([self._iter_file(path) for path in self.log_paths])
         except Exception as e:
             print(f"Error parsing log file: {e}")
     
+    def _scan_parallel(self, level=None, start_day=None, end_day=None,
+                       counts=None, collect=True):
+        """
+        Parse the log file in a process pool and yield results in file order.
+        
+        The file is split into newline-aligned byte ranges and only a bounded
+        number of ranges are in flight at once, so memory use doesn't depend
+        on the file size.
+        
+        Args:
+            level (LogLevel, optional): Severity level to filter by
+            start_day (date, optional): First day to accept (inclusive)
+            end_day (date, optional): Last day to accept (inclusive)
+            counts (dict, optional): Per-level totals of every parsed entry are
+                added to this mapping of LogLevel to int
+            collect (bool): If False, only count entries and yield nothing
+            
+        Yields:
+            LogEntry: Entries matching the filters
+        """
+        size = os.path.getsize(self.plain_path)
+        parts = max(self.workers, size // PARALLEL_CHUNK_BYTES)
+        level_name = level.name if level else None
+        jobs = ((self.plain_path, self.log_format.name, start, end,
+                 level_name, start_day, end_day, collect)
+                for start, end in split_file_ranges(self.plain_path, parts))
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque(executor.submit(_scan_range, job)
+                            for job in islice(jobs, self.workers * 2))
+            try:
+                while pending:
+                    range_counts, rows, error = pending.popleft().result()
+                    for job in islice(jobs, 1):
+                        pending.append(executor.submit(_scan_range, job))
+                    
+                    if counts is not None:
+                        for name, count in range_counts.items():
+                            counts[LogLevel[name]] += count
+                    for date, name, message in rows:
+                        yield LogEntry(date, LogLevel[name], message)
+                    if error:
+                        print(f"Error parsing log file: {error}")
+                        return
+            finally:
+                for future in pending:
+                    future.cancel()
+    
+    def _get_index(self):
+        """Load or build the sidecar index and make sure it is up to date."""
+        if self.index is None:
+            self.index = LogIndex.open(self.plain_path, self.log_format.parse,
+                                       tag=self.log_format.name)
+        else:
+            self.index.refresh()
+        return self.index
+    
+    def _query_indexed(self, level=None, start_day=None, end_day=None,
+                       counts=None, collect=True):
+        """
+        Answer a date-range query by parsing only the region the index points to.
+        
+        Args:
+            level (LogLevel, optional): Severity level to filter by
+            start_day (date, optional): First day to accept (inclusive)
+            end_day (date, optional): Last day to accept (inclusive)
+            counts (dict, optional): Per-level totals for the whole file are
+                added to this mapping of LogLevel to int
+            collect (bool): If False, only count entries and yield nothing
+            
+        Yields:
+            LogEntry: Entries matching the filters
+        """
+        try:
+            index = self._get_index()
+            if counts is not None:
+                for name, count in index.level_counts().items():
+                    counts[LogLevel[name]] += count
+            
+            region = index.locate(*day_bounds(start_day, end_day)) if collect else None
+            if region:
+                for entry in _iter_range(self.plain_path, self.log_format, *region):
+                    if entry_matches(entry, level, start_day, end_day):
+                        yield entry
+            
+            # A trailing line without a newline isn't indexed yet
+            for entry in _iter_range(self.plain_path, self.log_format, index.indexed_bytes):
+                if counts is not None:
+                    counts[entry.level] += 1
+                if collect and entry_matches(entry, level, start_day, end_day):
+                    yield entry
+        except Exception as e:
+            print(f"Error parsing log file: {e}")
+    
+    def _parse_log_file(self):
+        """Parse the log file into the columnar store."""
+        entries = self._scan_parallel() if self._use_parallel() else self._iter_log_file()
+        append = self.store.append
+        for entry in entries:
+            append(entry.date, entry.level.value, entry.message)
+    
+    def iter_entries(self):
+        """
+        Iterate over all log entries.
+        
+        Returns:
+            iterator: LogEntry objects, read from disk on demand in streaming mode
+        """
+        if self.streaming:
+            if self._use_parallel():
+                return self._scan_parallel()
+            return self._iter_log_file()
+        return iter(self.store)
+    
+    def filter_entries(self, level=None, start_date=None, end_date=None):
+        """
+        Filter log entries by level and date range at once.
+        
+        Args:
+            level (LogLevel, optional): Severity level to filter by
+            start_date (datetime, optional): Start date for filtering (inclusive)
+            end_date (datetime, optional): End date for filtering (inclusive)
+            
+        Returns:
+            LogStoreView: Lazy sequence of matching entries, selected with
+                vectorized masks (a generator in streaming mode)
+        """
+        if self.streaming:
+            return self.query(level, start_date, end_date)
+        
+        start_ts, end_ts = day_bounds(start_date.date() if start_date else None,
+                                      end_date.date() if end_date else None)
+        return self.store.select(level.value if level else None, start_ts, end_ts)
+    
+    def query(self, level=None, start_date=None, end_date=None, counts=None):
+        """
+        Lazily filter log entries by level and date range in a single pass.
+        
+        Args:
+            level (LogLevel, optional): Severity level to filter by
+            start_date (datetime, optional): Start date for filtering (inclusive)
+            end_date (datetime, optional): End date for filtering (inclusive)
+            counts (dict, optional): Per-level totals of every scanned entry,
+                matching or not, are added to this mapping of LogLevel to int
+            
+        Yields:
+            LogEntry: Entries matching every given condition
+        """
+        start_day = start_date.date() if start_date else None
+        end_day = end_date.date() if end_date else None
+        
+        if self._use_index() and (start_day or end_day):
+            yield from self._query_indexed(level, start_day, end_day, counts)
+            return
+        
+        if self.streaming and self._use_parallel():
+            yield from self._scan_parallel(level, start_day, end_day, counts)
+            return
+        
+        if not self.streaming:
+            if counts is not None:
+                for lvl, count in self.count_levels().items():
+                    counts[lvl] += count
+            yield from self.filter_entries(level, start_date, end_date)
+            return
+        
+        for entry in self.iter_entries():
+            if counts is not None:
+                counts[entry.level] += 1
+            if entry_matches(entry, level, start_day, end_day):
+                yield entry
+    
+    def count_levels(self):
+        """
+        Count log entries for every severity level in one pass.
+        
+        Returns:
+            dict: Mapping of LogLevel to number of entries
+        """
+        counts = dict.fromkeys(LogLevel, 0)
+        if not self.streaming:
+            for code, count in self.store.count_levels().items():
+                counts[LogLevel(code)] = count
+            return counts
+        
+        if self._use_index():
+            for _ in self._query_indexed(counts=counts, collect=False):
+                pass
+            return counts
+        
+        if self._use_parallel():
+            for _ in self._scan_parallel(counts=counts, collect=False):
+                pass
+            return counts
+        
+        for entry in self.iter_entries():
+            counts[entry.level] += 1
+        return counts
+    
     def count_by_level(self, level=None):
         """
         Count log entries by severity level.
@@ -89,10 +497,11 @@ class LogAnalyzer:
         Returns:
             int: Count of matching log entries
         """
-        if level is None:
-            return len(self.log_entries)
+        if level is None and not self.streaming:
+            return len(self.store)
         
-        return sum(1 for entry in self.log_entries if entry.level == level)
+        counts = self.count_levels()
+        return sum(counts.values()) if level is None else counts[level]
     
     def filter_by_date(self, start_date=None, end_date=None):
         """
@@ -103,19 +512,9 @@ class LogAnalyzer:
             end_date (datetime, optional): End date for filtering (inclusive)
             
         Returns:
-            list: Filtered log entries
+            LogStoreView: Filtered log entries (a generator in streaming mode)
         """
-        filtered_entries = self.log_entries
-        
-        if start_date:
-            filtered_entries = [entry for entry in filtered_entries 
-                               if entry.date.date() >= start_date.date()]
-        
-        if end_date:
-            filtered_entries = [entry for entry in filtered_entries 
-                               if entry.date.date() <= end_date.date()]
-        
-        return filtered_entries
+        return self.filter_entries(start_date=start_date, end_date=end_date)
     
     def filter_by_level(self, level):
         """
@@ -125,9 +524,29 @@ class LogAnalyzer:
             level (LogLevel): Severity level to filter by
             
         Returns:
-            list: Filtered log entries
+            LogStoreView: Filtered log entries (a generator in streaming mode)
+        """
+        return self.filter_entries(level=level)
+    
+    def aggregate(self, level=None, start_date=None, end_date=None,
+                  bucket_seconds=60, top_capacity=TOP_CAPACITY, counts=None):
+        """
+        Build time-bucket histograms and top message templates in one pass.
+        
+        Args:
+            level (LogLevel, optional): Severity level to filter by
+            start_date (datetime, optional): Start date for filtering (inclusive)
+            end_date (datetime, optional): End date for filtering (inclusive)
+            bucket_seconds (int): Width of each histogram bucket in seconds
+            top_capacity (int): Number of templates tracked per level
+            counts (dict, optional): Per-level totals of every scanned entry
+                are added to this mapping of LogLevel to int
+            
+        Returns:
+            LogAggregator: Aggregations over the matching entries
         """
-        return [entry for entry in self.log_entries if entry.level == level]
+        aggregator = LogAggregator(bucket_seconds, top_capacity)
+        return aggregator.add_entries(self.query(level, start_date, end_date, counts=counts))
     
     def print_entries(self, entries):
         """
@@ -159,22 +578,221 @@ def parse_date(date_str):
         raise ValueError(f"Invalid date format: {date_str}. Use YYYY-MM-DD.")
 
 
+def run_streaming(analyzer, level=None, start_date=None, end_date=None,
+                  date_range=None, count_only=False):
+    """
+    Answer the CLI query in a single lazy pass over the log file.
+    
+    Matching entries are printed as soon as they are read, and the error
+    count is tallied along the way, so memory use doesn't grow with the file.
+    
+    Args:
+        analyzer (LogAnalyzer): Analyzer to read entries from
+        level (LogLevel, optional): Severity level to filter by
+        start_date (datetime, optional): Start date for filtering (inclusive)
+        end_date (datetime, optional): End date for filtering (inclusive)
+        date_range (str, optional): Human readable date range for the summary
+        count_only (bool): Only count errors, don't print any entries
+    """
+    show_entries = not count_only and (level or start_date or end_date)
+    
+    if show_entries:
+        counts = dict.fromkeys(LogLevel, 0)
+        matched = 0
+        for entry in analyzer.query(level, start_date, end_date, counts=counts):
+            matched += 1
+            print(entry, flush=True)
+    else:
+        counts = analyzer.count_levels()
+    error_count = counts[LogLevel.ERROR]
+    
+    print(f"Found {error_count} occurrences of 'ERROR' in logs.")
+    if not show_entries:
+        return
+    
+    if date_range and level:
+        print(f"\nEntries with level {level.name} from {date_range}: {matched}")
+    elif date_range:
+        print(f"\nEntries from {date_range}: {matched}")
+    else:
+        print(f"\nEntries with level {level.name}: {matched}")
+
+
+def run_incremental(analyzer, state_file=None, follow=False, interval=1.0,
+                    level=None, start_date=None, end_date=None, count_only=False):
+    """
+    Scan only what was appended to the log since the last run.
+    
+    The scan position and running per-level counts are kept in a checkpoint
+    state file, so the cost of each run depends on the new data only. With
+    follow=True the log keeps being polled for new lines (like tail -f) until
+    interrupted; without a state file following starts at the end of the log.
+    
+    Args:
+        analyzer (LogAnalyzer): Analyzer for a single uncompressed log file
+        state_file (str, optional): JSON file the checkpoint is kept in
+        follow (bool): Keep watching the log for new lines
+        interval (float): Seconds between polls when following
+        level (LogLevel, optional): Severity level to filter by
+        start_date (datetime, optional): Start date for filtering (inclusive)
+        end_date (datetime, optional): End date for filtering (inclusive)
+        count_only (bool): Only count entries, don't print any of them
+        
+    Raises:
+        ValueError: If the analyzer doesn't point at a single plain log file
+    """
+    if analyzer.plain_path is None:
+        raise ValueError("--checkpoint and --follow need a single uncompressed log file")
+    
+    if state_file:
+        checkpoint = LogCheckpoint.load(analyzer.plain_path, state_file)
+    else:
+        checkpoint = LogCheckpoint(analyzer.plain_path)
+        checkpoint.skip_to_end()
+    
+    start_day = start_date.date() if start_date else None
+    end_day = end_date.date() if end_date else None
+    new_counts = dict.fromkeys(LogLevel, 0)
+    
+    try:
+        while True:
+            for date, level_name, message in checkpoint.read_new(analyzer.log_format.parse):
+                entry = LogEntry(date, LogLevel[level_name], message)
+                new_counts[entry.level] += 1
+                if not count_only and entry_matches(entry, level, start_day, end_day):
+                    print(entry, flush=True)
+            if checkpoint.restarted:
+                print(f"Log {analyzer.plain_path} was rotated or truncated; "
+                      f"scanning it from the beginning", flush=True)
+            checkpoint.save()
+            if not follow:
+                break
+            clock.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped following the log")
+    finally:
+        checkpoint.save()
+    
+    if checkpoint.malformed:
+        print(f"Skipped {checkpoint.malformed} lines with an invalid timestamp")
+    total_errors = checkpoint.counts.get(LogLevel.ERROR.name, 0)
+    print(f"Found {total_errors} occurrences of 'ERROR' in logs.")
+    summary = ", ".join(f"{count} {lvl.name}" for lvl, count in new_counts.items() if count)
+    print(f"New entries since the last checkpoint: {summary or 'none'}")
+
+
+def run_aggregation(analyzer, level=None, start_date=None, end_date=None,
+                    bucket_seconds=None, top=None):
+    """
+    Print an entries-per-bucket histogram and/or the top message templates.
+    
+    Args:
+        analyzer (LogAnalyzer): Analyzer to read entries from
+        level (LogLevel, optional): Severity level to filter by
+        start_date (datetime, optional): Start date for filtering (inclusive)
+        end_date (datetime, optional): End date for filtering (inclusive)
+        bucket_seconds (int, optional): Histogram bucket width; no histogram if None
+        top (int, optional): Number of templates to show; none if None
+    """
+    counts = dict.fromkeys(LogLevel, 0)
+    aggregator = analyzer.aggregate(level, start_date, end_date,
+                                    bucket_seconds=bucket_seconds or 60, counts=counts)
+    print(f"Found {counts[LogLevel.ERROR]} occurrences of 'ERROR' in logs.")
+    
+    if bucket_seconds:
+        print(f"\nEntries per {bucket_seconds}s:")
+        for bucket_start, bucket in aggregator.histogram.rows():
+            levels = " ".join(f"{name}={count}" for name, count in bucket.items())
+            print(f"{bucket_start:%Y-%m-%d %H:%M:%S}  {sum(bucket.values()):>8}  {levels}")
+        if aggregator.histogram.dropped_entries:
+            print(f"({aggregator.histogram.dropped_entries} entries in older buckets were dropped)")
+    
+    if top:
+        print(f"\nTop {top} message templates:")
+        for template, count, error in aggregator.top_templates(top, level.name if level else None):
+            bound = f" (±{error})" if error else ""
+            print(f"{count:>8}{bound}  {template}")
+
+
 def main():
     """
     Main function to run the script.
     """
     parser = argparse.ArgumentParser(description="Analyze log files and count errors")
-    parser.add_argument("log_file", help="Path to the log file")
+    parser.add_argument("log_file",
+                        help="Path to a log file, a directory of log files, or a quoted "
+                             "glob such as '/var/log/app.log*' (.gz/.bz2 are read too)")
     parser.add_argument("--count-only", action="store_true", help="Only show error count")
-    parser.add_argument("--level", choices=["INFO", "WARNING", "ERROR"], 
+    parser.add_argument("--level", choices=[level.name for level in LogLevel], 
                         help="Filter by log level")
     parser.add_argument("--start-date", help="Start date (YYYY-MM-DD)")
     parser.add_argument("--end-date", help="End date (YYYY-MM-DD)")
+    parser.add_argument("--format", default="auto", choices=["auto", *FORMATS],
+                        help="Log line format (default: detect from the file)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to parse large files "
+                             "(0 = one per CPU core)")
+    parser.add_argument("--index", action="store_true",
+                        help="Keep a sidecar index next to the log so date-range "
+                             "queries only parse the matching part (implies --stream)")
+    parser.add_argument("--checkpoint", metavar="STATE_FILE",
+                        help="Only scan lines appended since the last run, keeping the "
+                             "position and running counts in STATE_FILE")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep watching the log and print new matching lines")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Seconds between checks for new lines with --follow")
+    parser.add_argument("--histogram", type=int, metavar="SECONDS",
+                        help="Show matching entries per time bucket of SECONDS (e.g. 60)")
+    parser.add_argument("--top", type=int, metavar="N",
+                        help="Show the N most frequent message templates (numbers, "
+                             "IDs and percentages masked)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Scan in a single lazy pass with constant memory, "
+                             "printing matches as they are found")
     
     args = parser.parse_args()
     
     try:
-        analyzer = LogAnalyzer(args.log_file)
+        if args.index or args.checkpoint or args.follow:
+            args.stream = True
+        analyzer = LogAnalyzer(args.log_file, streaming=args.stream,
+                               workers=args.workers, use_index=args.index,
+                               log_format=args.format)
+        
+        if args.checkpoint or args.follow:
+            run_incremental(analyzer,
+                            state_file=args.checkpoint,
+                            follow=args.follow,
+                            interval=args.interval,
+                            level=LogLevel[args.level] if args.level else None,
+                            start_date=parse_date(args.start_date) if args.start_date else None,
+                            end_date=parse_date(args.end_date) if args.end_date else None,
+                            count_only=args.count_only)
+            return
+        
+        if args.histogram or args.top:
+            run_aggregation(analyzer,
+                            level=LogLevel[args.level] if args.level else None,
+                            start_date=parse_date(args.start_date) if args.start_date else None,
+                            end_date=parse_date(args.end_date) if args.end_date else None,
+                            bucket_seconds=args.histogram,
+                            top=args.top)
+            return
+        
+        if args.stream:
+            start_date = parse_date(args.start_date) if args.start_date else None
+            end_date = parse_date(args.end_date) if args.end_date else None
+            date_range = None
+            if start_date or end_date:
+                date_range = f"{args.start_date or 'beginning'} to {args.end_date or 'end'}"
+            run_streaming(analyzer,
+                          level=LogLevel[args.level] if args.level else None,
+                          start_date=start_date,
+                          end_date=end_date,
+                          date_range=date_range,
+                          count_only=args.count_only)
+            return
         
         # Basic error count
         error_count = analyzer.count_by_level(LogLevel.ERROR)
@@ -197,14 +815,12 @@ def main():
         
         if start_date or end_date:
             date_range = f"{args.start_date or 'beginning'} to {args.end_date or 'end'}"
-            filtered_by_date = analyzer.filter_by_date(start_date, end_date)
-            
             if args.level:
                 level = LogLevel[args.level]
-                filtered_entries = [e for e in filtered_by_date if e.level == level]
+                filtered_entries = analyzer.filter_entries(level, start_date, end_date)
                 print(f"\nEntries with level {args.level} from {date_range}: {len(filtered_entries)}")
             else:
-                filtered_entries = filtered_by_date
+                filtered_entries = analyzer.filter_by_date(start_date, end_date)
                 print(f"\nEntries from {date_range}: {len(filtered_entries)}")
             
             analyzer.print_entries(filtered_entries)
@@ -3,11 +3,94 @@
 Log File Error Scanner - Basic Version
 """
 
-def count_errors(log_file):
-    # Count the number of ERROR occurrences in a log file
+import os
+import re
+import mmap
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Files smaller than this are never worth splitting across processes
+MIN_PARALLEL_BYTES = 8 * 1024 * 1024
+
+# Bytes of the memory-mapped file searched at a time by the "mmap" engine
+MMAP_CHUNK_BYTES = 16 * 1024 * 1024
+
+# From the first ERROR in a line to the end of that line. The only group is
+# empty, so findall() returns the same b"" for every match instead of copying
+# the rest of each line. `.` stops at b"\n" only but is about twice as quick
+# as the character class, so it's used for chunks without any b"\r".
+ERROR_LINE = re.compile(rb"ERROR[^\r\n]*()")
+ERROR_TO_NEWLINE = re.compile(rb"ERROR.*()")
+
+
+def split_file_ranges(log_file, parts):
+    # Split a file into at most `parts` byte ranges, each ending on a newline
+    size = os.path.getsize(log_file)
+    parts = max(1, min(parts, size))
+    bounds = [0]
+
+    with open(log_file, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()
+            pos = min(f.tell(), size)
+            if pos > bounds[-1]:
+                bounds.append(pos)
+
+    if bounds[-1] < size or size == 0:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def count_chunk_errors(buffer, start=0, end=None):
+    # Count lines containing ERROR in buffer[start:end], a run of whole lines,
+    # searching the buffer (e.g. an mmap) in place. Each match runs from an
+    # ERROR to the end of its line, so a line is counted once; like text
+    # mode, a lone b"\r" ends a line as well as b"\n".
+    if end is None:
+        end = len(buffer)
+    pattern = ERROR_LINE if buffer.find(b"\r", start, end) != -1 else ERROR_TO_NEWLINE
+    return len(pattern.findall(buffer, start, end))
+
+
+def _count_range(job):
+    # Count ERROR lines between two newline-aligned byte offsets
+    log_file, start, end = job
+    error_count = 0
+    if start >= end:
+        return error_count
+
+    with open(log_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while start < end:
+                # Cut the mapping into chunks that end on a newline
+                stop = mm.find(b"\n", min(start + MMAP_CHUNK_BYTES, end) - 1, end)
+                stop = end if stop == -1 else stop + 1
+                error_count += count_chunk_errors(mm, start, stop)
+                start = stop
+
+    return error_count
+
+
+def count_errors(log_file, workers=1, engine="mmap"):
+    # Count the number of ERROR occurrences in a log file.
+    # The "mmap" engine searches the raw bytes of the memory-mapped file; the
+    # "text" engine decodes and splits it line by line (and, unlike "mmap",
+    # gives up on bytes that aren't valid in the locale's encoding).
     error_count = 0
     
     try:
+        if engine == "mmap":
+            if workers is None or workers < 1:
+                workers = os.cpu_count() or 1
+            size = os.path.getsize(log_file)
+            if workers > 1 and size >= MIN_PARALLEL_BYTES:
+                jobs = [(log_file, start, end)
+                        for start, end in split_file_ranges(log_file, workers)]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    return sum(executor.map(_count_range, jobs))
+            return _count_range((log_file, 0, size))
+        
         with open(log_file, 'r') as f:
             for line in f:
                 if "ERROR" in line:
@@ -23,7 +106,15 @@ def count_errors(log_file):
 
 
 if __name__ == "__main__":
-    log_file = "sample.log"
-    
-    errors = count_errors(log_file)
-    print(f"Found {errors} occurrences of 'ERROR' in logs.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Count ERROR lines in a log file")
+    parser.add_argument("log_file", nargs="?", default="sample.log",
+                        help="Path to the log file (default: sample.log)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes to scan with (0 = one per CPU core)")
+    parser.add_argument("--engine", choices=["mmap", "text"], default="mmap",
+                        help="Search the memory-mapped bytes (default) or decode "
+                             "the file line by line")
+    args = parser.parse_args()
+
+    errors = count_errors(args.log_file, workers=args.workers, engine=args.engine)
+    print(f"Found {errors} occurrences of 'ERROR' in logs.")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Log Sources
+
+Turns a path, directory or glob into the set of log files behind it, including
+rotated and compressed members (app.log, app.log.1, app.log.2.gz, ...), opens
+gzip and bz2 members as streams, and merges the entries of several files back
+into one timestamp-ordered stream with a heap-based k-way merge.
+"""
+
+import os
+import re
+import bz2
+import glob
+import gzip
+import heapq
+
+from log_index import INDEX_SUFFIX
+
+# Names picked up when a directory is scanned: *.log plus rotated/compressed copies
+LOG_NAME_PATTERN = re.compile(r".+\.log(?:\.(\d+))?(?:\.gz|\.bz2)?$")
+
+GZIP_MAGIC = b"\x1f\x8b"
+BZIP2_MAGIC = b"BZh"
+
+
+def _rotation_key(path):
+    """Sort key putting the oldest rotated member of each log first."""
+    name = os.path.basename(path)
+    match = LOG_NAME_PATTERN.match(name)
+    rotation = int(match.group(1)) if match and match.group(1) else 0
+    base = name.split(".log", 1)[0]
+    return os.path.dirname(path), base, -rotation, name
+
+
+def expand_log_paths(spec):
+    """
+    Find the log files a path, directory or glob pattern refers to.
+
+    Args:
+        spec (str): A log file, a directory holding *.log files (and their
+            rotated copies), or a glob pattern such as "/var/log/app.log*"
+
+    Returns:
+        list: Paths of the matching files, oldest rotation first
+    """
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, name) for name in os.listdir(spec)
+                 if LOG_NAME_PATTERN.match(name)]
+    elif os.path.isfile(spec):
+        return [spec]
+    else:
+        paths = glob.glob(spec)
+
+    paths = [path for path in paths
+             if os.path.isfile(path) and not path.endswith(INDEX_SUFFIX)]
+    return sorted(paths, key=_rotation_key)
+
+
+def compression_of(path):
+    """
+    Detect whether a file is gzip or bz2 compressed from its magic bytes.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: "gzip", "bz2", or None for a plain file
+    """
+    with open(path, 'rb') as f:
+        head = f.read(3)
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(BZIP2_MAGIC):
+        return "bz2"
+    return None
+
+
+def open_log(path):
+    """
+    Open a plain, gzip or bz2 log file as a text stream.
+
+    Compressed files are decompressed on the fly as they are read, never as a
+    whole.
+
+    Args:
+        path (str): Path to the log file
+
+    Returns:
+        file: Text-mode file object yielding decoded lines
+    """
+    compression = compression_of(path)
+    if compression == "gzip":
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compression == "bz2":
+        return bz2.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def merge_entries(streams):
+    """
+    Merge several timestamp-ordered entry streams into one.
+
+    Only one pending entry per stream is held at a time. Entries with equal
+    timestamps keep the order of the streams they came from.
+
+    Args:
+        streams (list): Iterables of objects with a `date` attribute, each
+            in timestamp order
+
+    Returns:
+        iterator: All entries in global timestamp order
+    """
+    return heapq.merge(*streams, key=lambda entry: entry.date)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Log File Error Scanner - Columnar Entry Store
+
+Keeps parsed log entries as columns instead of one object per line: the
+timestamp as int64 epoch seconds, the level as a uint8 code and the message
+as an offset into one shared UTF-8 buffer. Counting and filtering run as
+NumPy masks over the columns when NumPy is installed (plain loops otherwise),
+and entry objects are only built for the rows that are actually read.
+"""
+
+from array import array
+from collections.abc import Sequence
+from datetime import timedelta
+
+from log_index import EPOCH, to_epoch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LogStore(Sequence):
+    """Append-only columnar storage for parsed log entries."""
+
+    def __init__(self, entry_factory):
+        """
+        Initialize an empty store.
+
+        Args:
+            entry_factory (callable): Builds an entry object from a
+                (datetime, level code, message) row when one is read
+        """
+        self.entry_factory = entry_factory
+        self.timestamps = array('q')
+        self.levels = array('B')
+        # offsets[i]:offsets[i + 1] is the slice of messages holding row i
+        self.offsets = array('q', [0])
+        self.messages = bytearray()
+
+    def append(self, date, level_code, message):
+        """
+        Add one entry to the end of the store.
+
+        Args:
+            date (datetime): Timestamp of the entry (whole seconds are kept)
+            level_code (int): Severity level code, 0-255
+            message (str): The log message
+        """
+        self.timestamps.append(to_epoch(date))
+        self.levels.append(level_code)
+        self.messages += message.encode('utf-8')
+        self.offsets.append(len(self.messages))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def row(self, i):
+        """
+        Read one row without building an entry object.
+
+        Args:
+            i (int): Row number
+
+        Returns:
+            tuple: (datetime, level code, message)
+        """
+        date = EPOCH + timedelta(seconds=self.timestamps[i])
+        message = self.messages[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+        return date, self.levels[i], message
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return LogStoreView(self, range(len(self))[i])
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("log store index out of range")
+        return self.entry_factory(*self.row(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.entry_factory(*self.row(i))
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by the columns, in bytes."""
+        return (len(self.timestamps) * self.timestamps.itemsize
+                + len(self.levels) * self.levels.itemsize
+                + len(self.offsets) * self.offsets.itemsize
+                + len(self.messages))
+
+    def count_levels(self):
+        """
+        Count rows per level code.
+
+        Returns:
+            dict: Mapping of level code to number of rows (codes with no rows
+                are left out)
+        """
+        if np is not None:
+            counts = np.bincount(np.frombuffer(self.levels, dtype=np.uint8))
+            return {code: int(count) for code, count in enumerate(counts) if count}
+
+        counts = {}
+        for code in self.levels:
+            counts[code] = counts.get(code, 0) + 1
+        return counts
+
+    def select(self, level_code=None, start_ts=None, end_ts=None):
+        """
+        Select rows by level and time range.
+
+        Args:
+            level_code (int, optional): Only keep rows with this level code
+            start_ts (int, optional): Oldest epoch second to keep (inclusive)
+            end_ts (int, optional): Newest epoch second to keep (inclusive)
+
+        Returns:
+            LogStoreView: Lazy sequence over the matching rows
+        """
+        if level_code is None and start_ts is None and end_ts is None:
+            return LogStoreView(self, range(len(self)))
+
+        if np is not None:
+            # Temporary views over the columns; none are kept, so the arrays
+            # can still grow afterwards
+            mask = np.ones(len(self), dtype=bool)
+            if level_code is not None:
+                mask &= np.frombuffer(self.levels, dtype=np.uint8) == level_code
+            if start_ts is not None or end_ts is not None:
+                timestamps = np.frombuffer(self.timestamps, dtype=np.int64)
+                if start_ts is not None:
+                    mask &= timestamps >= start_ts
+                if end_ts is not None:
+                    mask &= timestamps <= end_ts
+            return LogStoreView(self, np.flatnonzero(mask))
+
+        rows = [i for i in range(len(self))
+                if (level_code is None or self.levels[i] == level_code)
+                and (start_ts is None or self.timestamps[i] >= start_ts)
+                and (end_ts is None or self.timestamps[i] <= end_ts)]
+        return LogStoreView(self, rows)
+
+
+class LogStoreView(Sequence):
+    """Read-only, lazily materialized selection of rows from a LogStore."""
+
+    def __init__(self, store, rows):
+        """
+        Initialize the view.
+
+        Args:
+            store (LogStore): Store the rows belong to
+            rows (sequence): Row numbers in the order they should be read
+        """
+        self.store = store
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return LogStoreView(self.store, self.rows[i])
+        return self.store[int(self.rows[i])]
+
+    def __iter__(self):
+        store = self.store
+        for i in self.rows:
+            yield store.entry_factory(*store.row(int(i)))
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Alert Rules
+
+Evaluates rules such as "cpu avg 5m > 90" or "memory p95 15m > 80" on every
+logged sample. Nothing is recomputed over history: each rule reads a sliding
+window that is updated in O(1) (amortized) per sample.
+
+- avg keeps a running sum and count
+- min and max keep a monotonic deque, whose head is the answer
+- pNN keeps a log-bucket quantile sketch (about 1% error) that values are
+  added to and removed from as they enter and leave the window; its counts
+  sit in a Fenwick tree, so every step is O(log buckets)
+
+Rules on the same metric, statistic and window share one window, so dozens of
+rules cost little more than a few.
+
+Rule syntax:
+
+    <metric> <avg|min|max|pNN> <window> <op> <threshold> [clear <value>] [for <duration>]
+
+e.g. "cpu avg 5m > 90 clear 80 for 30s". A rule fires once its value crosses
+the threshold (and, with "for", has stayed there that long), and resolves only
+when the value is back past the clear level. Without "clear" the clear level
+is 5% of the threshold on the safe side, so a value wobbling around the
+threshold doesn't fire over and over.
+"""
+
+import math
+import operator
+from collections import deque, namedtuple
+
+from monitor_rollup import SKETCH_GAMMA, parse_duration
+
+# Columns of the alert log
+ALERT_COLUMNS = ["State", "Rule", "Value"]
+
+# Default distance of the clear level from the threshold, relative to the threshold
+HYSTERESIS = 0.05
+
+# Running sums are recomputed from the window after this many updates, so
+# floating-point error can't build up
+RESUM_EVERY = 10000
+
+# Buckets of the sliding quantile sketch: gamma^-400 (~0.0004) to gamma^1647 (~10^14)
+SKETCH_MIN_KEY = -400
+SKETCH_SLOTS = 2048
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+AlertEvent = namedtuple("AlertEvent", ["timestamp", "state", "rule", "value"])
+
+
+class SumWindow:
+    """Average of the samples in a sliding time window."""
+
+    def __init__(self, length):
+        """
+        Initialize an empty window.
+
+        Args:
+            length (float): Window length in seconds
+        """
+        self.length = length
+        self.samples = deque()
+        self.total = 0.0
+        self.updates = 0
+
+    def add(self, timestamp, value):
+        """Add a sample and drop the ones that left the window."""
+        self.samples.append((timestamp, value))
+        self.total += value
+        while self.samples[0][0] <= timestamp - self.length:
+            self.total -= self.samples.popleft()[1]
+        self.updates += 1
+        if self.updates % RESUM_EVERY == 0:
+            self.total = math.fsum(value for _, value in self.samples)
+
+    def value(self, stat):
+        """Average of the window."""
+        return self.total / len(self.samples) if self.samples else None
+
+
+class ExtremeWindow:
+    """Minimum or maximum of a sliding time window (monotonic deque)."""
+
+    def __init__(self, length, largest=True):
+        """
+        Initialize an empty window.
+
+        Args:
+            length (float): Window length in seconds
+            largest (bool): Track the maximum (True) or the minimum (False)
+        """
+        self.length = length
+        self.better = operator.ge if largest else operator.le
+        # (timestamp, value) with values strictly worse from head to tail;
+        # a sample that can never be the answer again is never stored
+        self.candidates = deque()
+
+    def add(self, timestamp, value):
+        """Add a sample and drop the ones that left the window."""
+        while self.candidates and self.better(value, self.candidates[-1][1]):
+            self.candidates.pop()
+        self.candidates.append((timestamp, value))
+        while self.candidates[0][0] <= timestamp - self.length:
+            self.candidates.popleft()
+
+    def value(self, stat):
+        """Minimum or maximum of the window."""
+        return self.candidates[0][1] if self.candidates else None
+
+
+class SlidingSketch:
+    """
+    Log-bucket quantile sketch that values can also be removed from.
+
+    Uses the same buckets as the rollups' QuantileSketch (about 1% error),
+    but keeps the counts in a Fenwick tree over a fixed range of buckets, so
+    adding, removing and asking for a quantile are all O(log buckets).
+    """
+
+    def __init__(self):
+        """Initialize an empty sketch."""
+        self.tree = [0] * (SKETCH_SLOTS + 1)
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value, delta=1):
+        """
+        Count a value (or uncount it, with delta=-1).
+
+        Args:
+            value (float): The value; negatives count as zero
+            delta (int): 1 to add, -1 to remove
+        """
+        self.count += delta
+        if value <= 0:
+            self.zeros += delta
+            return
+        key = math.ceil(math.log(value, SKETCH_GAMMA)) - SKETCH_MIN_KEY
+        # Values beyond the range (far below 0.001 or above 10^14) are clamped
+        index = min(max(key, 0), SKETCH_SLOTS - 1) + 1
+        tree = self.tree
+        while index <= SKETCH_SLOTS:
+            tree[index] += delta
+            index += index & -index
+
+    def remove(self, value):
+        """Uncount a value added before."""
+        self.add(value, -1)
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Estimated value, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        rank = int(q * (self.count - 1))
+        if rank < self.zeros:
+            return 0.0
+        # Find the last slot whose prefix count is <= rank; the answer is the next one
+        remaining, position, step = rank - self.zeros, 0, SKETCH_SLOTS
+        while step:
+            if position + step <= SKETCH_SLOTS and self.tree[position + step] <= remaining:
+                position += step
+                remaining -= self.tree[position]
+            step >>= 1
+        key = position + SKETCH_MIN_KEY
+        # Midpoint of the bucket (gamma^(key-1), gamma^key]
+        return 2 * SKETCH_GAMMA ** key / (SKETCH_GAMMA + 1)
+
+
+class QuantileWindow:
+    """Approximate quantiles of a sliding time window."""
+
+    def __init__(self, length):
+        """
+        Initialize an empty window.
+
+        Args:
+            length (float): Window length in seconds
+        """
+        self.length = length
+        self.samples = deque()
+        self.sketch = SlidingSketch()
+
+    def add(self, timestamp, value):
+        """Add a sample and drop the ones that left the window."""
+        self.samples.append((timestamp, value))
+        self.sketch.add(value)
+        while self.samples[0][0] <= timestamp - self.length:
+            self.sketch.remove(self.samples.popleft()[1])
+
+    def value(self, stat):
+        """Quantile named by `stat`, e.g. "p95"."""
+        return self.sketch.quantile(_percentile(stat) / 100)
+
+
+# Statistic -> (window kind, factory)
+WINDOW_KINDS = {
+    "avg": ("sum", SumWindow),
+    "max": ("max", lambda length: ExtremeWindow(length, largest=True)),
+    "min": ("min", lambda length: ExtremeWindow(length, largest=False)),
+}
+
+
+class AlertRule:
+    """One threshold rule on a windowed statistic of a metric."""
+
+    def __init__(self, metric, stat, window, op, threshold, clear=None, hold=0.0, text=None):
+        """
+        Initialize the rule.
+
+        Args:
+            metric (str): Metric name, e.g. "cpu" or "disk_read_bps"
+            stat (str): "avg", "min", "max" or a percentile such as "p95"
+            window (float): Window length in seconds
+            op (str): ">", ">=", "<" or "<="
+            threshold (float): Value the statistic is compared with
+            clear (float, optional): Level the statistic must get back past
+                to resolve (default: HYSTERESIS away from the threshold)
+            hold (float): Seconds the condition must hold before firing
+            text (str, optional): The rule as written, used in messages
+        """
+        self.metric = metric
+        self.stat = stat
+        self.window = window
+        self.op = op
+        self.threshold = threshold
+        if clear is None:
+            margin = abs(threshold) * HYSTERESIS
+            clear = threshold - margin if op in (">", ">=") else threshold + margin
+        self.clear = clear
+        self.hold = hold
+        self.text = text or f"{metric} {stat} {window:g}s {op} {threshold:g}"
+        self.state = "ok"
+        self.since = None
+        self.value = None
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse a rule such as "cpu avg 5m > 90 clear 80 for 30s".
+
+        Args:
+            text (str): The rule
+
+        Returns:
+            AlertRule: The parsed rule
+
+        Raises:
+            ValueError: If the rule can't be parsed
+        """
+        words = text.lower().split()
+        try:
+            metric, stat, window, op, threshold = words[:5]
+            options = dict(zip(words[5::2], words[6::2]))
+            if len(words) % 2 == 0 or set(options) - {"clear", "for"}:
+                raise ValueError
+            if op not in OPERATORS or not (stat in WINDOW_KINDS or _percentile(stat) is not None):
+                raise ValueError
+            rule = cls(metric, stat, parse_duration(window), op, float(threshold),
+                       float(options["clear"]) if "clear" in options else None,
+                       parse_duration(options.get("for", "0")), " ".join(text.split()))
+        except ValueError:
+            raise ValueError(f"Invalid alert rule: {text!r}. Use e.g. 'cpu avg 5m > 90', "
+                             f"'memory p95 15m > 80 clear 75 for 1m'.")
+        if rule.window <= 0:
+            raise ValueError(f"Invalid alert rule: {text!r}. The window must be positive.")
+        # Past the threshold on the firing side (equal is fine: no hysteresis)
+        above = rule.op in (">", ">=")
+        if rule.clear > rule.threshold if above else rule.clear < rule.threshold:
+            side = "above" if above else "below"
+            raise ValueError(f"Invalid alert rule: {text!r}. The clear level can't be {side} "
+                             f"the threshold, or the alert would never resolve.")
+        return rule
+
+    def window_key(self):
+        """Key of the window this rule reads; rules with equal keys share it."""
+        if self.stat in WINDOW_KINDS:
+            return self.metric, WINDOW_KINDS[self.stat][0], self.window
+        return self.metric, "quantile", self.window
+
+    def make_window(self):
+        """Create the window this rule reads."""
+        if self.stat in WINDOW_KINDS:
+            return WINDOW_KINDS[self.stat][1](self.window)
+        return QuantileWindow(self.window)
+
+    def evaluate(self, timestamp, value):
+        """
+        Update the rule's state with the current window value.
+
+        Args:
+            timestamp (float): Time of the sample
+            value (float): Current value of the windowed statistic
+
+        Returns:
+            str: "firing" or "resolved" if the state changed that way, else None
+        """
+        self.value = value
+        compare = OPERATORS[self.op]
+        if self.state == "firing":
+            # Hysteresis: stay firing until the value is back past the clear level
+            if compare(value, self.clear) or value == self.clear:
+                return None
+            self.state, self.since = "ok", None
+            return "resolved"
+
+        if not compare(value, self.threshold):
+            self.state, self.since = "ok", None
+            return None
+        if self.since is None:
+            self.state, self.since = "pending", timestamp
+        if timestamp - self.since >= self.hold:
+            self.state = "firing"
+            return "firing"
+        return None
+
+
+def _percentile(stat):
+    """Percentile of a "pNN" statistic, or None if it isn't one."""
+    if len(stat) < 2 or stat[0].lower() != "p":
+        return None
+    try:
+        percentile = float(stat[1:])
+    except ValueError:
+        return None
+    return percentile if 0 <= percentile <= 100 else None
+
+
+def load_rules(texts=(), path=None):
+    """
+    Parse rules given on the command line and in a rules file.
+
+    Args:
+        texts (list): Rules as strings
+        path (str, optional): File with one rule per line; blank lines and
+            lines starting with "#" are skipped
+
+    Returns:
+        list: AlertRule objects
+
+    Raises:
+        ValueError: If a rule can't be parsed
+        OSError: If the file can't be read
+    """
+    texts = list(texts)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts += [line.strip() for line in f
+                      if line.strip() and not line.lstrip().startswith("#")]
+    return [AlertRule.parse(text) for text in texts]
+
+
+def check_metrics(rules, metrics):
+    """
+    Make sure every rule is on a metric that is actually sampled.
+
+    Args:
+        rules (list): AlertRule objects
+        metrics (list): Names of the metrics being sampled
+
+    Raises:
+        ValueError: If a rule's metric isn't one of them
+    """
+    for rule in rules:
+        if rule.metric not in metrics:
+            raise ValueError(f"Alert rule {rule.text!r} is on {rule.metric!r}, which isn't sampled. "
+                             f"Sampled metrics: {', '.join(metrics)} (turn on others with "
+                             f"--disk-interval, --net-interval or --percpu-interval).")
+
+
+class AlertEngine:
+    """Evaluates alert rules on every sample."""
+
+    def __init__(self, rules):
+        """
+        Initialize the engine.
+
+        Args:
+            rules (list): AlertRule objects
+        """
+        self.rules = list(rules)
+        self.windows = {}
+        # (rule, window it reads) pairs
+        self.bound = []
+        for rule in self.rules:
+            key = rule.window_key()
+            if key not in self.windows:
+                self.windows[key] = rule.make_window()
+            self.bound.append((rule, self.windows[key]))
+        # Metric -> windows fed by it, and time of its first sample
+        self.by_metric = {}
+        for (metric, _, _), window in self.windows.items():
+            self.by_metric.setdefault(metric, []).append(window)
+        self.started = {}
+
+    def update(self, timestamp, values):
+        """
+        Feed one sample to the windows and evaluate the rules.
+
+        Args:
+            timestamp (float): Time of the sample
+            values (dict): Metric name -> value (None if not sampled)
+
+        Returns:
+            list: AlertEvent for every rule that fired or resolved
+        """
+        for metric, windows in self.by_metric.items():
+            value = values.get(metric)
+            if value is None:
+                continue
+            self.started.setdefault(metric, timestamp)
+            for window in windows:
+                window.add(timestamp, value)
+
+        events = []
+        for rule, window in self.bound:
+            started = self.started.get(rule.metric)
+            # A window only counts once the monitor has run for its whole length
+            if started is None or timestamp - started < rule.window:
+                continue
+            value = window.value(rule.stat)
+            if value is None:
+                continue
+            change = rule.evaluate(timestamp, value)
+            if change:
+                events.append(AlertEvent(timestamp, change, rule.text, value))
+        return events
+
+    def firing(self):
+        """
+        Rules currently firing.
+
+        Returns:
+            list: AlertRule objects
+        """
+        return [rule for rule in self.rules if rule.state == "firing"]
@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Log Analyzer
+
+Bulk-loads the monitor's CSV files (logs/system_usage_*.csv) into NumPy arrays
+and reports, per metric and across all files:
+
+- count, min, mean, max and percentiles
+- the highest moving average over a time window, optionally writing the
+  whole moving-average series to a CSV file
+- intervals where a metric stayed above a threshold
+
+Both CSV schemas are understood. The oldest files have "Timestamp,CPU,Memory"
+with values like "CPU:24.0%"; newer ones have numeric "CPU_Usage,Memory_Usage"
+columns, plus any extra metric columns. Files are read in chunks of rows and
+every statistic is updated chunk by chunk, so the amount of history analyzed
+isn't limited by memory. Percentiles are exact for metrics with few distinct
+values (the monitor writes one decimal, so the analyzer counts how often each
+value occurs); metrics with many, such as bytes per second, switch to the
+rollups' log-bucket sketch, which stays small at about 1% error.
+"""
+
+import io
+import os
+import re
+import sys
+import glob
+import json
+import math
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from monitor_rollup import SKETCH_GAMMA, QuantileSketch, parse_duration
+
+# Rows gathered before the statistics are updated
+CHUNK_ROWS = 1000000
+
+# Bytes read from one file at a time
+READ_BYTES = 16 * 1024 * 1024
+
+# A metric with more distinct values than this gets a sketch instead of exact counts
+MAX_EXACT_VALUES = 10000
+
+# Header names of both schemas -> metric name
+COLUMN_ALIASES = {"cpu": "cpu", "cpu_usage": "cpu", "memory": "memory", "memory_usage": "memory"}
+
+# "CPU:24.0%" style cells of the old schema
+LABELLED_CELL = re.compile(rb",[A-Za-z_]+:")
+
+
+def find_csv_files(paths):
+    """
+    Expand files, directories and glob patterns into monitor CSV files.
+
+    Args:
+        paths (list): Files, directories (searched for system_usage_*.csv)
+            or glob patterns
+
+    Returns:
+        list: CSV paths; the timestamped names sort oldest first
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += glob.glob(os.path.join(path, "system_usage_*.csv"))
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            found += glob.glob(path)
+    return sorted(set(found), key=lambda p: (os.path.basename(p), p))
+
+
+def read_schema(header):
+    """
+    Map the columns of a CSV header to metric names.
+
+    Args:
+        header (str): First line of the file
+
+    Returns:
+        list: Metric name of every column after the timestamp
+
+    Raises:
+        ValueError: If the first column isn't a timestamp
+    """
+    names = [name.strip() for name in header.strip().split(",")]
+    if not names or names[0].lower() != "timestamp":
+        raise ValueError(f"Not a monitor log (header {header.strip()!r})")
+    return [COLUMN_ALIASES.get(name.lower(), name.lower()) for name in names[1:]]
+
+
+def _parse_block(data, column_count):
+    """Parse CSV rows (no header) into epoch seconds and a 2-D value array."""
+    # Old schema: drop the "CPU:" labels and "%" signs, leaving plain numbers
+    first_row = data[:data.find(b"\n")]
+    if b":" in first_row.partition(b",")[2]:
+        data = LABELLED_CELL.sub(b",", data).replace(b"%", b"")
+
+    # Empty cells (metrics that weren't sampled yet) become NaN
+    if b",," in data or b",\n" in data:
+        data = data.replace(b",,", b",nan,").replace(b",,", b",nan,").replace(b",\n", b",nan\n")
+    values = np.loadtxt(io.BytesIO(data), usecols=range(1, column_count + 1), delimiter=",",
+                        ndmin=2)
+    stamps = np.loadtxt(io.BytesIO(data), usecols=(0,), dtype="U23", delimiter=",", ndmin=1)
+    seconds = stamps.astype("datetime64[ms]").astype(np.int64) / 1000.0
+    return seconds, values
+
+
+def _parse_lines_safely(lines, column_count):
+    """Parse lines, skipping ones that are cut off or damaged (e.g. after a crash)."""
+    try:
+        seconds, values = _parse_block(b"\n".join(lines) + b"\n", column_count)
+        return seconds, values, 0
+    except ValueError:
+        if len(lines) == 1:
+            return np.empty(0), np.empty((0, column_count)), 1
+    # Halve until the bad lines are isolated; usually it's only the last one
+    middle = len(lines) // 2
+    first = _parse_lines_safely(lines[:middle], column_count)
+    second = _parse_lines_safely(lines[middle:], column_count)
+    return (np.concatenate([first[0], second[0]]), np.concatenate([first[1], second[1]]),
+            first[2] + second[2])
+
+
+def iter_chunks(paths, chunk_rows=CHUNK_ROWS, read_bytes=READ_BYTES, stats=None):
+    """
+    Read CSV files in chunks of rows.
+
+    Args:
+        paths (list): CSV files, oldest first
+        chunk_rows (int): Rows gathered per chunk (a chunk may hold a few
+            more, since blocks are never split)
+        read_bytes (int): Bytes read from a file at a time
+        stats (dict, optional): "files", "rows" and "skipped_lines" counts
+            are added to this mapping
+
+    Yields:
+        tuple: (seconds, {metric: values}) with epoch seconds (local time
+            as written in the file) and float64 arrays of equal length;
+            metrics missing from a file are NaN
+    """
+    stats = stats if stats is not None else {}
+    pending = []
+    pending_rows = 0
+
+    def flush():
+        metrics = []
+        for _, columns, _ in pending:
+            metrics += [name for name in columns if name not in metrics]
+        seconds = np.concatenate([block[0] for block in pending])
+        merged = {}
+        for metric in metrics:
+            parts = []
+            for block_seconds, columns, values in pending:
+                if metric in columns:
+                    parts.append(values[:, columns.index(metric)])
+                else:
+                    parts.append(np.full(len(block_seconds), np.nan))
+            merged[metric] = np.concatenate(parts)
+        return seconds, merged
+
+    for path in paths:
+        with open(path, "rb") as f:
+            try:
+                columns = read_schema(f.readline().decode("utf-8", errors="replace"))
+            except ValueError:
+                continue
+            stats["files"] = stats.get("files", 0) + 1
+
+            while True:
+                # Read whole lines only
+                data = f.read(read_bytes)
+                if not data:
+                    break
+                data += f.readline()
+                if not data.strip():
+                    continue
+                if not data.endswith(b"\n"):
+                    data += b"\n"
+                try:
+                    seconds, values = _parse_block(data, len(columns))
+                except ValueError:
+                    lines = [line for line in data.splitlines() if line.strip()]
+                    seconds, values, skipped = _parse_lines_safely(lines, len(columns))
+                    stats["skipped_lines"] = stats.get("skipped_lines", 0) + skipped
+                if not len(seconds):
+                    continue
+
+                pending.append((seconds, columns, values))
+                pending_rows += len(seconds)
+                stats["rows"] = stats.get("rows", 0) + len(seconds)
+                if pending_rows >= chunk_rows:
+                    yield flush()
+                    pending, pending_rows = [], 0
+
+    if pending:
+        yield flush()
+
+
+class ValueCounter:
+    """
+    Distribution of values written with one decimal.
+
+    Occurrences of each value are counted exactly until there are more than
+    `max_exact` distinct ones (e.g. bytes per second); from then on the
+    values go into a fixed-size log-bucket sketch, so memory stays bounded
+    however much history is read.
+    """
+
+    def __init__(self, max_exact=MAX_EXACT_VALUES):
+        """Initialize an empty distribution."""
+        # Value * 10 -> occurrences, until the sketch takes over
+        self.counts = {}
+        self.max_exact = max_exact
+        self.sketch = None
+        self.total = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Add an array of values (NaN is ignored)."""
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        if self.sketch is None:
+            keys, counts = np.unique(np.round(values * 10).astype(np.int64), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.counts[key] = self.counts.get(key, 0) + count
+            if len(self.counts) > self.max_exact:
+                self._start_sketch()
+        else:
+            self._add_to_sketch(values)
+        self.total += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def percentiles(self, wanted):
+        """
+        Percentiles of everything added so far.
+
+        Args:
+            wanted (list): Percentiles between 0 and 100
+
+        Returns:
+            dict: Percentile -> value (nearest rank, like NumPy's "lower")
+        """
+        if not self.total:
+            return {}
+        if self.sketch is not None:
+            return {percentile: self.sketch.quantile(percentile / 100) for percentile in wanted}
+        keys = np.array(sorted(self.counts))
+        cumulative = np.cumsum([self.counts[key] for key in keys])
+        result = {}
+        for percentile in wanted:
+            rank = int(np.floor(percentile / 100 * (self.total - 1)))
+            result[percentile] = float(keys[np.searchsorted(cumulative, rank, side="right")]) / 10
+        return result
+
+    def _start_sketch(self):
+        """Move the exact counts into a sketch and keep using that."""
+        keys = np.array(list(self.counts), dtype=np.int64)
+        counts = np.array(list(self.counts.values()), dtype=np.int64)
+        self.sketch = QuantileSketch()
+        self._add_to_sketch(keys / 10, counts)
+        self.counts = {}
+
+    def _add_to_sketch(self, values, counts=None):
+        """Count values (each `counts` times, if given) in the sketch, vectorized."""
+        if counts is None:
+            counts = np.ones(len(values), dtype=np.int64)
+        positive = values > 0
+        self.sketch.zeros += int(counts[~positive].sum())
+        self.sketch.count += int(counts.sum())
+        # Same buckets as QuantileSketch.add: ceil(log_gamma(value))
+        keys = np.ceil(np.log(values[positive]) / math.log(SKETCH_GAMMA)).astype(np.int64)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse, weights=counts[positive]).astype(np.int64)
+        bins = self.sketch.bins
+        for key, count in zip(keys.tolist(), sums.tolist()):
+            bins[key] = bins.get(key, 0) + count
+
+
+class MovingAverage:
+    """Time-window moving average carried across chunks."""
+
+    def __init__(self, window, max_gap=60.0, output=None):
+        """
+        Initialize the average.
+
+        Args:
+            window (float): Window length in seconds
+            max_gap (float): A window only counts towards the peak if the
+                monitor was already running this close to its start
+            output (file, optional): Text file the (time, average) series is
+                written to
+        """
+        self.window = window
+        self.max_gap = max_gap
+        self.output = output
+        self._seconds = np.empty(0)
+        self._values = np.empty(0)
+        self.peak = None
+        self.peak_time = None
+
+    def update(self, seconds, values):
+        """
+        Add a chunk and compute the average at each of its samples.
+
+        Returns:
+            numpy.ndarray: Average of the window ending at every sample
+        """
+        carried = len(self._seconds)
+        seconds = np.concatenate([self._seconds, seconds])
+        values = np.concatenate([self._values, values])
+        valid = ~np.isnan(values)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+        counts = np.concatenate([[0], np.cumsum(valid)])
+
+        ends = np.arange(carried, len(seconds)) + 1
+        starts = np.searchsorted(seconds, seconds[carried:] - self.window, side="right")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = (sums[ends] - sums[starts]) / (counts[ends] - counts[starts])
+
+        # Windows right after the monitor started hold only a few samples and
+        # would make the peak meaningless
+        full = starts > 0
+        full[full] = seconds[starts[full]] - seconds[starts[full] - 1] <= self.max_gap
+        candidates = np.where(full, averages, np.nan)
+        if not np.all(np.isnan(candidates)):
+            best = int(np.nanargmax(candidates))
+            if self.peak is None or candidates[best] > self.peak:
+                self.peak = float(candidates[best])
+                self.peak_time = float(seconds[carried + best])
+        if self.output is not None:
+            self._write(seconds[carried:], averages)
+
+        # Keep what the next chunk's windows can still reach, plus the sample before
+        keep = max(0, np.searchsorted(seconds, seconds[-1] - self.window, side="right") - 1)
+        self._seconds, self._values = seconds[keep:], values[keep:]
+        return averages
+
+    def _write(self, seconds, averages):
+        unit = "ms" if np.any(seconds % 1) else "s"
+        stamps = np.datetime_as_string((seconds * 1000).round().astype("datetime64[ms]"), unit=unit)
+        cells = np.where(np.isnan(averages), "", np.char.mod("%.2f", averages))
+        np.savetxt(self.output, np.column_stack([np.char.replace(stamps, "T", " "), cells]),
+                   fmt="%s", delimiter=",")
+
+
+class BreachTracker:
+    """Intervals where a metric stayed above a threshold, across chunks."""
+
+    def __init__(self, threshold, max_gap=60.0, min_duration=0.0):
+        """
+        Initialize the tracker.
+
+        Args:
+            threshold (float): Values strictly above this are breaches
+            max_gap (float): Samples further apart than this (e.g. the
+                monitor was stopped) end an interval
+            min_duration (float): Intervals shorter than this are dropped
+        """
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.min_duration = min_duration
+        self.intervals = []
+        # Interval still open at the end of the last chunk
+        self._open = None
+        self._last_time = -np.inf
+
+    def _close(self):
+        interval, self._open = self._open, None
+        if interval and interval["end"] - interval["start"] >= self.min_duration:
+            interval["duration"] = interval["end"] - interval["start"]
+            interval["mean"] = round(interval.pop("sum") / interval["samples"], 3)
+            self.intervals.append(interval)
+
+    def update(self, seconds, values):
+        """Add a chunk of samples in time order."""
+        if not len(seconds):
+            return
+        above = values > self.threshold
+        gap = np.diff(seconds, prepend=self._last_time) > self.max_gap
+        # A breaching sample continues the run of the sample before it,
+        # unless the monitor wasn't running in between
+        previous = np.concatenate([[self._open is not None], above[:-1]])
+        continues = above & previous & ~gap
+        if self._open is not None and not continues[0]:
+            self._close()
+
+        begins = np.flatnonzero(above & ~continues).tolist()
+        ends = np.flatnonzero(above & ~np.append(continues[1:], False)).tolist()
+        if continues[0]:
+            begins.insert(0, 0)
+        for begin, end in zip(begins, ends):
+            segment = values[begin:end + 1]
+            if self._open is None:
+                self._open = {"start": float(seconds[begin]), "end": None, "duration": 0.0,
+                              "peak": -np.inf, "mean": None, "samples": 0, "sum": 0.0}
+            self._open["end"] = float(seconds[end])
+            self._open["peak"] = max(self._open["peak"], float(segment.max()))
+            self._open["sum"] += float(segment.sum())
+            self._open["samples"] += len(segment)
+            # A run reaching the end of the chunk may go on in the next one
+            if end < len(seconds) - 1:
+                self._close()
+        self._last_time = float(seconds[-1])
+
+    def finish(self):
+        """
+        Close the interval still open at the end of the data.
+
+        Returns:
+            list: Breach intervals as dicts with start, end, duration, peak,
+                mean and samples
+        """
+        self._close()
+        return self.intervals
+
+
+def format_time(seconds):
+    """Format epoch seconds from iter_chunks as written in the CSV files."""
+    moment = np.datetime64(int(round(seconds * 1000)), "ms")
+    return np.datetime_as_string(moment, unit="ms" if seconds % 1 else "s").replace("T", " ")
+
+
+def analyze(paths, metrics=None, percentiles=(50, 90, 95, 99), window=300.0,
+            thresholds=None, max_gap=60.0, min_duration=0.0, chunk_rows=CHUNK_ROWS,
+            average_dir=None):
+    """
+    Compute statistics over all samples of the given CSV files.
+
+    Args:
+        paths (list): CSV files, oldest first
+        metrics (list, optional): Metrics to analyze (default: all found)
+        percentiles (tuple): Percentiles to report
+        window (float): Moving average window in seconds
+        thresholds (dict, optional): Metric -> threshold for breach intervals
+        max_gap (float): Longest pause between samples inside one interval
+        min_duration (float): Shortest breach interval reported
+        chunk_rows (int): Rows loaded into memory at once
+        average_dir (str, optional): Directory the moving averages are
+            written to, one moving_average_<metric>.csv per metric
+
+    Returns:
+        dict: "files", "rows", "skipped_lines", "start", "end" and per-metric
+            results under "metrics"
+    """
+    thresholds = thresholds or {}
+    stats = {}
+    counters, averages, breaches, outputs = {}, {}, {}, []
+    start = end = None
+
+    def track(metric):
+        output = None
+        if average_dir:
+            output = open(os.path.join(average_dir, f"moving_average_{metric}.csv"), "w")
+            output.write("Timestamp,Average\n")
+            outputs.append(output)
+        counters[metric] = ValueCounter()
+        averages[metric] = MovingAverage(window, max_gap, output)
+        if metric in thresholds:
+            breaches[metric] = BreachTracker(thresholds[metric], max_gap, min_duration)
+
+    try:
+        for seconds, columns in iter_chunks(paths, chunk_rows, stats=stats):
+            # Files are sorted by name, which is their start time; keep the
+            # rows in time order in case files overlap
+            if np.any(np.diff(seconds) < 0):
+                order = np.argsort(seconds, kind="stable")
+                seconds = seconds[order]
+                columns = {name: values[order] for name, values in columns.items()}
+            start = seconds[0] if start is None else min(start, seconds[0])
+            end = seconds[-1] if end is None else max(end, seconds[-1])
+
+            for metric, values in columns.items():
+                if metrics and metric not in metrics:
+                    continue
+                if metric not in counters:
+                    track(metric)
+                counters[metric].update(values)
+                averages[metric].update(seconds, values)
+                if metric in breaches:
+                    breaches[metric].update(seconds, values)
+    finally:
+        for output in outputs:
+            output.close()
+
+    results = {}
+    for metric, counter in counters.items():
+        result = {"count": counter.total}
+        if counter.total:
+            result.update(min=counter.min, mean=round(counter.sum / counter.total, 3), max=counter.max,
+                          percentiles=counter.percentiles(percentiles))
+        average = averages[metric]
+        if average.peak is not None:
+            result["peak_average"] = {"value": round(average.peak, 3), "time": format_time(average.peak_time)}
+        if metric in breaches:
+            result["threshold"] = thresholds[metric]
+            result["breaches"] = [dict(interval, start=format_time(interval["start"]),
+                                       end=format_time(interval["end"]))
+                                  for interval in breaches[metric].finish()]
+        results[metric] = result
+
+    return {"files": stats.get("files", 0), "rows": stats.get("rows", 0),
+            "skipped_lines": stats.get("skipped_lines", 0),
+            "start": format_time(start) if start is not None else None,
+            "end": format_time(end) if end is not None else None,
+            "window": window, "metrics": results}
+
+
+def print_report(report, max_breaches=20):
+    """Print the result of analyze() as text."""
+    print(f"{report['files']} file(s), {report['rows']} row(s)"
+          + (f" from {report['start']} to {report['end']}" if report["rows"] else ""))
+    if report["skipped_lines"]:
+        print(f"Skipped {report['skipped_lines']} damaged line(s)")
+
+    for metric, result in report["metrics"].items():
+        print(f"\n{metric}")
+        if not result["count"]:
+            print("  no samples")
+            continue
+        print(f"  samples: {result['count']}  min: {result['min']:.1f}  "
+              f"mean: {result['mean']:.2f}  max: {result['max']:.1f}")
+        print("  " + "  ".join(f"p{percentile:g}: {value:.1f}"
+                               for percentile, value in result["percentiles"].items()))
+        if "peak_average" in result:
+            peak = result["peak_average"]
+            print(f"  highest {report['window']:g}s average: {peak['value']:.2f} "
+                  f"(window ending {peak['time']})")
+        if "breaches" in result:
+            intervals = result["breaches"]
+            total = sum(interval["duration"] for interval in intervals)
+            print(f"  above {result['threshold']:g}: {len(intervals)} interval(s), "
+                  f"{total:.0f}s in total")
+            for interval in intervals[:max_breaches]:
+                print(f"    {interval['start']} - {interval['end']}  "
+                      f"{interval['duration']:.0f}s  peak {interval['peak']:.1f}  "
+                      f"mean {interval['mean']:.1f}")
+            if len(intervals) > max_breaches:
+                print(f"    ... {len(intervals) - max_breaches} more (use --json for all)")
+
+
+def parse_threshold(text):
+    """Parse a METRIC=VALUE threshold option."""
+    metric, separator, value = text.partition("=")
+    try:
+        if not separator:
+            raise ValueError
+        return COLUMN_ALIASES.get(metric.strip().lower(), metric.strip().lower()), float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid threshold: {text}. Use e.g. cpu=90.")
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Analyze the monitor's CSV logs")
+    parser.add_argument("paths", nargs="*", default=["logs"],
+                        help="CSV files, directories or glob patterns (default: logs)")
+    parser.add_argument("--metric", action="append",
+                        help="Only analyze this metric, e.g. cpu (repeatable; default: all)")
+    parser.add_argument("--percentiles", default="50,90,95,99",
+                        help="Comma-separated percentiles (default: 50,90,95,99)")
+    parser.add_argument("--window", default="5m",
+                        help="Moving average window, e.g. 30s, 5m, 1h (default: 5m)")
+    parser.add_argument("--threshold", action="append", type=parse_threshold, default=[],
+                        metavar="METRIC=VALUE",
+                        help="Report intervals where METRIC was above VALUE (repeatable)")
+    parser.add_argument("--max-gap", default="1m",
+                        help="Pause between samples that ends an interval (default: 1m)")
+    parser.add_argument("--min-duration", default="0",
+                        help="Hide breach intervals shorter than this (default: 0)")
+    parser.add_argument("--average-out", metavar="DIR",
+                        help="Write the moving averages to DIR/moving_average_<metric>.csv")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help=f"Rows loaded into memory at once (default: {CHUNK_ROWS})")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("the analyzer needs NumPy (pip install numpy)")
+    try:
+        percentiles = [float(value) for value in args.percentiles.split(",") if value.strip()]
+        window = parse_duration(args.window)
+        max_gap = parse_duration(args.max_gap)
+        min_duration = parse_duration(args.min_duration)
+    except ValueError as e:
+        parser.error(str(e))
+    if window <= 0 or args.chunk_rows <= 0 or not all(0 <= p <= 100 for p in percentiles):
+        parser.error("--window and --chunk-rows must be positive, percentiles 0-100")
+
+    paths = find_csv_files(args.paths)
+    if not paths:
+        print(f"No CSV files found in {', '.join(args.paths)}")
+        sys.exit(1)
+    if args.average_out:
+        os.makedirs(args.average_out, exist_ok=True)
+
+    metrics = [COLUMN_ALIASES.get(name.lower(), name.lower()) for name in args.metric or []]
+    report = analyze(paths, metrics, percentiles, window, dict(args.threshold), max_gap,
+                     min_duration, args.chunk_rows, args.average_out)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
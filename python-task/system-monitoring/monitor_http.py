@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Metrics Endpoint
+
+Keeps the most recent samples in a fixed-size in-memory ring buffer and serves
+them over HTTP, so scrapers don't have to read and parse the log files:
+
+- /metrics   latest sample in the Prometheus text format
+- /json      buffered samples as JSON (?last=N or ?since=UNIX_TIME)
+- /healthz   "ok"
+
+The server runs on its own daemon threads and only reads the buffer. The
+sampling loop never waits on a scrape: appending a sample is a list store
+under a lock held for a few instructions. Response bodies are rendered at
+most once per new sample and reused, so a scrape between two samples costs
+a cache lookup and a socket write.
+"""
+
+import re
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Samples kept in memory (an hour at the default 5-second interval)
+BUFFER_SIZE = 720
+
+HTTP_HOST = "127.0.0.1"
+
+# Rendered responses kept per sample (distinct URLs)
+CACHED_RESPONSES = 16
+
+# Metric -> (Prometheus name, help text); other metrics get "system_<metric>"
+PROMETHEUS_NAMES = {
+    "cpu": ("system_cpu_usage_percent", "CPU usage in % across all cores"),
+    "memory": ("system_memory_usage_percent", "Memory usage in %"),
+    "disk_read_bps": ("system_disk_read_bytes_per_second", "Disk read throughput"),
+    "disk_write_bps": ("system_disk_write_bytes_per_second", "Disk write throughput"),
+    "net_sent_bps": ("system_network_sent_bytes_per_second", "Network send throughput"),
+    "net_recv_bps": ("system_network_received_bytes_per_second", "Network receive throughput"),
+}
+
+# Per-core metrics (cpu0, cpu1, ...) share one name with a "core" label
+CORE_METRIC = re.compile(r"cpu(\d+)$")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class SampleBuffer:
+    """Fixed-size ring of the most recent samples."""
+
+    def __init__(self, columns, capacity=BUFFER_SIZE):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            columns (list): Metric names, in the order of the sample values
+            capacity (int): Samples kept before the oldest are overwritten
+        """
+        self.columns = list(columns)
+        self.capacity = max(1, capacity)
+        self.slots = [None] * self.capacity
+        self.written = 0
+        self.lock = threading.Lock()
+        # Rendered responses, reused until the next sample arrives
+        self._cache = {}
+
+    def append(self, timestamp, values):
+        """
+        Store one sample, overwriting the oldest once the buffer is full.
+
+        Args:
+            timestamp (float): Wall-clock time of the sample
+            values (list): One value (or None) per column
+        """
+        sample = (timestamp, tuple(values))
+        with self.lock:
+            self.slots[self.written % self.capacity] = sample
+            self.written += 1
+
+    def snapshot(self):
+        """
+        Copy the buffered samples.
+
+        Returns:
+            tuple: (samples written so far, list of (timestamp, values),
+                oldest first)
+        """
+        with self.lock:
+            written = self.written
+            if written <= self.capacity:
+                samples = self.slots[:written]
+            else:
+                start = written % self.capacity
+                samples = self.slots[start:] + self.slots[:start]
+        return written, samples
+
+    def latest(self):
+        """
+        The newest sample.
+
+        Returns:
+            tuple: (timestamp, values), or None before the first sample
+        """
+        with self.lock:
+            if not self.written:
+                return None
+            return self.slots[(self.written - 1) % self.capacity]
+
+    def cached(self, key, render):
+        """
+        Return a rendered response, rendering it only once per sample.
+
+        Args:
+            key: Identifies the kind of response (e.g. the URL)
+            render (callable): Builds the body (bytes) if it isn't cached
+
+        Returns:
+            bytes: The body
+        """
+        written = self.written
+        hit = self._cache.get(key)
+        if hit and hit[0] == written:
+            return hit[1]
+        body = render()
+        # Drop responses for older samples; odd one-off queries aren't kept
+        cache = {k: v for k, v in self._cache.items() if v[0] == written}
+        if len(cache) < CACHED_RESPONSES:
+            cache[key] = (written, body)
+        self._cache = cache
+        return body
+
+
+def prometheus_name(metric):
+    """
+    Prometheus name, labels and help text of a metric.
+
+    Args:
+        metric (str): Metric name as used in the log file
+
+    Returns:
+        tuple: (name, label string such as '{core="0"}' or "", help text)
+    """
+    if metric in PROMETHEUS_NAMES:
+        name, help_text = PROMETHEUS_NAMES[metric]
+        return name, "", help_text
+    core = CORE_METRIC.match(metric)
+    if core:
+        return "system_cpu_core_usage_percent", f'{{core="{core.group(1)}"}}', "CPU usage in % per core"
+    name = "system_" + re.sub(r"[^a-zA-Z0-9_]", "_", metric)
+    return name, "", metric
+
+
+def prometheus_value(value):
+    """Sample value in the exposition format, with every digit of the float kept."""
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def render_prometheus(buffer):
+    """
+    Render the newest sample in the Prometheus text format.
+
+    Args:
+        buffer (SampleBuffer): Sample source
+
+    Returns:
+        bytes: The exposition text
+    """
+    with buffer.lock:
+        written = buffer.written
+        latest = buffer.slots[(written - 1) % buffer.capacity] if written else None
+    lines = ["# HELP system_monitor_samples_total Samples taken since the monitor started",
+             "# TYPE system_monitor_samples_total counter",
+             f"system_monitor_samples_total {written}"]
+    if latest:
+        timestamp, values = latest
+        lines += ["# HELP system_monitor_last_sample_timestamp_seconds Time of the newest sample",
+                  "# TYPE system_monitor_last_sample_timestamp_seconds gauge",
+                  f"system_monitor_last_sample_timestamp_seconds {timestamp:.3f}"]
+        described = set()
+        for metric, value in zip(buffer.columns, values):
+            if value is None:
+                continue
+            name, labels, help_text = prometheus_name(metric)
+            if name not in described:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                described.add(name)
+            lines.append(f"{name}{labels} {prometheus_value(value)}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def render_json(buffer, last=None, since=None):
+    """
+    Render buffered samples as JSON.
+
+    Args:
+        buffer (SampleBuffer): Sample source
+        last (int, optional): Only the newest `last` samples
+        since (float, optional): Only samples taken after this Unix time
+
+    Returns:
+        bytes: {"columns": [...], "samples": [[timestamp, value, ...], ...]}
+    """
+    written, samples = buffer.snapshot()
+    if since is not None:
+        samples = [sample for sample in samples if sample[0] > since]
+    if last is not None:
+        samples = samples[-last:] if last > 0 else []
+    body = {"columns": buffer.columns, "written": written,
+            "samples": [[round(timestamp, 3), *values] for timestamp, values in samples]}
+    return json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the buffer of the MetricsServer it belongs to."""
+
+    # Keep-alive lets a scraper reuse its connection; without Nagle's
+    # algorithm the body doesn't wait for the ACK of the headers (~40 ms)
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        buffer = self.server.buffer
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            body = buffer.cached("metrics", lambda: render_prometheus(buffer))
+            self._send(200, PROMETHEUS_CONTENT_TYPE, body)
+        elif url.path == "/json":
+            query = parse_qs(url.query)
+            try:
+                last = int(query["last"][0]) if "last" in query else None
+                since = float(query["since"][0]) if "since" in query else None
+            except ValueError:
+                self._send(400, "text/plain", b"last must be an integer, since a Unix time\n")
+                return
+            body = buffer.cached(("json", last, since), lambda: render_json(buffer, last, since))
+            self._send(200, "application/json", body)
+        elif url.path == "/healthz":
+            self._send(200, "text/plain", b"ok\n")
+        else:
+            self._send(404, "text/plain", b"Try /metrics, /json or /healthz\n")
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the monitor's console
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """HTTP server for a SampleBuffer, running on background threads."""
+
+    daemon_threads = True
+
+    def __init__(self, buffer, port, host=HTTP_HOST):
+        """
+        Bind the server; call start() to begin serving.
+
+        Args:
+            buffer (SampleBuffer): Samples to serve
+            host (str): Address to listen on (local only by default)
+            port (int): Port to listen on (0 picks a free one)
+        """
+        super().__init__((host, port), MetricsHandler)
+        self.buffer = buffer
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base URL the server is reachable at."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a daemon thread."""
+        self.thread = threading.Thread(target=self.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self.thread:
+            self.shutdown()
+            self.thread = None
+        self.server_close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Metric Families
+
+Each metric family (CPU, per-core CPU, memory, disk I/O, network) is sampled
+on its own. None of the samplers block: CPU usage is psutil's delta since the
+previous call (cpu_percent(interval=None)), and disk and network rates are the
+counter deltas divided by the time between two samples.
+"""
+
+import time
+
+import psutil
+
+METRIC_FAMILIES = {}
+
+
+def register_family(family_class):
+    """
+    Class decorator adding a MetricFamily subclass to the registry.
+
+    Args:
+        family_class (type): MetricFamily subclass with a unique `name`
+
+    Returns:
+        type: The same class, so it can be used as a decorator
+    """
+    METRIC_FAMILIES[family_class.name] = family_class
+    return family_class
+
+
+class MetricFamily:
+    """Base class for a group of metrics sampled together."""
+
+    name = None
+    description = ""
+    # Names of the metrics sample() returns
+    metrics = []
+
+    def __init__(self):
+        """Take the first reading so the first sample already has a delta."""
+        self.prime()
+
+    @classmethod
+    def metric_names(cls):
+        """
+        Names of the metrics this family reports (known before it's started).
+
+        Returns:
+            list: Metric names, in the order they should be shown
+        """
+        return list(cls.metrics)
+
+    def prime(self):
+        """Record the starting point of delta-based metrics."""
+
+    def sample(self):
+        """
+        Read the current values.
+
+        Returns:
+            dict: Mapping of metric name to value
+        """
+        raise NotImplementedError
+
+
+@register_family
+class CpuFamily(MetricFamily):
+    """Overall CPU usage since the previous sample."""
+
+    name = "cpu"
+    description = "CPU usage in % across all cores"
+    metrics = ["cpu"]
+
+    def prime(self):
+        psutil.cpu_percent(interval=None)
+
+    def sample(self):
+        return {"cpu": psutil.cpu_percent(interval=None)}
+
+
+@register_family
+class PerCoreFamily(MetricFamily):
+    """CPU usage of every core since the previous sample."""
+
+    name = "percpu"
+    description = "CPU usage in % of each core"
+
+    @classmethod
+    def metric_names(cls):
+        return [f"cpu{core}" for core in range(psutil.cpu_count() or 1)]
+
+    def prime(self):
+        # Per-core deltas are tracked separately from the overall figure
+        psutil.cpu_percent(interval=None, percpu=True)
+
+    def sample(self):
+        usage = psutil.cpu_percent(interval=None, percpu=True)
+        return {f"cpu{core}": value for core, value in enumerate(usage)}
+
+
+@register_family
+class MemoryFamily(MetricFamily):
+    """Share of physical memory in use."""
+
+    name = "memory"
+    description = "Memory usage in %"
+    metrics = ["memory"]
+
+    def sample(self):
+        return {"memory": psutil.virtual_memory().percent}
+
+
+class CounterRateFamily(MetricFamily):
+    """Per-second rates computed from cumulative psutil counters."""
+
+    # Counter attribute -> metric name
+    counters = {}
+
+    @classmethod
+    def metric_names(cls):
+        return list(cls.counters.values())
+
+    def read_counters(self):
+        """Return the psutil counters object, or None if unavailable."""
+        raise NotImplementedError
+
+    def prime(self):
+        self._last = self.read_counters()
+        self._last_time = time.monotonic()
+
+    def sample(self):
+        counters = self.read_counters()
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        rates = {}
+        for attribute, metric in self.counters.items():
+            if counters is None or self._last is None or elapsed <= 0:
+                rates[metric] = 0.0
+                continue
+            # Counters can wrap or reset (e.g. a disk is replaced); never go negative
+            delta = getattr(counters, attribute) - getattr(self._last, attribute)
+            rates[metric] = max(0, delta) / elapsed
+        self._last, self._last_time = counters, now
+        return rates
+
+
+@register_family
+class DiskFamily(CounterRateFamily):
+    """Disk read and write throughput."""
+
+    name = "disk"
+    description = "Disk read/write in bytes per second"
+    counters = {"read_bytes": "disk_read_bps", "write_bytes": "disk_write_bps"}
+
+    def read_counters(self):
+        return psutil.disk_io_counters()
+
+
+@register_family
+class NetworkFamily(CounterRateFamily):
+    """Network send and receive throughput."""
+
+    name = "net"
+    description = "Network sent/received in bytes per second"
+    counters = {"bytes_sent": "net_sent_bps", "bytes_recv": "net_recv_bps"}
+
+    def read_counters(self):
+        return psutil.net_io_counters()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Per-Process Sampling
+
+Finds the processes using the most CPU and memory with one pass over the
+process table per tick. On Linux each process costs a single read of
+/proc/<pid>/stat, which holds its name, CPU time, start time and resident
+memory. Elsewhere psutil.process_iter() prefetches the same attributes,
+reading each process once under oneshot(). CPU usage is the change in a
+process's CPU time since the previous pass, taken from a small per-PID cache
+instead of a second reading. Only the top N by CPU and by resident memory are
+kept, in two bounded heaps, so a host with thousands of processes doesn't
+produce thousands of objects per tick.
+"""
+
+import os
+import sys
+import time
+import heapq
+from collections import namedtuple
+
+import psutil
+
+# Attributes prefetched per process by the psutil fallback
+PROCESS_ATTRS = ["name", "cpu_times", "memory_info", "create_time"]
+
+# Columns of the top-processes CSV file
+TOP_COLUMNS = ["Sort", "Rank", "PID", "Name", "CPU_Percent", "RSS_MB"]
+
+ProcessUsage = namedtuple("ProcessUsage", ["pid", "name", "cpu", "rss"])
+
+
+def scan_proc():
+    """
+    Read every process's /proc/<pid>/stat (Linux only).
+
+    Yields:
+        tuple: (pid, name as bytes, start time, CPU seconds, RSS in bytes);
+            the start time is in clock ticks since boot
+    """
+    ticks = os.sysconf("SC_CLK_TCK")
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    read, close = os.read, os.close
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            fd = os.open(f"/proc/{name}/stat", os.O_RDONLY)
+        except OSError:
+            # The process exited since listdir()
+            continue
+        try:
+            data = read(fd, 4096)
+        except OSError:
+            continue
+        finally:
+            close(fd)
+        # The name is in parentheses and may itself contain spaces or ")"
+        name_end = data.rfind(b")")
+        fields = data[name_end + 2:].split(b" ", 22)
+        yield (int(name), data[data.find(b"(") + 1:name_end], fields[19],
+               (int(fields[11]) + int(fields[12])) / ticks, int(fields[21]) * page_size)
+
+
+def scan_psutil():
+    """
+    Read the process table with psutil (any platform).
+
+    Yields:
+        tuple: Same layout as scan_proc(), with the name as str
+    """
+    # ad_value=None: processes we may not inspect come back without numbers
+    for process in psutil.process_iter(PROCESS_ATTRS, ad_value=None):
+        info = process.info
+        times, memory = info["cpu_times"], info["memory_info"]
+        if times is None or memory is None:
+            continue
+        yield (process.pid, info["name"] or "?", info["create_time"],
+               times.user + times.system, memory.rss)
+
+
+class ProcessSampler:
+    """Top-N processes by CPU and by memory, sampled incrementally."""
+
+    def __init__(self, top=5, scan=None):
+        """
+        Initialize the sampler and take the first reading.
+
+        Args:
+            top (int): Number of processes kept per ranking
+            scan (callable, optional): Process table reader; scan_proc() on
+                Linux, scan_psutil() elsewhere
+        """
+        self.top = top
+        if scan is None:
+            scan = scan_proc if sys.platform.startswith("linux") else scan_psutil
+        self.scan = scan
+        # PID -> (start time, CPU seconds) at the previous pass; the start
+        # time tells a reused PID apart from the process seen before
+        self._last = {}
+        self._last_time = None
+        self.processes = 0
+        self.ticks = 0
+        # CPU seconds this process spent walking the process table
+        self.cost = 0.0
+        self.sample()
+
+    def sample(self):
+        """
+        Walk the process table once.
+
+        Returns:
+            tuple: (top by CPU, top by RSS) as lists of ProcessUsage, highest
+                first; CPU is in % of one core since the previous call (the
+                first call has no CPU ranking yet) and RSS is in bytes
+        """
+        started = time.process_time()
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time is not None else None
+        last = self._last
+        current = {}
+        by_cpu, by_rss = [], []
+
+        for pid, name, start, cpu_seconds, rss in self.scan():
+            current[pid] = (start, cpu_seconds)
+            previous = last.get(pid)
+            if elapsed and previous and previous[0] == start:
+                cpu = max(0.0, cpu_seconds - previous[1]) / elapsed * 100
+                _push(by_cpu, (cpu, pid, name, rss), self.top)
+            _push(by_rss, (rss, pid, name, None), self.top)
+
+        # Exited processes drop out of the cache here
+        self._last, self._last_time = current, now
+        self.processes = len(current)
+        self.ticks += 1
+        self.cost += time.process_time() - started
+
+        top_cpu = [ProcessUsage(pid, _name(name), cpu, rss)
+                   for cpu, pid, name, rss in sorted(by_cpu, reverse=True)]
+        top_rss = [ProcessUsage(pid, _name(name), self._cpu_of(pid, elapsed, last), rss)
+                   for rss, pid, name, _ in sorted(by_rss, reverse=True)]
+        return top_cpu, top_rss
+
+    def _cpu_of(self, pid, elapsed, last):
+        """CPU % of a process between the previous and the current pass."""
+        previous, current = last.get(pid), self._last.get(pid)
+        if not elapsed or not previous or previous[0] != current[0]:
+            return None
+        return max(0.0, current[1] - previous[1]) / elapsed * 100
+
+    def cost_per_tick(self):
+        """
+        Average CPU time of one pass over the process table.
+
+        Returns:
+            float: Seconds
+        """
+        return self.cost / self.ticks if self.ticks else 0.0
+
+
+def _name(name):
+    """Process names from /proc are bytes."""
+    return name.decode("utf-8", errors="replace") if isinstance(name, bytes) else name
+
+
+def _push(heap, entry, size):
+    """Keep the `size` largest entries in a min-heap."""
+    if len(heap) < size:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+class OverheadMeter:
+    """CPU used by the monitor itself, as a share of one core."""
+
+    def __init__(self):
+        """Start measuring now."""
+        self.started = time.monotonic()
+        self.started_cpu = time.process_time()
+        self._last = (self.started, self.started_cpu)
+
+    def total(self):
+        """
+        CPU usage since the meter was created.
+
+        Returns:
+            float: Percent of one core
+        """
+        elapsed = time.monotonic() - self.started
+        return (time.process_time() - self.started_cpu) / elapsed * 100 if elapsed > 0 else 0.0
+
+    def recent(self):
+        """
+        CPU usage since the previous call.
+
+        Returns:
+            float: Percent of one core
+        """
+        now, cpu = time.monotonic(), time.process_time()
+        elapsed = now - self._last[0]
+        usage = (cpu - self._last[1]) / elapsed * 100 if elapsed > 0 else 0.0
+        self._last = (now, cpu)
+        return usage
+
+
+def top_rows(top_cpu, top_rss):
+    """
+    Turn the two rankings into rows for the top-processes CSV file.
+
+    Args:
+        top_cpu (list): ProcessUsage entries by CPU
+        top_rss (list): ProcessUsage entries by RSS
+
+    Returns:
+        list: One list of values per process, matching TOP_COLUMNS
+    """
+    rows = []
+    for sort, ranking in (("cpu", top_cpu), ("rss", top_rss)):
+        for rank, usage in enumerate(ranking, 1):
+            rows.append([sort, rank, usage.pid, usage.name, usage.cpu, usage.rss / 1024 / 1024])
+    return rows
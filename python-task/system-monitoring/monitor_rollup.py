@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Rollups
+
+Keeps round-robin rollups of the samples in logs/rollups/: the raw samples
+plus 1-minute, 1-hour and 1-day buckets holding the count and, for every
+metric, the min, average, max and 95th percentile. Each resolution is a ring
+file (see monitor_writer.RingWriter) sized from its retention, so old buckets
+are overwritten and disk use stays fixed.
+
+Buckets are updated as samples arrive and written when they close. The
+buckets still open when the monitor stops are saved in a small state file and
+picked up again on the next start. Percentiles come from a log-bucket sketch
+with about 1% relative error, so a day's p95 doesn't need every sample of that
+day kept in memory.
+
+Queries read the coarsest resolution that still gives the detail asked for and
+reaches back far enough, so a month of history is a few hundred records, not
+millions of raw samples. Run this file directly to query from the command line.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from datetime import datetime
+
+from monitor_writer import RingReader, RingWriter
+
+ROLLUP_DIR = "rollups"
+STATE_FILE = "state.json"
+
+# Name and bucket width in seconds of every resolution, finest first
+RESOLUTIONS = [("raw", None), ("1m", 60), ("1h", 3600), ("1d", 86400)]
+
+# Default seconds of history kept per resolution
+DEFAULT_RETENTION = {"raw": 86400, "1m": 7 * 86400, "1h": 90 * 86400, "1d": 5 * 365 * 86400}
+
+STATS = ("min", "avg", "max", "p95")
+
+# Queries aim for at most this many points when no step is given
+MAX_POINTS = 500
+
+# Growth factor between sketch buckets; values are kept within ~1% relative error
+SKETCH_GAMMA = 1.02
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+
+
+def parse_duration(text):
+    """
+    Parse a duration such as "90s", "15m", "7d" or "5y".
+
+    Args:
+        text (str): Number with a s, m, h, d, w or y suffix (seconds if none)
+
+    Returns:
+        float: Duration in seconds
+
+    Raises:
+        ValueError: If the duration can't be parsed
+    """
+    text = text.strip().lower()
+    try:
+        if text and text[-1] in DURATION_UNITS:
+            return float(text[:-1]) * DURATION_UNITS[text[-1]]
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Invalid duration: {text}. Use e.g. 90s, 15m, 7d or 5y.")
+
+
+def parse_retention(text):
+    """
+    Parse retention settings such as "raw=2d,1m=30d".
+
+    Args:
+        text (str): Comma separated resolution=duration pairs
+
+    Returns:
+        dict: DEFAULT_RETENTION with the given resolutions overridden
+
+    Raises:
+        ValueError: If a resolution or duration is unknown
+    """
+    retention = dict(DEFAULT_RETENTION)
+    for pair in filter(None, (part.strip() for part in text.split(","))):
+        name, _, duration = pair.partition("=")
+        if name not in retention:
+            raise ValueError(f"Unknown resolution: {name}. Choose from {', '.join(retention)}.")
+        retention[name] = parse_duration(duration)
+    return retention
+
+
+class QuantileSketch:
+    """Log-bucket histogram answering quantiles of non-negative values."""
+
+    def __init__(self):
+        """Initialize an empty sketch."""
+        self.zeros = 0
+        self.bins = {}
+        self.count = 0
+
+    def add(self, value):
+        """
+        Count one value.
+
+        Args:
+            value (float): Value to add; negatives count as zero
+        """
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value, SKETCH_GAMMA))
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Estimated value, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key]
+                return 2 * SKETCH_GAMMA ** key / (SKETCH_GAMMA + 1)
+        return 2 * SKETCH_GAMMA ** max(self.bins) / (SKETCH_GAMMA + 1)
+
+    def to_state(self):
+        """Return the sketch as JSON-friendly data."""
+        return [self.zeros, self.count, list(self.bins.items())]
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a sketch saved with to_state()."""
+        sketch = cls()
+        sketch.zeros, sketch.count = state[0], state[1]
+        sketch.bins = {int(key): count for key, count in state[2]}
+        return sketch
+
+
+class Bucket:
+    """Running aggregates of the samples in one time bucket."""
+
+    def __init__(self, start, metric_count):
+        """
+        Initialize an empty bucket.
+
+        Args:
+            start (float): Epoch second the bucket starts at
+            metric_count (int): Number of metrics per sample
+        """
+        self.start = start
+        self.count = 0
+        self.sums = [0.0] * metric_count
+        self.counts = [0] * metric_count
+        self.mins = [math.inf] * metric_count
+        self.maxes = [-math.inf] * metric_count
+        self.sketches = [QuantileSketch() for _ in range(metric_count)]
+
+    def add(self, values):
+        """Add one sample (None for a metric that wasn't measured)."""
+        self.count += 1
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            self.sums[i] += value
+            self.counts[i] += 1
+            if value < self.mins[i]:
+                self.mins[i] = value
+            if value > self.maxes[i]:
+                self.maxes[i] = value
+            self.sketches[i].add(value)
+
+    def record(self):
+        """
+        The bucket as a ring record.
+
+        Returns:
+            list: count, then min, avg, max and p95 of every metric (None if
+                the metric had no values)
+        """
+        row = [self.count]
+        for i, count in enumerate(self.counts):
+            if count:
+                # The sketch estimate can fall just outside the real range
+                p95 = min(max(self.sketches[i].quantile(0.95), self.mins[i]), self.maxes[i])
+                row += [self.mins[i], self.sums[i] / count, self.maxes[i], p95]
+            else:
+                row += [None] * len(STATS)
+        return row
+
+    def to_state(self):
+        """Return the bucket as JSON-friendly data."""
+        return {"start": self.start, "count": self.count, "sums": self.sums,
+                "counts": self.counts,
+                "mins": [None if math.isinf(v) else v for v in self.mins],
+                "maxes": [None if math.isinf(v) else v for v in self.maxes],
+                "sketches": [sketch.to_state() for sketch in self.sketches]}
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a bucket saved with to_state()."""
+        bucket = cls(state["start"], len(state["sums"]))
+        bucket.count = state["count"]
+        bucket.sums = state["sums"]
+        bucket.counts = state["counts"]
+        bucket.mins = [math.inf if v is None else v for v in state["mins"]]
+        bucket.maxes = [-math.inf if v is None else v for v in state["maxes"]]
+        bucket.sketches = [QuantileSketch.from_state(s) for s in state["sketches"]]
+        return bucket
+
+
+def rollup_columns(metrics):
+    """Ring columns of a rollup resolution for the given metrics."""
+    return ["count"] + [f"{metric}_{stat}" for metric in metrics for stat in STATS]
+
+
+def ring_path(directory, resolution):
+    """Path of the ring file of one resolution."""
+    return os.path.join(directory, f"{resolution}.ring")
+
+
+def _open_ring(path, columns, capacity):
+    """Open a ring file, moving an old one with another layout out of the way."""
+    try:
+        return RingWriter(path, columns, capacity=capacity, flush_interval=60)
+    except ValueError:
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        old_path = f"{path[:-len('.ring')]}.{stamp}.ring"
+        os.replace(path, old_path)
+        print(f"Rollup layout changed; kept the old data as {old_path}")
+        return RingWriter(path, columns, capacity=capacity, flush_interval=60)
+
+
+class RollupStore:
+    """Raw samples plus 1m/1h/1d rollups, each kept for its own retention."""
+
+    def __init__(self, directory, metrics, sample_interval, retention=None):
+        """
+        Open (or create) the rollup rings and restore the open buckets.
+
+        Args:
+            directory (str): Directory the ring files are kept in
+            metrics (list): Metric names, in the order samples give them
+            sample_interval (float): Seconds between samples; sizes the raw ring
+            retention (dict, optional): Seconds of history per resolution
+        """
+        self.directory = directory
+        self.metrics = list(metrics)
+        self.retention = retention or DEFAULT_RETENTION
+        os.makedirs(directory, exist_ok=True)
+
+        self.rings = {}
+        self.widths = {}
+        for name, width in RESOLUTIONS:
+            if name == "raw":
+                capacity = math.ceil(self.retention[name] / sample_interval)
+                columns = self.metrics
+            else:
+                capacity = math.ceil(self.retention[name] / width)
+                columns = rollup_columns(self.metrics)
+                self.widths[name] = width
+            self.rings[name] = _open_ring(ring_path(directory, name), columns, max(1, capacity))
+
+        self.open_buckets = {}
+        self._load_state()
+
+    def _state_path(self):
+        return os.path.join(self.directory, STATE_FILE)
+
+    def _load_state(self):
+        """Restore the buckets that were open when the monitor last stopped."""
+        try:
+            with open(self._state_path(), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("metrics") != self.metrics:
+            return
+        for name, bucket in state.get("buckets", {}).items():
+            if name in self.widths:
+                self.open_buckets[name] = Bucket.from_state(bucket)
+
+    def _save_state(self):
+        """Save the open buckets so the next run can continue them."""
+        state = {"metrics": self.metrics,
+                 "buckets": {name: bucket.to_state() for name, bucket in self.open_buckets.items()}}
+        tmp_path = f"{self._state_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._state_path())
+
+    def add(self, timestamp, values):
+        """
+        Add one sample to every resolution.
+
+        Args:
+            timestamp (float): Wall-clock time of the sample
+            values (list): One value (or None) per metric
+        """
+        self.rings["raw"].write(timestamp, values)
+        closed = False
+        for name, width in self.widths.items():
+            start = timestamp - timestamp % width
+            bucket = self.open_buckets.get(name)
+            if bucket is None or bucket.start != start:
+                if bucket is not None:
+                    self.rings[name].write(bucket.start, bucket.record())
+                    closed = True
+                bucket = self.open_buckets[name] = Bucket(start, len(self.metrics))
+            bucket.add(values)
+        # Save the open 1h/1d buckets every minute, so a crash loses at most
+        # a minute of them instead of everything since the monitor started
+        if closed:
+            self._save_state()
+
+    def close(self):
+        """Flush the rings and save the open buckets."""
+        for ring in self.rings.values():
+            ring.close()
+        self._save_state()
+
+
+def query(directory, metric, start, end, step=None):
+    """
+    Read a metric over a time range from the best resolution.
+
+    The resolution is the coarsest one whose buckets are no wider than
+    `step` and whose history reaches back to `start`; if none reaches that
+    far, the one reaching back furthest is used.
+
+    Args:
+        directory (str): Rollup directory
+        metric (str): Metric name, e.g. "cpu" or "memory"
+        start (float): Range start, epoch seconds
+        end (float): Range end, epoch seconds
+        step (float, optional): Widest bucket wanted in seconds; by default
+            the range split into MAX_POINTS
+
+    Returns:
+        tuple: (resolution name, rows) where rows are (timestamp, count, min,
+            avg, max, p95) tuples in time order
+
+    Raises:
+        ValueError: If no rollup file holds the metric
+    """
+    step = step or max(1.0, (end - start) / MAX_POINTS)
+    candidates = [name for name, width in RESOLUTIONS if width is None or width <= step]
+
+    readers = {}
+    for name in candidates:
+        try:
+            reader = RingReader(ring_path(directory, name))
+        except (OSError, ValueError):
+            continue
+        if metric in reader.columns or f"{metric}_avg" in reader.columns:
+            readers[name] = reader
+    if not readers:
+        raise ValueError(f"No rollups for metric {metric} in {directory}")
+
+    oldest = {}
+    for name, reader in readers.items():
+        stamp = reader.oldest_timestamp()
+        oldest[name] = math.inf if stamp is None else stamp
+
+    # Coarsest first; stop at the first that covers the start of the range
+    chosen = None
+    for name in reversed(list(readers)):
+        if oldest[name] <= start:
+            chosen = name
+            break
+    if chosen is None:
+        chosen = min(readers, key=oldest.get)
+
+    reader = readers[chosen]
+    rows = []
+    if chosen == "raw":
+        column = reader.columns.index(metric) + 1
+        for row in reader.records_between(start, end):
+            value = row[column]
+            if not math.isnan(value):
+                rows.append((row[0], 1, value, value, value, value))
+    else:
+        first = reader.columns.index(f"{metric}_min") + 1
+        for row in reader.records_between(start, end):
+            if not math.isnan(row[first]):
+                rows.append((row[0], int(row[1]), *row[first:first + len(STATS)]))
+
+    for opened in readers.values():
+        opened.close()
+    return chosen, rows
+
+
+def summarize(rows):
+    """
+    Combine query rows into one set of figures.
+
+    Args:
+        rows (list): Rows from query()
+
+    Returns:
+        dict: count, min, avg (count-weighted), max and p95; the p95 is the
+            count-weighted 95th percentile of the bucket p95s, an upper-leaning
+            estimate. Empty if there are no rows.
+    """
+    if not rows:
+        return {}
+    count = sum(row[1] for row in rows)
+    ranked = sorted((row[5], row[1]) for row in rows)
+    target, seen, p95 = 0.95 * count, 0, ranked[-1][0]
+    for value, weight in ranked:
+        seen += weight
+        if seen >= target:
+            p95 = value
+            break
+    return {"count": count, "min": min(row[2] for row in rows),
+            "avg": sum(row[3] * row[1] for row in rows) / count,
+            "max": max(row[4] for row in rows), "p95": p95}
+
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Query the monitor's rollups")
+    parser.add_argument("--dir", default=os.path.join("logs", ROLLUP_DIR),
+                        help="Rollup directory (default: logs/rollups)")
+    parser.add_argument("--metric", default="cpu", help="Metric to read (default: cpu)")
+    parser.add_argument("--since", default="1d", help="How far back to look, e.g. 30d (default: 1d)")
+    parser.add_argument("--step", help="Widest bucket wanted, e.g. 1h (default: range / 500)")
+    parser.add_argument("--rows", action="store_true", help="Print every row, not just the summary")
+    args = parser.parse_args()
+
+    try:
+        end = time.time()
+        start = end - parse_duration(args.since)
+        step = parse_duration(args.step) if args.step else None
+        began = time.perf_counter()
+        resolution, rows = query(args.dir, args.metric, start, end, step)
+        elapsed = time.perf_counter() - began
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.rows:
+        print(f"{'time':<19} {'count':>6} {'min':>8} {'avg':>8} {'max':>8} {'p95':>8}")
+        for stamp, count, low, mean, high, p95 in rows:
+            print(f"{datetime.fromtimestamp(stamp):%Y-%m-%d %H:%M:%S} {count:>6} "
+                  f"{low:>8.1f} {mean:>8.1f} {high:>8.1f} {p95:>8.1f}")
+    summary = summarize(rows)
+    if summary:
+        print(f"{args.metric} over the last {args.since}: min {summary['min']:.1f}  "
+              f"avg {summary['avg']:.1f}  max {summary['max']:.1f}  p95 ~{summary['p95']:.1f}  "
+              f"({summary['count']} samples)")
+    else:
+        print(f"No {args.metric} data in the last {args.since}")
+    print(f"Read {len(rows)} {resolution} rows in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Tick Scheduler
+
+Runs jobs on fixed ticks instead of sleeping a fixed time after each run.
+Tick N of a job is due at start + N * interval, so time spent sampling or
+writing never pushes the schedule back and there is no drift. Ticks are
+aligned to wall-clock multiples of the interval (a 5 s job runs at :00, :05,
+...). A job that falls behind skips straight to its next future tick and the
+skipped ticks are reported instead of being run in a burst.
+"""
+
+import math
+import time
+import threading
+
+
+class ScheduledJob:
+    """One job of the scheduler and its bookkeeping."""
+
+    def __init__(self, name, interval, callback):
+        """
+        Initialize a job.
+
+        Args:
+            name (str): Name used when reporting missed ticks
+            interval (float): Seconds between ticks; may be below 1
+            callback (callable): Called with the wall-clock time of each tick
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval of {name} must be positive")
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        # Monotonic time the next tick is due
+        self.next_due = None
+        self.runs = 0
+        self.missed = 0
+
+
+class TickScheduler:
+    """Drift-free scheduler for jobs with their own intervals."""
+
+    def __init__(self, on_missed=None):
+        """
+        Initialize an empty scheduler.
+
+        Args:
+            on_missed (callable, optional): Called as on_missed(job, count,
+                late_seconds) when a job skips ticks because it fell behind
+        """
+        self.jobs = []
+        self.on_missed = on_missed
+        self._stop = threading.Event()
+        # Wall-clock time at monotonic time zero, to stamp ticks
+        self._wall_offset = time.time() - time.monotonic()
+
+    def add(self, name, interval, callback):
+        """
+        Add a job; its first tick is the next wall-clock multiple of interval.
+
+        Args:
+            name (str): Name used when reporting missed ticks
+            interval (float): Seconds between ticks
+            callback (callable): Called with the wall-clock time of each tick
+
+        Returns:
+            ScheduledJob: The new job
+        """
+        job = ScheduledJob(name, interval, callback)
+        now = time.monotonic()
+        job.next_due = now + interval - (now + self._wall_offset) % interval
+        self.jobs.append(job)
+        return job
+
+    def run_pending(self):
+        """
+        Run every job whose tick is due.
+
+        Returns:
+            float: Monotonic time the next tick is due
+        """
+        for job in self.jobs:
+            now = time.monotonic()
+            if now < job.next_due:
+                continue
+
+            # Ticks that passed while the job was late are skipped, not replayed
+            late = now - job.next_due
+            skipped = math.floor(late / job.interval)
+            due = job.next_due + skipped * job.interval
+            job.next_due = due + job.interval
+            if skipped:
+                job.missed += skipped
+                if self.on_missed:
+                    self.on_missed(job, skipped, late)
+
+            job.runs += 1
+            job.callback(due + self._wall_offset)
+
+        return min(job.next_due for job in self.jobs)
+
+    def run(self):
+        """Run the jobs until stop() is called (or Ctrl+C)."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            next_due = self.run_pending()
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+
+    def stop(self):
+        """Make run() return after the current tick."""
+        self._stop.set()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+System Resource Monitor - Metric Writers
+
+Writers keep their output open and batch the work:
+
+- CsvWriter buffers formatted rows in memory and writes them with a single
+  call once enough rows are waiting or enough time has passed. It rotates to
+  a new file by size or by age, writing the header again in each file.
+- RingWriter stores every sample as a fixed-size binary record in a
+  memory-mapped ring file. Writing a sample is a memory copy, not a system
+  call, and once the ring is full the oldest records are overwritten, so the
+  file never grows. RingReader maps the same file read-only and hands out the
+  records without copying them (as a NumPy structured array if NumPy is
+  installed).
+
+Run this file directly to export a ring file to CSV or print its last records.
+"""
+
+import os
+import sys
+import mmap
+import math
+import time
+import struct
+import argparse
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rows buffered before a flush, and seconds before buffered rows are flushed anyway
+FLUSH_COUNT = 100
+FLUSH_INTERVAL = 5.0
+
+RING_MAGIC = b"SMRING01"
+# magic, header size, record size, capacity, records written, column count, reserved
+RING_HEADER = struct.Struct("<8sIIQQII")
+# Offset of the "records written" counter inside the header
+RING_WRITTEN_OFFSET = 24
+# Bytes reserved for each column name after the fixed header
+RING_NAME_BYTES = 32
+RING_CAPACITY = 86400
+
+
+def unique_path(path):
+    """
+    Add a counter to a file name if the file already exists.
+
+    Args:
+        path (str): Wanted path
+
+    Returns:
+        str: `path`, or e.g. "name_1.csv" if `path` is taken
+    """
+    stem, ext = os.path.splitext(path)
+    candidate, counter = path, 0
+    while os.path.exists(candidate):
+        counter += 1
+        candidate = f"{stem}_{counter}{ext}"
+    return candidate
+
+
+def format_cell(value):
+    """Format one CSV cell: floats with one decimal, text quoted if needed."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        if any(char in value for char in ',"\n'):
+            return '"' + value.replace('"', '""') + '"'
+        return value
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.1f}"
+
+
+def format_csv_row(timestamp, values, with_millis=False):
+    """
+    Turn one sample into a CSV line.
+
+    Args:
+        timestamp (float): Wall-clock time of the sample
+        values (list): One value (or None) per column; ints and text are
+            written as they are
+        with_millis (bool): Write the timestamp with milliseconds
+
+    Returns:
+        str: The line, ending in a newline
+    """
+    moment = datetime.fromtimestamp(timestamp)
+    if with_millis:
+        stamp = moment.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    else:
+        stamp = moment.strftime("%Y-%m-%d %H:%M:%S")
+    return ",".join([stamp, *map(format_cell, values)]) + "\n"
+
+
+class CsvWriter:
+    """Buffered CSV writer that rotates files by size or age."""
+
+    def __init__(self, make_path, columns, flush_count=FLUSH_COUNT,
+                 flush_interval=FLUSH_INTERVAL, rotate_bytes=None, rotate_seconds=None,
+                 with_millis=False, on_open=None):
+        """
+        Initialize the writer and open the first file.
+
+        Args:
+            make_path (callable): Returns the path for a new file; an
+                existing file at that path is overwritten
+            columns (list): Column names after "Timestamp"
+            flush_count (int): Flush once this many rows are buffered
+            flush_interval (float): Flush once the oldest buffered row is this
+                many seconds old
+            rotate_bytes (int, optional): Start a new file past this size
+            rotate_seconds (float, optional): Start a new file after this long
+            with_millis (bool): Write timestamps with milliseconds
+            on_open (callable, optional): Called with the path of every new file
+        """
+        self.make_path = make_path
+        self.columns = list(columns)
+        self.flush_count = max(1, flush_count)
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.with_millis = with_millis
+        self.on_open = on_open
+        self.buffer = []
+        self.file = None
+        self.path = None
+        self.rows_written = 0
+        self.flushes = 0
+        self._open()
+
+    def _open(self):
+        """Start a new file and write its header."""
+        self.path = self.make_path()
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.file.write(",".join(["Timestamp", *self.columns]) + "\n")
+        self.file.flush()
+        self.opened_at = time.monotonic()
+        self.first_buffered = None
+        if self.on_open:
+            self.on_open(self.path)
+
+    def write(self, timestamp, values):
+        """
+        Buffer one sample, flushing or rotating if it's time to.
+
+        Args:
+            timestamp (float): Wall-clock time of the sample
+            values (list): One value (or None) per column
+        """
+        now = time.monotonic()
+        if self.first_buffered is None:
+            self.first_buffered = now
+        self.buffer.append(format_csv_row(timestamp, values, self.with_millis))
+        if (len(self.buffer) >= self.flush_count
+                or now - self.first_buffered >= self.flush_interval):
+            self.flush()
+
+    def _write_buffer(self):
+        """Write the buffered rows to the file in one call."""
+        if self.buffer:
+            self.file.write("".join(self.buffer))
+            self.file.flush()
+            self.rows_written += len(self.buffer)
+            self.flushes += 1
+            self.buffer = []
+        self.first_buffered = None
+
+    def flush(self):
+        """
+        Write the buffered rows and rotate the file if it's due.
+
+        write() only checks `flush_interval` when a row arrives; call this
+        every `flush_interval` seconds as well to keep rows from waiting longer.
+        """
+        self._write_buffer()
+        too_big = self.rotate_bytes and self.file.tell() >= self.rotate_bytes
+        too_old = self.rotate_seconds and time.monotonic() - self.opened_at >= self.rotate_seconds
+        if too_big or too_old:
+            self.file.close()
+            self._open()
+
+    def close(self):
+        """Flush what is left and close the file."""
+        if self.file:
+            self._write_buffer()
+            self.file.close()
+            self.file = None
+
+
+class RingWriter:
+    """Fixed-size binary records in a memory-mapped ring file."""
+
+    def __init__(self, path, columns, capacity=RING_CAPACITY,
+                 flush_count=FLUSH_COUNT, flush_interval=FLUSH_INTERVAL, on_open=None):
+        """
+        Create the ring file, or reopen one with the same columns and capacity.
+
+        Args:
+            path (str): Path of the ring file
+            columns (list): Column names; each record holds a float64
+                timestamp plus one float64 per column (NaN when missing)
+            capacity (int): Number of records kept before the oldest are overwritten
+            flush_count (int): Ask the OS to write the mapping to disk after
+                this many records
+            flush_interval (float): ... or after this many seconds
+            on_open (callable, optional): Called with the path once it's open
+
+        Raises:
+            ValueError: If `capacity` isn't positive, or an existing file at
+                `path` has a different layout
+        """
+        if capacity <= 0:
+            raise ValueError("Ring capacity must be positive")
+        self.path = path
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.flush_count = max(1, flush_count)
+        self.flush_interval = flush_interval
+        self.record = struct.Struct("<" + "d" * (1 + len(self.columns)))
+        self.header_size = RING_HEADER.size + RING_NAME_BYTES * len(self.columns)
+        self.header_size += -self.header_size % 8
+        size = self.header_size + self.record.size * capacity
+
+        exists = os.path.exists(path)
+        if exists and os.path.getsize(path) != size:
+            raise ValueError(f"{path} is not a ring file with this layout")
+        self.file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+        if exists:
+            try:
+                header = _read_header(self.map)
+            except ValueError:
+                header = {}
+            if header.get("columns") != self.columns or header.get("capacity") != capacity:
+                self.map.close()
+                self.file.close()
+                raise ValueError(f"{path} is not a ring file with this layout")
+            self.written = header["written"]
+        else:
+            names = b"".join(name.encode("utf-8")[:RING_NAME_BYTES].ljust(RING_NAME_BYTES, b"\0")
+                             for name in self.columns)
+            RING_HEADER.pack_into(self.map, 0, RING_MAGIC, self.header_size, self.record.size,
+                                  capacity, 0, len(self.columns), 0)
+            self.map[RING_HEADER.size:RING_HEADER.size + len(names)] = names
+            self.written = 0
+
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+        if on_open:
+            on_open(path)
+
+    def write(self, timestamp, values):
+        """
+        Store one sample in the next slot of the ring.
+
+        Args:
+            timestamp (float): Wall-clock time of the sample
+            values (list): One value (or None) per column
+        """
+        slot = self.written % self.capacity
+        self.record.pack_into(self.map, self.header_size + slot * self.record.size, timestamp,
+                              *(math.nan if value is None else value for value in values))
+        # The counter moves only after the record is complete, so readers that
+        # go by it never see a half-written record as the newest one
+        self.written += 1
+        struct.pack_into("<Q", self.map, RING_WRITTEN_OFFSET, self.written)
+
+        self.pending += 1
+        if (self.pending >= self.flush_count
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Ask the OS to write the changed pages to disk."""
+        if self.pending:
+            self.map.flush()
+            self.flushes += 1
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        """Flush and unmap the ring file."""
+        if self.map is not None:
+            self.flush()
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+
+def _read_header(buffer):
+    """Decode the header of a ring file."""
+    magic, header_size, record_size, capacity, written, count, _ = RING_HEADER.unpack_from(buffer, 0)
+    if magic != RING_MAGIC:
+        raise ValueError("Not a monitor ring file")
+    names = bytes(buffer[RING_HEADER.size:RING_HEADER.size + RING_NAME_BYTES * count])
+    columns = [names[i:i + RING_NAME_BYTES].rstrip(b"\0").decode("utf-8")
+               for i in range(0, len(names), RING_NAME_BYTES)]
+    return {"header_size": header_size, "record_size": record_size, "capacity": capacity,
+            "written": written, "columns": columns}
+
+
+class RingReader:
+    """Read-only, zero-copy view of a ring file (it may be written concurrently)."""
+
+    def __init__(self, path):
+        """
+        Map a ring file.
+
+        Args:
+            path (str): Path of the ring file
+
+        Raises:
+            ValueError: If the file isn't a ring file
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _read_header(self.map)
+        self.header_size = header["header_size"]
+        self.capacity = header["capacity"]
+        self.columns = header["columns"]
+        self.record = struct.Struct("<" + "d" * (1 + len(self.columns)))
+
+    @property
+    def written(self):
+        """Number of records written so far, including overwritten ones."""
+        return struct.unpack_from("<Q", self.map, RING_WRITTEN_OFFSET)[0]
+
+    def _first_kept(self, written):
+        """Number of the oldest record still safe to read."""
+        if written < self.capacity:
+            return 0
+        # Once full, the oldest slot may be being overwritten right now
+        return written - self.capacity + 1
+
+    def _timestamp(self, number):
+        """Timestamp of record number `number`."""
+        offset = self.header_size + (number % self.capacity) * self.record.size
+        return struct.unpack_from("<d", self.map, offset)[0]
+
+    def _read(self, first, end):
+        """Records first..end-1, minus any the writer overwrote meanwhile."""
+        rows = []
+        view = memoryview(self.map)
+        for number in range(first, end):
+            offset = self.header_size + (number % self.capacity) * self.record.size
+            rows.append(self.record.unpack_from(view, offset))
+        view.release()
+
+        # Record n is overwritten by record n + capacity
+        overwritten = self._first_kept(self.written) - first
+        return rows[max(0, overwritten):]
+
+    def records(self, last=None):
+        """
+        The records still in the ring, oldest first.
+
+        Once the ring is full, the oldest slot is left out, because the writer
+        may be overwriting it at that moment.
+
+        Args:
+            last (int, optional): Only the newest `last` records
+
+        Returns:
+            list: (timestamp, value, ...) tuples; missing values are NaN
+        """
+        written = self.written
+        first = self._first_kept(written)
+        if last is not None:
+            first = max(first, written - last)
+        return self._read(first, written)
+
+    def records_between(self, start, end):
+        """
+        The records with start <= timestamp <= end, found by binary search.
+
+        Records are expected in time order, as the monitor writes them.
+
+        Args:
+            start (float): Oldest timestamp wanted
+            end (float): Newest timestamp wanted
+
+        Returns:
+            list: (timestamp, value, ...) tuples, oldest first
+        """
+        written = self.written
+        low, high = self._first_kept(written), written
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp(middle) < start:
+                low = middle + 1
+            else:
+                high = middle
+        first = low
+
+        high = written
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp(middle) <= end:
+                low = middle + 1
+            else:
+                high = middle
+        return self._read(first, low)
+
+    def oldest_timestamp(self):
+        """
+        Timestamp of the oldest record still in the ring.
+
+        Returns:
+            float: Epoch seconds, or None if the ring is empty
+        """
+        written = self.written
+        first = self._first_kept(written)
+        return self._timestamp(first) if first < written else None
+
+    def array(self):
+        """
+        The whole ring as a NumPy structured array, without copying.
+
+        Slots are in storage order: when the ring has wrapped, the oldest
+        record is at index written % capacity.
+
+        Returns:
+            numpy.ndarray: Fields "timestamp" plus one per column
+
+        Raises:
+            RuntimeError: If NumPy isn't installed
+        """
+        if np is None:
+            raise RuntimeError("RingReader.array() needs NumPy (pip install numpy)")
+        dtype = np.dtype([("timestamp", "<f8")] + [(name, "<f8") for name in self.columns])
+        return np.frombuffer(self.map, dtype=dtype, count=self.capacity, offset=self.header_size)
+
+    def close(self):
+        """Unmap the file."""
+        self.map.close()
+
+
+def export_csv(ring_path, csv_path, with_millis=False):
+    """
+    Write the records of a ring file to a CSV file.
+
+    Args:
+        ring_path (str): Ring file to read
+        csv_path (str): CSV file to create
+        with_millis (bool): Write timestamps with milliseconds
+
+    Returns:
+        int: Number of rows written
+    """
+    reader = RingReader(ring_path)
+    rows = reader.records()
+    writer = CsvWriter(lambda: csv_path, reader.columns, flush_count=len(rows) + 1,
+                       flush_interval=float("inf"), with_millis=with_millis)
+    for timestamp, *values in rows:
+        writer.write(timestamp, [None if math.isnan(value) else value for value in values])
+    writer.close()
+    reader.close()
+    return len(rows)
+
+
+def main():
+    """
+    Main function to run the script.
+    """
+    parser = argparse.ArgumentParser(description="Read monitor ring files")
+    parser.add_argument("ring_file", help="Ring file written with --format binary")
+    parser.add_argument("--export", metavar="CSV_FILE", help="Write every record to a CSV file")
+    parser.add_argument("--tail", type=int, default=10, help="Print the last N records (default: 10)")
+    parser.add_argument("--millis", action="store_true", help="Show timestamps with milliseconds")
+    args = parser.parse_args()
+
+    try:
+        if args.export:
+            rows = export_csv(args.ring_file, args.export, args.millis)
+            print(f"Exported {rows} records to {args.export}")
+            return 0
+
+        reader = RingReader(args.ring_file)
+        print(",".join(["Timestamp", *reader.columns]))
+        for timestamp, *values in reader.records(args.tail):
+            values = [None if math.isnan(value) else value for value in values]
+            sys.stdout.write(format_csv_row(timestamp, values, args.millis))
+        print(f"({reader.written} records written, ring holds {reader.capacity})")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,23 @@
 System Resource Monitor - Monitors CPU and memory usage
 """
 
-import psutil
 import time
 from datetime import datetime
 import os
+import signal
+import argparse
+
+from monitor_alerts import ALERT_COLUMNS, AlertEngine, check_metrics, load_rules
+from monitor_http import BUFFER_SIZE, HTTP_HOST, MetricsServer, SampleBuffer
+from monitor_metrics import METRIC_FAMILIES
+from monitor_processes import TOP_COLUMNS, OverheadMeter, ProcessSampler, top_rows
+from monitor_rollup import ROLLUP_DIR, RollupStore, parse_retention
+from monitor_scheduler import TickScheduler
+from monitor_writer import (FLUSH_COUNT, FLUSH_INTERVAL, RING_CAPACITY, CsvWriter,
+                            RingWriter, unique_path)
+
+# Column names of the metrics in the CSV file; other metrics use their own name
+CSV_COLUMNS = {"cpu": "CPU_Usage", "memory": "Memory_Usage"}
 
 def create_log_directory():
     """Create a logs directory if it doesn't exist"""
@@ -15,56 +28,266 @@ def create_log_directory():
         os.makedirs(log_dir)
     return log_dir
 
-def get_log_filename(log_dir):
+def get_log_filename(log_dir, extension="csv", prefix="system_usage"):
     """Generate a timestamped log filename"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return f"{log_dir}/system_usage_{timestamp}.csv"
+    return unique_path(f"{log_dir}/{prefix}_{timestamp}.{extension}")
 
-def initialize_log_file(filename):
-    """Create the log file with headers"""
-    with open(filename, "w") as f:
-        f.write("Timestamp,CPU_Usage,Memory_Usage\n")
-    print(f"Log file created: {filename}")
+def announce_log_file(path):
+    """Tell the user where samples are being written"""
+    print(f"Log file created: {path}")
 
-def get_system_usage():
-    """Get current CPU and memory usage percentages"""
-    cpu_usage = psutil.cpu_percent(interval=1)
-    memory_usage = psutil.virtual_memory().percent
-    return cpu_usage, memory_usage
+def open_log_writer(args, log_dir, extra_columns=()):
+    """Open the CSV or binary ring writer the options ask for"""
+    columns = ["CPU_Usage", "Memory_Usage", *extra_columns]
+    on_open = announce_log_file
+    if args.format == "binary":
+        return RingWriter(get_log_filename(log_dir, "ring"), columns, capacity=args.ring_size,
+                          flush_count=args.flush_count, flush_interval=args.flush_interval,
+                          on_open=on_open)
+    return CsvWriter(lambda: get_log_filename(log_dir), columns,
+                     flush_count=args.flush_count, flush_interval=args.flush_interval,
+                     rotate_bytes=int(args.rotate_size * 1024 * 1024) if args.rotate_size else None,
+                     rotate_seconds=args.rotate_age * 3600 if args.rotate_age else None,
+                     with_millis=args.interval < 1, on_open=on_open)
 
-def log_data(filename, cpu, memory):
+def log_data(writer, cpu, memory, tick=None, extra=None):
     """Log data to console and file"""
+    extra = extra or {}
+    
     # Print to console
-    print(f"CPU Usage: {cpu:.1f}% Memory Usage: {memory:.1f}%")
+    details = "".join(f" {name}: {value:.1f}" for name, value in extra.items()
+                      if value is not None)
+    print(f"CPU Usage: {cpu:.1f}% Memory Usage: {memory:.1f}%{details}")
+    
+    # Log to file (buffered; the writer flushes in batches)
+    writer.write(tick or time.time(), [cpu, memory, *extra.values()])
+
+def open_top_writer(args, log_dir):
+    """Open the CSV writer for the top processes"""
+    return CsvWriter(lambda: get_log_filename(log_dir, prefix="top_processes"), TOP_COLUMNS,
+                     flush_count=args.flush_count, flush_interval=args.flush_interval,
+                     rotate_bytes=int(args.rotate_size * 1024 * 1024) if args.rotate_size else None,
+                     rotate_seconds=args.rotate_age * 3600 if args.rotate_age else None,
+                     on_open=announce_log_file)
+
+def log_top(writer, sampler, meter, tick):
+    """Show and log the processes using the most CPU and memory"""
+    top_cpu, top_rss = sampler.sample()
+    
+    # Print to console
+    cpu_list = ", ".join(f"{p.name}[{p.pid}] {p.cpu:.1f}%" for p in top_cpu)
+    rss_list = ", ".join(f"{p.name}[{p.pid}] {p.rss / 1024 / 1024:.0f} MB" for p in top_rss)
+    print(f"  Top CPU: {cpu_list or '(measuring)'}")
+    print(f"  Top memory: {rss_list}")
+    print(f"  Monitor overhead: {meter.recent():.2f}% CPU ({sampler.processes} processes, "
+          f"{sampler.cost_per_tick() * 1000:.1f} ms per scan)")
     
     # Log to file
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(filename, "a") as f:
-        f.write(f"{timestamp},{cpu:.1f},{memory:.1f}\n")
+    for row in top_rows(top_cpu, top_rss):
+        writer.write(tick, row)
+
+def open_alert_writer(args, log_dir):
+    """Open the CSV writer for alert events; every event is written right away"""
+    return CsvWriter(lambda: get_log_filename(log_dir, prefix="alerts"), ALERT_COLUMNS,
+                     flush_count=1, with_millis=args.interval < 1, on_open=announce_log_file)
+
+def report_alert(writer, event):
+    """Show and log an alert that fired or resolved"""
+    print(f"ALERT {event.state.upper()}: {event.rule} (value {event.value:.1f})")
+    writer.write(event.timestamp, [event.state, event.rule, event.value])
+
+def report_missed(job, count, late):
+    """Tell the user a metric family fell behind its schedule"""
+    print(f"Warning: missed {count} {job.name} tick(s), sampling was {late:.3f}s late")
+
+def stop_on_sigterm():
+    """Make SIGTERM (kill, systemctl stop) end the monitor like Ctrl+C, so everything is saved"""
+    def handle(signum, frame):
+        print("\nMonitoring stopped (SIGTERM)")
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, handle)
+
+def parse_args():
+    """Parse the command line options"""
+    parser = argparse.ArgumentParser(description="Monitor CPU and memory usage")
+    parser.add_argument("--interval", type=float, default=5,
+                        help="Seconds between rows written to the log (default: 5; "
+                             "fractions such as 0.5 are allowed)")
+    for name, family in METRIC_FAMILIES.items():
+        default = "--interval" if name in CSV_COLUMNS else "off"
+        # argparse %-formats help text, so a literal % has to be doubled
+        description = family.description.replace("%", "%%")
+        parser.add_argument(f"--{name}-interval", type=float, metavar="SECONDS",
+                            help=f"Seconds between {description} samples "
+                                 f"(default: {default})")
+    parser.add_argument("--format", choices=["csv", "binary"], default="csv",
+                        help="Write CSV files (default) or a fixed-size binary ring file")
+    parser.add_argument("--flush-count", type=int, default=FLUSH_COUNT,
+                        help=f"Write buffered rows after this many (default: {FLUSH_COUNT})")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                        help=f"... or once they're this many seconds old (default: {FLUSH_INTERVAL:g})")
+    parser.add_argument("--rotate-size", type=float, metavar="MB",
+                        help="Start a new CSV file once the current one reaches MB megabytes")
+    parser.add_argument("--rotate-age", type=float, metavar="HOURS",
+                        help="Start a new CSV file every HOURS hours")
+    parser.add_argument("--ring-size", type=int, default=RING_CAPACITY,
+                        help=f"Samples kept in the binary ring file (default: {RING_CAPACITY})")
+    parser.add_argument("--top", type=int, default=0, metavar="N",
+                        help="Also show and log the N processes using the most CPU and memory")
+    parser.add_argument("--top-interval", type=float, metavar="SECONDS",
+                        help="Seconds between process table scans (default: --interval)")
+    parser.add_argument("--http-port", type=int, metavar="PORT",
+                        help="Serve recent samples on http://HOST:PORT/metrics (Prometheus) "
+                             "and /json")
+    parser.add_argument("--http-host", default=HTTP_HOST,
+                        help=f"Address the metrics endpoint listens on (default: {HTTP_HOST})")
+    parser.add_argument("--buffer-size", type=int, default=BUFFER_SIZE,
+                        help=f"Samples kept in memory for the endpoint (default: {BUFFER_SIZE})")
+    parser.add_argument("--alert", action="append", default=[], metavar="RULE",
+                        help="Alert rule such as 'cpu avg 5m > 90' or "
+                             "'memory p95 15m > 80 clear 75 for 1m' (repeatable)")
+    parser.add_argument("--alert-file", metavar="FILE",
+                        help="File with one alert rule per line")
+    parser.add_argument("--no-rollups", action="store_true",
+                        help="Don't keep 1m/1h/1d rollups in logs/rollups")
+    parser.add_argument("--retention", default="",
+                        help="History kept per rollup resolution, e.g. raw=2d,1m=30d,1h=1y "
+                             "(default: raw=1d,1m=7d,1h=90d,1d=5y)")
+    args = parser.parse_args()
+    try:
+        args.retention = parse_retention(args.retention)
+        args.rules = load_rules(args.alert, args.alert_file)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    
+    # Every family gets its own interval; 0 or unset optional families are off
+    args.intervals = {}
+    for name in METRIC_FAMILIES:
+        interval = getattr(args, f"{name}_interval")
+        if interval is None and name in CSV_COLUMNS:
+            interval = args.interval
+        if interval:
+            args.intervals[name] = interval
+    if args.interval <= 0 or not all(name in args.intervals for name in CSV_COLUMNS):
+        parser.error("--interval, --cpu-interval and --memory-interval must be positive")
+    try:
+        check_metrics(args.rules, [metric for name in args.intervals
+                                   for metric in METRIC_FAMILIES[name].metric_names()])
+    except ValueError as e:
+        parser.error(str(e))
+    if args.top < 0 or (args.top_interval is not None and args.top_interval <= 0):
+        parser.error("--top and --top-interval must be positive")
+    if args.ring_size <= 0:
+        parser.error("--ring-size must be positive")
+    return args
 
 def main():
     """Main function to run the monitoring"""
+    args = parse_args()
+    interval = args.interval
+    meter = OverheadMeter()
+    
+    # Start the metric families; each one records its starting counters now
+    families = {name: METRIC_FAMILIES[name]() for name in args.intervals}
+    extra_metrics = [metric for name, family in families.items() if name not in CSV_COLUMNS
+                     for metric in family.metric_names()]
+    latest = {}
+    
+    # Serve recent samples from memory, if asked to
+    buffer = server = None
+    if args.http_port is not None:
+        buffer = SampleBuffer(["cpu", "memory", *extra_metrics], args.buffer_size)
+        try:
+            server = MetricsServer(buffer, args.http_port, args.http_host)
+        except OSError as e:
+            print(f"Error: can't serve metrics on {args.http_host}:{args.http_port}: {e}")
+            return
+        server.start()
+        print(f"Serving metrics on {server.url}/metrics and {server.url}/json")
+    
     # Setup logging
     log_dir = create_log_directory()
-    log_filename = get_log_filename(log_dir)
-    initialize_log_file(log_filename)
+    writer = open_log_writer(args, log_dir, extra_metrics)
+    rollups = None
+    if not args.no_rollups:
+        rollups = RollupStore(os.path.join(log_dir, ROLLUP_DIR), ["cpu", "memory", *extra_metrics],
+                              interval, args.retention)
+    alerts = alert_writer = None
+    if args.rules:
+        alerts = AlertEngine(args.rules)
+        alert_writer = open_alert_writer(args, log_dir)
+    sampler = top_writer = None
+    if args.top:
+        sampler = ProcessSampler(args.top)
+        top_writer = open_top_writer(args, log_dir)
+    
+    def sample_family(family):
+        return lambda tick: latest.update(family.sample())
+    
+    def write_row(tick):
+        if "cpu" not in latest or "memory" not in latest:
+            return
+        extra = {metric: latest.get(metric) for metric in extra_metrics}
+        log_data(writer, latest["cpu"], latest["memory"], tick, extra)
+        values = [latest["cpu"], latest["memory"], *extra.values()]
+        if buffer:
+            buffer.append(tick, values)
+        if alerts:
+            for event in alerts.update(tick, dict(zip(["cpu", "memory", *extra_metrics], values))):
+                report_alert(alert_writer, event)
+        if rollups:
+            rollups.add(tick, values)
+    
+    def flush_writers(tick):
+        writer.flush()
+        if top_writer:
+            top_writer.flush()
     
-    # Set monitoring interval (in seconds)
-    interval = 5
+    # Families are added before the writer, so a row written on the same tick
+    # as a sample already includes it
+    scheduler = TickScheduler(on_missed=report_missed)
+    for name, family in families.items():
+        scheduler.add(name, args.intervals[name], sample_family(family))
+    scheduler.add("log", interval, write_row)
+    if sampler:
+        scheduler.add("top", args.top_interval or interval,
+                      lambda tick: log_top(top_writer, sampler, meter, tick))
+    if args.flush_interval > 0:
+        # Flush on a tick of its own, so rows don't wait for the next one when --interval is long
+        scheduler.add("flush", args.flush_interval, flush_writers)
     
     print(f"Starting system monitoring (press Ctrl+C to stop)...")
-    print(f"Logging data every {interval} seconds")
+    print(f"Logging data every {interval:g} seconds")
+    for name in families:
+        if args.intervals[name] != interval:
+            print(f"Sampling {name} every {args.intervals[name]:g} seconds")
     
     # Monitoring loop
+    stop_on_sigterm()
     try:
-        while True:
-            cpu, memory = get_system_usage()
-            log_data(log_filename, cpu, memory)
-            time.sleep(interval)
+        scheduler.run()
     except KeyboardInterrupt:
         print("\nMonitoring stopped by user")
     finally:
-        print(f"Data saved to {log_filename}")
+        missed = ", ".join(f"{job.name}: {job.missed}" for job in scheduler.jobs if job.missed)
+        if missed:
+            print(f"Missed ticks: {missed}")
+        if server:
+            server.stop()
+        writer.close()
+        if rollups:
+            rollups.close()
+        print(f"Data saved to {writer.path}")
+        if alert_writer:
+            alert_writer.close()
+            firing = ", ".join(rule.text for rule in alerts.firing())
+            print(f"Alerts saved to {alert_writer.path}" + (f" (still firing: {firing})" if firing else ""))
+        if top_writer:
+            top_writer.close()
+            print(f"Top processes saved to {top_writer.path} "
+                  f"({sampler.cost_per_tick() * 1000:.1f} ms per process table scan)")
+        print(f"Monitor overhead: {meter.total():.2f}% CPU")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
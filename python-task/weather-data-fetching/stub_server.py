@@ -0,0 +1,223 @@
+"""
+Local stand-in for the OpenWeatherMap current weather API.
+
+Serves /data/2.5/weather?q=<city>&appid=<key> with made-up but stable weather
+for any city name, so the app can be run and timed without an API key,
+network access or quota. Cities whose name contains "nowhere" return 404,
+and a missing appid returns 401, like the real API.
+
+With --quota, requests beyond that many per second get 429 with a
+Retry-After header, like an account over its plan's limit.
+
+/data/2.5/group?id=<id>,<id>,... answers for up to GROUP_LIMIT city IDs at
+once. Give it the same city list the index was built from (--cities) to get
+the same weather for an ID as for its name.
+
+Run it and point the app at it:
+
+    python stub_server.py --port 8000 --latency 0.1
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8000/data/2.5/weather python weather-app.py London Paris
+"""
+
+import json
+import time
+import zlib
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from weather_cities import GROUP_LIMIT, read_city_list
+
+WEATHER_PATH = "/data/2.5/weather"
+GROUP_PATH = "/data/2.5/group"
+
+CONDITIONS = ["clear sky", "few clouds", "scattered clouds", "broken clouds",
+              "light rain", "moderate rain", "thunderstorm", "snow", "mist"]
+
+
+def fake_weather(city, now=None):
+    """
+    Make up stable weather for a city, in the API's response format.
+
+    Args:
+        city (str): City name as requested
+        now (float, optional): Observation time (default: now)
+
+    Returns:
+        dict: Response body like OpenWeatherMap's
+    """
+    seed = zlib.crc32(city.strip().lower().encode("utf-8"))
+    return {
+        "id": seed % 10000000,
+        "name": city.strip().title(),
+        "sys": {"country": "XX"},
+        "main": {"temp": round(263.15 + seed % 4000 / 100, 2), "humidity": seed % 101},
+        "weather": [{"description": CONDITIONS[seed % len(CONDITIONS)]}],
+        "wind": {"speed": round(seed % 200 / 10, 1)},
+        "dt": int(now if now is not None else time.time()),
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers weather requests like OpenWeatherMap would."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_GET(self):
+        self.server.count("requests")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        retry_after = self.server.over_quota()
+        if retry_after:
+            self.send_json(429, {"cod": 429, "message": "Your account is temporary blocked due "
+                                 "to exceeding of requests limitation of your subscription type."},
+                           {"Retry-After": str(retry_after)})
+            return
+
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path not in (WEATHER_PATH, GROUP_PATH):
+            self.send_json(404, {"cod": "404", "message": "Internal error"})
+        elif not query.get("appid"):
+            self.send_json(401, {"cod": 401, "message": "Invalid API key."})
+        elif url.path == GROUP_PATH:
+            self.send_group(query.get("id", ""))
+        elif not query.get("q") or "nowhere" in query["q"].lower():
+            self.send_json(404, {"cod": "404", "message": "city not found"})
+        else:
+            self.send_json(200, fake_weather(query["q"]))
+
+    def send_group(self, ids):
+        """Answer a group request for comma-separated city IDs."""
+        try:
+            city_ids = [int(city_id) for city_id in ids.split(",")]
+        except ValueError:
+            self.send_json(400, {"cod": "400", "message": f"{ids} is not a city ID"})
+            return
+        if len(city_ids) > GROUP_LIMIT:
+            self.send_json(400, {"cod": "400", "message": "Too many IDs. The limit is 20."})
+            return
+
+        cities = []
+        for city_id in city_ids:
+            name = self.server.city_names.get(city_id, f"City {city_id}")
+            if "nowhere" not in name.lower():
+                cities.append(dict(fake_weather(name), id=city_id))
+        self.send_json(200, {"cnt": len(cities), "list": cities})
+
+    def send_json(self, status, body, headers=None):
+        """Send a JSON response."""
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server that counts connections and requests."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, host="127.0.0.1", latency=0.0, verbose=False, city_names=None,
+                 quota=None):
+        """
+        Bind the server; call start() or serve_forever() to serve.
+
+        Args:
+            port (int): Port to listen on (0 picks a free one)
+            host (str): Address to listen on
+            latency (float): Seconds every request waits before answering
+            verbose (bool): Log every request
+            city_names (dict, optional): City ID -> name, for group requests
+            quota (int, optional): Requests allowed per second before answering 429
+        """
+        super().__init__((host, port), StubHandler)
+        self.latency = latency
+        self.verbose = verbose
+        self.city_names = city_names or {}
+        self.quota = quota
+        self.stats = {"connections": 0, "requests": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self._window = (0, 0)  # (second, requests in it)
+
+    def count(self, name):
+        """Add one to a statistic."""
+        with self._lock:
+            self.stats[name] += 1
+
+    def over_quota(self):
+        """
+        Count a request against the quota.
+
+        Returns:
+            int: Seconds to wait (for Retry-After) if it's over the quota, otherwise 0
+        """
+        if not self.quota:
+            return 0
+        second = int(time.time())
+        with self._lock:
+            start, used = self._window
+            used = used + 1 if start == second else 1
+            self._window = (second, used)
+            if used <= self.quota:
+                return 0
+            self.stats["throttled"] += 1
+            return 1  # The next second has a fresh quota
+
+    @property
+    def base_url(self):
+        """URL to use as the app's base_url."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{WEATHER_PATH}"
+
+    def start(self):
+        """Serve on a daemon thread (for use from scripts)."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    """Run the stub server until Ctrl+C."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenWeatherMap API")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds each request takes, to mimic a remote API (default: 0)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--quota", type=int,
+                        help="Requests allowed per second; more get 429 (default: no limit)")
+    parser.add_argument("--cities", metavar="FILE",
+                        help="city.list.json(.gz) to name the cities in group requests")
+    args = parser.parse_args()
+
+    city_names = {}
+    if args.cities:
+        city_names = {city["id"]: city["name"] for city in read_city_list(args.cities)}
+    server = StubServer(args.port, args.host, args.latency, args.verbose, city_names, args.quota)
+    print(f"Stub weather API on {server.base_url} (press Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed {server.stats['requests']} requests over "
+              f"{server.stats['connections']} connections ({server.stats['throttled']} throttled)")
+
+
+if __name__ == "__main__":
+    main()
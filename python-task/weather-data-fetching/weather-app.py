@@ -3,7 +3,28 @@ import sys
 import requests
 from dotenv import load_dotenv
 import json
+import argparse
+import threading
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from weather_cache import CACHE_FILE, CACHE_TTL, WeatherCache, cache_key
+from weather_cities import CITY_INDEX, GROUP_LIMIT, CityIndex
+from weather_stream import stream_weather
+from weather_limits import MAX_RETRIES, RateLimiter, SingleFlight, backoff, parse_retry_after
+from weather_replay import FixtureStore, RecordingAdapter, ReplayAdapter
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+# Requests in flight at once during a batch, and seconds before a request gives up
+DEFAULT_WORKERS = 8
+REQUEST_TIMEOUT = 10
+
+
+class WeatherError(Exception):
+    """Raised when the weather for a city can't be fetched; the message is meant for the user."""
 
 
 class WeatherApp:
@@ -11,8 +32,25 @@ class WeatherApp:
     A class to fetch and display weather information for cities using the OpenWeatherMap API.
     """
     
-    def __init__(self):
-        """Initialize the WeatherApp with API key and base URL."""
+    def __init__(self, base_url=None, max_workers=DEFAULT_WORKERS, timeout=REQUEST_TIMEOUT,
+                 cache=None, cities=None, rate=None, retries=MAX_RETRIES, transport=None):
+        """
+        Initialize the WeatherApp with API key and base URL.
+        
+        Args:
+            base_url (str, optional): Weather endpoint; defaults to OPENWEATHER_BASE_URL from
+                the environment, then to OpenWeatherMap (point it at a stub server for testing)
+            max_workers (int): Most requests in flight at once in fetch_many()
+            timeout (float): Seconds to wait for the API before giving up
+            cache (WeatherCache, optional): Cache consulted before the API
+            cities (CityIndex, optional): Offline city index; with it, fetch_many() resolves
+                names to IDs and fetches up to GROUP_LIMIT cities per request
+            rate (float, optional): Requests per second allowed by the account; None
+                sends as fast as possible until the API answers 429
+            retries (int): Times a request is retried after a 429, a 5xx or a network error
+            transport (requests.adapters.BaseAdapter, optional): Sends the requests instead
+                of the network, e.g. a ReplayAdapter answering from recorded responses
+        """
         load_dotenv()  # Load environment variables from .env file
         self.api_key = os.getenv("OPENWEATHER_API_KEY")
         
@@ -20,61 +58,326 @@ class WeatherApp:
             print("Error: API key not found. Please set the OPENWEATHER_API_KEY in your .env file.")
             sys.exit(1)
             
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"
+        self.base_url = base_url or os.getenv("OPENWEATHER_BASE_URL") or DEFAULT_BASE_URL
+        # The group endpoint lives next to the weather one (.../data/2.5/group)
+        self.group_url = self.base_url.rsplit("/", 1)[0] + "/group"
+        self.cities = cities
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        
+        # One keep-alive session for all requests, so each worker reuses its TLS connection
+        self.session = requests.Session()
+        adapter = transport or HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Stale cache entries are refreshed in the background, once per city at a time.
+        # Entries are kept apart per source (API URL or replayed fixture file)
+        self.cache = cache
+        if isinstance(transport, ReplayAdapter):
+            self.cache_source = f"replay:{os.path.abspath(transport.store.path)}"
+        else:
+            self.cache_source = self.base_url
+        self.refreshing = set()
+        self.refresh_lock = threading.Lock()
+        self.refresher = ThreadPoolExecutor(max_workers=2) if cache else None
+        
+        # Concurrent lookups of a city share one request, and all requests share one limiter
+        self.flights = SingleFlight()
+        self.limiter = RateLimiter(rate)
+        self.retries = max(0, retries)
     
     def kelvin_to_celsius(self, kelvin):
         """Convert temperature from Kelvin to Celsius."""
         return round(kelvin - 273.15, 1)
     
-    def fetch_weather(self, city):
+    def parse_weather(self, data):
         """
-        Fetch weather data for a given city.
+        Turn an API response into the app's weather format.
+        
+        Args:
+            data (dict): Decoded JSON response for one city
+            
+        Returns:
+            dict: Processed weather data
+            
+        Raises:
+            KeyError: If the response is missing a field
+        """
+        return {
+            "city": data["name"],
+            "country": data["sys"]["country"],
+            "temperature": self.kelvin_to_celsius(data["main"]["temp"]),
+            "condition": data["weather"][0]["description"],
+            "humidity": data["main"]["humidity"],
+            "wind_speed": data["wind"]["speed"],
+            "timestamp": datetime.fromtimestamp(data["dt"]).strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    def get_weather(self, city):
+        """
+        Get weather data for a given city from the cache or the API, raising on failure.
+        
+        A fresh cached entry is returned right away. A stale one is returned too, while
+        a fresh copy is fetched in the background. Threads asking for the same city at
+        the same time share one request.
         
         Args:
             city (str): Name of the city to fetch weather for
             
         Returns:
-            dict: Processed weather data or None if an error occurred
+            dict: Processed weather data
+            
+        Raises:
+            WeatherError: If the request failed or the response was unusable
+        """
+        weather = self.cached_weather(city)
+        if weather is not None:
+            return weather
+        
+        key = cache_key(city, self.cache_source)
+        
+        def fetch():
+            weather, observed = self.request_weather(city)
+            if self.cache:
+                self.cache.put(key, weather, observed)
+            return weather
+        
+        return dict(self.flights.do(key, fetch))
+    
+    def cached_weather(self, city):
+        """
+        Look a city up in the cache, refreshing it in the background if it's stale.
+        
+        Args:
+            city (str): Name of the city
+            
+        Returns:
+            dict: Processed weather data, or None if it isn't cached (or there's no cache)
+        """
+        if not self.cache:
+            return None
+        key = cache_key(city, self.cache_source)
+        weather, state = self.cache.get(key)
+        if state == "stale":
+            self.refresh(city, key)
+        return weather
+    
+    def refresh(self, city, key):
+        """Fetch a city again in the background, unless that's already happening."""
+        with self.refresh_lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        
+        def update():
+            try:
+                weather, observed = self.request_weather(city)
+                self.cache.put(key, weather, observed)
+            except WeatherError:
+                pass  # Keep serving the stale entry; the next lookup tries again
+            finally:
+                with self.refresh_lock:
+                    self.refreshing.discard(key)
+        
+        self.refresher.submit(update)
+    
+    def request_weather(self, city):
+        """
+        Fetch weather data for a given city from the API, raising on failure.
+        
+        Args:
+            city (str): Name of the city to fetch weather for
+            
+        Returns:
+            tuple: (processed weather data, Unix time it was observed)
+            
+        Raises:
+            WeatherError: If the request failed or the response was unusable
         """
         params = {
             "q": city,
             "appid": self.api_key
         }
+        data = self.request_json(self.base_url, params,
+                                 f"City '{city}' not found. Please check the spelling.")
+        try:
+            return self.parse_weather(data), data["dt"]
+        except (KeyError, IndexError, TypeError):
+            raise WeatherError("Unexpected response format from the API.")
+    
+    def request_group(self, city_ids):
+        """
+        Fetch weather data for up to GROUP_LIMIT cities in one request, by city ID.
         
+        Args:
+            city_ids (list): OpenWeatherMap city IDs
+            
+        Returns:
+            dict: City ID -> (processed weather data, Unix time it was observed); IDs the
+                API didn't return are missing
+            
+        Raises:
+            WeatherError: If the request failed or the response was unusable
+        """
+        params = {
+            "id": ",".join(str(city_id) for city_id in city_ids),
+            "appid": self.api_key
+        }
+        data = self.request_json(self.group_url, params, "Cities not found.")
         try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()  # Raise an exception for HTTP errors
+            return {item["id"]: (self.parse_weather(item), item["dt"]) for item in data["list"]}
+        except (KeyError, IndexError, TypeError):
+            raise WeatherError("Unexpected response format from the API.")
+    
+    def request_json(self, url, params, not_found):
+        """
+        Send a GET request and decode its JSON body, raising on failure.
+        
+        The request waits for the rate limiter first. A 429, a 5xx or a network error is
+        retried up to `retries` times: after a 429 the limiter pauses every thread for the
+        Retry-After time, and other failures wait a random, growing delay.
+        
+        Args:
+            url (str): Endpoint to call
+            params (dict): Query parameters
+            not_found (str): Error message for a 404
             
-            data = response.json()
+        Returns:
+            dict: Decoded response
             
-            # Process the data into a more usable format
-            weather_info = {
-                "city": data["name"],
-                "country": data["sys"]["country"],
-                "temperature": self.kelvin_to_celsius(data["main"]["temp"]),
-                "condition": data["weather"][0]["description"],
-                "humidity": data["main"]["humidity"],
-                "wind_speed": data["wind"]["speed"],
-                "timestamp": datetime.fromtimestamp(data["dt"]).strftime("%Y-%m-%d %H:%M:%S")
-            }
+        Raises:
+            WeatherError: If the request failed or the body wasn't JSON
+        """
+        try:
+            for attempt in range(self.retries + 1):
+                self.limiter.acquire()
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt == self.retries:
+                        raise
+                    time.sleep(backoff(attempt))
+                    continue
+                
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self.limiter.throttled(retry_after if retry_after is not None
+                                           else backoff(attempt))
+                elif response.status_code >= 500:
+                    if attempt < self.retries:
+                        time.sleep(backoff(attempt))
+                else:
+                    self.limiter.succeeded()
+                    break
             
-            return weather_info
+            response.raise_for_status()  # Raise an exception for HTTP errors
+            return response.json()
             
         except requests.exceptions.HTTPError as http_err:
             if response.status_code == 404:
-                print(f"City '{city}' not found. Please check the spelling.")
-            else:
-                print(f"HTTP error occurred: {http_err}")
+                raise WeatherError(not_found)
+            if response.status_code == 429:
+                raise WeatherError("Too many requests; the API's rate limit was reached.")
+            raise WeatherError(f"HTTP error occurred: {http_err}")
         except requests.exceptions.ConnectionError:
-            print("Connection error. Please check your internet connection.")
+            raise WeatherError("Connection error. Please check your internet connection.")
         except requests.exceptions.Timeout:
-            print("Request timed out. Please try again later.")
+            raise WeatherError("Request timed out. Please try again later.")
         except requests.exceptions.RequestException as err:
-            print(f"An error occurred: {err}")
-        except KeyError:
-            print("Unexpected response format from the API.")
+            raise WeatherError(f"An error occurred: {err}")
+        except ValueError:
+            raise WeatherError("Unexpected response format from the API.")
+    
+    def fetch_weather(self, city):
+        """
+        Fetch weather data for a given city.
         
-        return None
+        Args:
+            city (str): Name of the city to fetch weather for
+            
+        Returns:
+            dict: Processed weather data or None if an error occurred
+        """
+        try:
+            return self.get_weather(city)
+        except WeatherError as err:
+            print(err)
+            return None
+    
+    def fetch_many(self, cities, max_workers=None):
+        """
+        Fetch weather data for many cities concurrently.
+        
+        Requests share the app's keep-alive session, with at most `max_workers` in flight.
+        With a city index, names that match exactly one city are fetched by ID through the
+        group endpoint, GROUP_LIMIT cities per request; unknown and ambiguous names (e.g.
+        "Springfield" without a country) are still sent one by one as typed. A name given
+        more than once is fetched once.
+        
+        Args:
+            cities (list): City names
+            max_workers (int, optional): Concurrency limit (default: the app's max_workers)
+            
+        Returns:
+            list: One dict per city, in input order, with "query" (the city as given),
+                "weather" (processed data or None) and "error" (message or None)
+        """
+        results = [{"query": city, "weather": None, "error": None} for city in cities]
+        singles = {}  # Normalized name -> positions fetched by name
+        by_id = {}    # City ID -> positions waiting for it
+        for position, city in enumerate(cities):
+            city_id = self.cities.resolve_id(city) if self.cities else None
+            if city_id is None:
+                singles.setdefault(cache_key(city), []).append(position)
+                continue
+            weather = self.cached_weather(city)
+            if weather is not None:
+                results[position]["weather"] = weather
+            else:
+                by_id.setdefault(city_id, []).append(position)
+        
+        def fetch_one(positions):
+            try:
+                weather, error = self.get_weather(cities[positions[0]]), None
+            except WeatherError as err:
+                weather, error = None, str(err)
+            for position in positions:
+                results[position]["weather"] = weather and dict(weather)
+                results[position]["error"] = error
+        
+        def fetch_group(city_ids):
+            try:
+                found = self.request_group(city_ids)
+            except WeatherError as err:
+                found, error = {}, str(err)
+            else:
+                error = None
+            for city_id in city_ids:
+                for position in by_id[city_id]:
+                    city = cities[position]
+                    if city_id not in found:
+                        results[position]["error"] = error or (
+                            f"City '{city}' not found. Please check the spelling.")
+                        continue
+                    weather, observed = found[city_id]
+                    results[position]["weather"] = weather
+                    if self.cache:
+                        self.cache.put(cache_key(city, self.cache_source), weather, observed)
+        
+        ids = list(by_id)
+        tasks = [(fetch_group, ids[start:start + GROUP_LIMIT])
+                 for start in range(0, len(ids), GROUP_LIMIT)]
+        tasks += [(fetch_one, positions) for positions in singles.values()]
+        
+        workers = min(max_workers or self.max_workers, self.max_workers, len(tasks)) or 1
+        if workers == 1:
+            for task, argument in tasks:
+                task(argument)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda task: task[0](task[1]), tasks))
+        return results
     
     def display_weather(self, weather_data):
         """
@@ -93,6 +396,16 @@ class WeatherApp:
         print(f"Wind Speed: {weather_data['wind_speed']} m/s")
         print(f"Last Updated: {weather_data['timestamp']}")
     
+    def close(self):
+        """Finish background refreshes and release the session and cache."""
+        if self.refresher:
+            self.refresher.shutdown(wait=True)
+        if self.cache:
+            self.cache.close()
+        if self.cities:
+            self.cities.close()
+        self.session.close()
+    
     def save_to_json(self, all_weather_data, filename="weather_data.json"):
         """
         Save weather data to a JSON file.
@@ -106,9 +419,106 @@ class WeatherApp:
         print(f"\nWeather data saved to {filename}")
 
 
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Fetch current weather from OpenWeatherMap")
+    parser.add_argument("cities", nargs="*",
+                        help="Cities to fetch right away (no prompt); without any, the app asks")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Requests in flight at once (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--base-url",
+                        help="Weather endpoint, e.g. a local stub server (default: "
+                             "OPENWEATHER_BASE_URL or OpenWeatherMap)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Save the results of a batch to this JSON file")
+    parser.add_argument("--input", metavar="FILE",
+                        help="Stream cities from this file, one per line ('-' for stdin), "
+                             "writing NDJSON as results arrive")
+    parser.add_argument("--ndjson", metavar="FILE", default="-",
+                        help="Where --input writes its results (default: stdout)")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="Progress file for resuming --input runs (default: the "
+                             "--ndjson file + .checkpoint)")
+    parser.add_argument("--cache-file", default=CACHE_FILE,
+                        help=f"Cache file that survives restarts (default: {CACHE_FILE})")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL,
+                        help=f"Seconds after observation that weather is reused (default: {CACHE_TTL})")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the API")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print cache and rate limit statistics at the end")
+    parser.add_argument("--rate", type=float, metavar="PER_MINUTE",
+                        help="Requests per minute your plan allows (free: 60); without it, the "
+                             "app finds the limit from the API's 429 responses")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES,
+                        help=f"Retries after a 429, 5xx or network error (default: {MAX_RETRIES})")
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument("--record", metavar="FILE",
+                        help="Save every API response to this fixture file")
+    replay.add_argument("--replay", metavar="FILE",
+                        help="Answer from a fixture file instead of the API (no network)")
+    parser.add_argument("--city-index", default=CITY_INDEX,
+                        help=f"City index from weather_cities.py, used if it exists (default: {CITY_INDEX})")
+    return parser.parse_args()
+
+
+def show_results(weather_app, results):
+    """Display each city's weather, or its error, and return the successful results."""
+    all_weather_data = []
+    for result in results:
+        if result["weather"]:
+            weather_app.display_weather(result["weather"])
+            all_weather_data.append(result["weather"])
+        else:
+            print(result["error"])
+    return all_weather_data
+
+
 def main():
     """Main function to run the weather app."""
-    weather_app = WeatherApp()
+    args = parse_args()
+    cache = None if args.no_cache else WeatherCache(args.cache_file, ttl=args.cache_ttl)
+    cities = CityIndex(args.city_index) if os.path.exists(args.city_index) else None
+    rate = args.rate / 60 if args.rate else None
+    fixtures = FixtureStore(args.record or args.replay) if args.record or args.replay else None
+    transport = None
+    if args.record:
+        transport = RecordingAdapter(fixtures, pool_connections=1, pool_maxsize=args.workers)
+    elif args.replay:
+        transport = ReplayAdapter(fixtures)
+    weather_app = WeatherApp(base_url=args.base_url, max_workers=args.workers, cache=cache,
+                             cities=cities, rate=rate, retries=args.retries, transport=transport)
+    
+    try:
+        run(weather_app, args)
+    finally:
+        weather_app.close()
+        if fixtures:
+            fixtures.close()
+        if args.stats:
+            # On stderr, so streamed NDJSON on stdout stays clean
+            if cache:
+                print(f"\n{cache.summary()}", file=sys.stderr)
+            print(weather_app.limiter.summary(), file=sys.stderr)
+            print(f"coalesced: {weather_app.flights.stats['coalesced']} lookups shared "
+                  f"another's request", file=sys.stderr)
+
+
+def run(weather_app, args):
+    """Run a batch, or the interactive prompt if no cities were given."""
+    # Streaming mode: cities from a file or stdin, NDJSON out, resumable
+    if args.input:
+        run_stream(weather_app, args)
+        return
+    
+    # Batch mode: cities on the command line, no prompts
+    if args.cities:
+        cities = [city.strip() for arg in args.cities for city in arg.split(',') if city.strip()]
+        all_weather_data = show_results(weather_app, weather_app.fetch_many(cities))
+        if args.output and all_weather_data:
+            weather_app.save_to_json(all_weather_data, args.output)
+        if len(all_weather_data) != len(cities):
+            raise SystemExit(1)
+        return
     
     print("Welcome to the Weather App!")
     print("Enter city names (separate multiple cities with commas, or type 'exit' to quit):")
@@ -121,13 +531,9 @@ def main():
             break
             
         cities = [city.strip() for city in user_input.split(',')]
-        all_weather_data = []
         
-        for city in cities:
-            weather_data = weather_app.fetch_weather(city)
-            if weather_data:
-                weather_app.display_weather(weather_data)
-                all_weather_data.append(weather_data)
+        # Multiple cities are fetched concurrently
+        all_weather_data = show_results(weather_app, weather_app.fetch_many(cities))
         
         # If we have data and more than one city, offer to save to JSON
         if all_weather_data and len(cities) > 1:
@@ -136,5 +542,23 @@ def main():
                 weather_app.save_to_json(all_weather_data)
 
 
+def run_stream(weather_app, args):
+    """Run a streaming batch, reporting progress on stderr so stdout stays NDJSON."""
+    try:
+        stats = stream_weather(weather_app, args.input, args.ndjson, args.checkpoint)
+    except ValueError as err:
+        print(f"Error: {err}", file=sys.stderr)
+        raise SystemExit(2)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.", file=sys.stderr)
+        raise SystemExit(130)
+    
+    resumed = f", resumed after line {stats['resumed']}" if stats["resumed"] else ""
+    print(f"Fetched {stats['cities']} cities ({stats['failed']} failed) in "
+          f"{stats['seconds']:.1f}s{resumed}", file=sys.stderr)
+    if stats["failed"]:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
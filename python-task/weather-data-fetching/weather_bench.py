@@ -0,0 +1,204 @@
+"""
+Offline benchmark for the Weather App.
+
+Replays recorded responses (see weather_replay.py) with simulated latency
+and errors, and reports throughput and p50/p95/p99 latency for three ways
+of fetching:
+
+- sequential: one city after another
+- concurrent: --workers cities at a time over the shared session
+- cached: every city already in the memory cache
+
+    python weather_bench.py --fixtures fixtures.db --count 500 --latency 50 --jitter 20
+    python weather_bench.py --synthetic 1000 --error 503:0.02 --error timeout:0.001
+
+Nothing leaves the machine: --synthetic fills the fixture file with made-up
+weather (the stub server's), so the benchmark runs without ever having
+recorded anything.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import importlib.util
+from itertools import cycle, islice
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_server import WEATHER_PATH, fake_weather
+from weather_cache import WeatherCache
+from weather_replay import FixtureStore, ReplayAdapter, fixture_key, parse_errors
+
+MODES = ("sequential", "concurrent", "cached")
+PERCENTILES = (50, 95, 99)
+FIXTURE_FILE = "fixtures.db"
+
+
+def load_weather_app():
+    """Import weather-app.py (its name isn't a valid module name)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather-app.py")
+    spec = importlib.util.spec_from_file_location("weather_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def add_synthetic(store, count):
+    """
+    Fill a fixture store with made-up weather for "Town 1" ... "Town <count>".
+
+    Args:
+        store (FixtureStore): Store to fill
+        count (int): Number of cities
+    """
+    for number in range(1, count + 1):
+        city = f"Town {number}"
+        body = json.dumps(fake_weather(city)).encode("utf-8")
+        store.put(fixture_key(f"{WEATHER_PATH}?q={city}"), 200,
+                  {"Content-Type": "application/json; charset=utf-8"}, body)
+
+
+def recorded_cities(store):
+    """Cities with a successful recorded response, in a stable order."""
+    cities = []
+    for key, (status, _, _) in store.responses.items():
+        query = parse_qs(urlsplit(key).query)
+        if status == 200 and "q" in query:
+            cities.append(query["q"][0])
+    return sorted(cities)
+
+
+def percentile(ordered, share):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(share / 100 * len(ordered)) - 1)]
+
+
+def run_mode(weather_app, mode, cities, workers, weather_error):
+    """
+    Fetch every city once in the given mode and time each call.
+
+    Args:
+        weather_app (WeatherApp): App to benchmark
+        mode (str): "sequential", "concurrent" or "cached"
+        cities (list): Cities to fetch
+        workers (int): Threads for the concurrent mode
+        weather_error (type): The app's WeatherError, counted as a failed call
+
+    Returns:
+        dict: "mode", "calls", "errors", "seconds", "per_second" and "p50"/"p95"/"p99"
+            latencies in milliseconds
+    """
+    if mode == "cached":
+        # Warm the cache first; only the lookups afterwards are timed
+        weather_app.fetch_many(cities)
+
+    def timed(city):
+        started = time.perf_counter()
+        try:
+            weather_app.get_weather(city)
+            failed = False
+        except weather_error:
+            failed = True
+        return time.perf_counter() - started, failed
+
+    started = time.perf_counter()
+    if mode == "concurrent":
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            calls = list(executor.map(timed, cities))
+    else:
+        calls = [timed(city) for city in cities]
+    seconds = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in calls)
+    result = {"mode": mode, "calls": len(calls), "errors": sum(failed for _, failed in calls),
+              "seconds": round(seconds, 3), "per_second": round(len(calls) / seconds, 1)}
+    for share in PERCENTILES:
+        result[f"p{share}"] = round(percentile(latencies, share), 3)
+    return result
+
+
+def print_report(results, settings):
+    """Print the results as a table."""
+    print(settings)
+    print(f"{'mode':<12}{'calls':>7}{'errors':>8}{'seconds':>10}{'calls/s':>10}"
+          + "".join(f"{f'p{share} ms':>10}" for share in PERCENTILES))
+    for result in results:
+        print(f"{result['mode']:<12}{result['calls']:>7}{result['errors']:>8}"
+              f"{result['seconds']:>10.2f}{result['per_second']:>10.1f}"
+              + "".join(f"{result[f'p{share}']:>10.3f}" for share in PERCENTILES))
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Offline Weather App benchmark")
+    parser.add_argument("--fixtures", default=FIXTURE_FILE,
+                        help=f"Fixture file from 'weather-app.py --record' (default: {FIXTURE_FILE})")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="Add made-up weather for N cities to the fixture file first")
+    parser.add_argument("--count", type=int, default=500,
+                        help="Calls per mode, cycling through the recorded cities (default: 500)")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"Comma-separated modes to run (default: {','.join(MODES)})")
+    parser.add_argument("--workers", type=int, default=8, help="Threads in concurrent mode (default: 8)")
+    parser.add_argument("--latency", type=float, default=50.0,
+                        help="Milliseconds every replayed request takes (default: 50)")
+    parser.add_argument("--jitter", type=float, default=20.0,
+                        help="Extra random milliseconds per request, up to this much (default: 20)")
+    parser.add_argument("--error", action="append", metavar="KIND:RATE",
+                        help="Inject errors, e.g. 503:0.02 or timeout:0.001 (repeatable)")
+    parser.add_argument("--timeout", type=float, default=2.0,
+                        help="Request timeout in seconds, i.e. what an injected timeout costs")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for latency and errors (default: 1)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    try:
+        errors = parse_errors(args.error)
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown mode {', '.join(sorted(unknown))}")
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    store = FixtureStore(args.fixtures)
+    if args.synthetic:
+        add_synthetic(store, args.synthetic)
+    cities = recorded_cities(store)
+    if not cities:
+        print(f"Error: no recorded cities in {args.fixtures}; record some with "
+              f"'weather-app.py --record' or use --synthetic")
+        sys.exit(1)
+    cities = list(islice(cycle(cities), args.count))
+
+    # Replayed requests never reach the API, so any key will do
+    os.environ.setdefault("OPENWEATHER_API_KEY", "replay")
+    weather_module = load_weather_app()
+
+    results = []
+    for mode in modes:
+        transport = ReplayAdapter(store, args.latency / 1000, args.jitter / 1000, errors, args.seed)
+        cache = WeatherCache() if mode == "cached" else None
+        weather_app = weather_module.WeatherApp(max_workers=args.workers, timeout=args.timeout,
+                                                cache=cache, transport=transport)
+        try:
+            results.append(run_mode(weather_app, mode, cities, args.workers,
+                                    weather_module.WeatherError))
+        finally:
+            weather_app.close()
+    store.close()
+
+    settings = (f"{len(set(cities))} cities, {args.count} calls per mode, latency "
+                f"{args.latency:g}+{args.jitter:g} ms, errors {errors or 'none'}")
+    if args.json:
+        print(json.dumps({"settings": settings, "results": results}, indent=2))
+    else:
+        print_report(results, settings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Response cache for the Weather App.
+
+Two layers sit in front of the API:
+
+- an in-memory LRU (an OrderedDict) holding the most recently used cities
+- an SQLite file on disk that survives restarts; a memory miss looks there
+  before going to the network
+
+How long an entry stays fresh depends on when the weather was observed (the
+API's "dt"), not on when it was fetched: OpenWeatherMap refreshes a city
+about every 10 minutes, so a reading observed 8 minutes ago is only good for
+2 more. After that the entry is stale. For a while it is still served
+immediately while a fresh copy is fetched in the background
+(stale-while-revalidate); after that it counts as a miss.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Seconds after the observation time that a reading is fresh
+CACHE_TTL = 600
+# ... but always at least this long after it was fetched, so a city whose
+# station reports late isn't fetched over and over
+CACHE_MIN_TTL = 60
+# Seconds after going stale that a reading is still served while it's refreshed
+CACHE_STALE_TTL = 3600
+CACHE_ENTRIES = 1024
+CACHE_FILE = "weather_cache.db"
+
+
+def cache_key(city, source=""):
+    """
+    Normalize a city query so "london", " London " and "LONDON" share an entry.
+
+    The key also names where the weather came from, so made-up weather from
+    the stub server or a replay is never served to a run against the real API.
+
+    Args:
+        city (str): City as typed
+        source (str, optional): Where the weather is fetched from, e.g. the API URL
+
+    Returns:
+        str: Cache key
+    """
+    key = " ".join(city.split()).casefold()
+    return f"{source}|{key}" if source else key
+
+
+class WeatherCache:
+    """TTL + LRU cache of processed weather, in memory and optionally on disk."""
+
+    def __init__(self, path=None, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL,
+                 min_ttl=CACHE_MIN_TTL, stale_ttl=CACHE_STALE_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str, optional): SQLite file for the persistent layer; None
+                keeps everything in memory only
+            max_entries (int): Cities kept in memory before the least
+                recently used is dropped (it stays on disk)
+            ttl (float): Seconds after the observation that an entry is fresh
+            min_ttl (float): Shortest time after fetching that an entry is fresh
+            stale_ttl (float): Seconds past freshness that an entry is still
+                served while it's refreshed
+        """
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.min_ttl = min_ttl
+        self.stale_ttl = stale_ttl
+        # key -> (value, fresh until, usable until)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0,
+                      "stores": 0, "evictions": 0}
+        self.db = None
+        if path:
+            # One connection shared by all threads, guarded by self.lock
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            # WAL without a sync on every commit keeps a store well under a millisecond
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS weather (key TEXT PRIMARY KEY, "
+                            "value TEXT NOT NULL, fresh_until REAL NOT NULL, "
+                            "usable_until REAL NOT NULL)")
+            self.db.commit()
+            self.purge()
+
+    def get(self, key, now=None):
+        """
+        Look up a city.
+
+        Args:
+            key (str): Key from cache_key()
+            now (float, optional): Current Unix time
+
+        Returns:
+            tuple: (value, "fresh"), (value, "stale") or (None, None) on a miss
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            elif self.db is not None:
+                row = self.db.execute("SELECT value, fresh_until, usable_until FROM weather "
+                                      "WHERE key = ?", (key,)).fetchone()
+                if row and row[2] > now:
+                    entry = (json.loads(row[0]), row[1], row[2])
+                    self._remember(key, entry)
+                    self.stats["disk_hits"] += 1
+
+            if entry is None or entry[2] <= now:
+                self.stats["misses"] += 1
+                return None, None
+            if entry[1] > now:
+                self.stats["hits"] += 1
+                return dict(entry[0]), "fresh"
+            self.stats["stale_hits"] += 1
+            return dict(entry[0]), "stale"
+
+    def put(self, key, value, observed, now=None):
+        """
+        Store a city's weather.
+
+        Args:
+            key (str): Key from cache_key()
+            value (dict): Processed weather data (must be JSON-serializable)
+            observed (float): Unix time the weather was observed (the API's "dt")
+            now (float, optional): Current Unix time
+        """
+        now = time.time() if now is None else now
+        fresh_until = max(observed + self.ttl, now + self.min_ttl)
+        entry = (dict(value), fresh_until, fresh_until + self.stale_ttl)
+        with self.lock:
+            self._remember(key, entry)
+            self.stats["stores"] += 1
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO weather VALUES (?, ?, ?, ?)",
+                                (key, json.dumps(value), entry[1], entry[2]))
+                self.db.commit()
+
+    def _remember(self, key, entry):
+        """Put an entry in the memory layer, dropping the least recently used."""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def purge(self, now=None):
+        """
+        Delete entries too old to be served, from memory and disk.
+
+        Returns:
+            int: Entries deleted from disk
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry[2] <= now]:
+                del self.entries[key]
+            if self.db is None:
+                return 0
+            deleted = self.db.execute("DELETE FROM weather WHERE usable_until <= ?", (now,)).rowcount
+            self.db.commit()
+            return deleted
+
+    def summary(self):
+        """
+        One-line description of the statistics.
+
+        Returns:
+            str: e.g. "cache: 12 hits (3 from disk), 1 stale, 4 misses (76% hit rate)"
+        """
+        stats = self.stats
+        served = stats["hits"] + stats["stale_hits"]
+        lookups = served + stats["misses"]
+        rate = f" ({served / lookups:.0%} hit rate)" if lookups else ""
+        return (f"cache: {stats['hits']} hits ({stats['disk_hits']} from disk), "
+                f"{stats['stale_hits']} stale, {stats['misses']} misses{rate}")
+
+    def close(self):
+        """Close the disk layer."""
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
@@ -0,0 +1,284 @@
+"""
+Offline city resolver for the Weather App.
+
+OpenWeatherMap publishes every city it knows, with its ID, as a bulk file
+(http://bulk.openweathermap.org/sample/city.list.json.gz, about 200,000
+cities). This module turns that file into a compact index once:
+
+    python weather_cities.py build city.list.json.gz
+
+and then looks names up in it without any API calls:
+
+    python weather_cities.py lookup "london,gb"
+    python weather_cities.py lookup "sao pa" --prefix
+
+The index is one file: a sorted table of lines "key<TAB>country<TAB>state<TAB>
+id<TAB>name" plus an array of their offsets. It is opened with mmap, so
+nothing is parsed at startup and only the pages a lookup touches are read.
+A lookup is a binary search over the offsets, about 20 probes for 200,000
+cities, and a country in the query ("London,GB") is part of the search key.
+Keys are normalized names (accents, case and punctuation removed), so
+"São Paulo", "sao paulo" and "SAO-PAULO" all find the same city.
+
+With names resolved to IDs, WeatherApp.fetch_many() can ask for up to
+GROUP_LIMIT cities per request through the API's group endpoint.
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import mmap
+import array
+import struct
+import argparse
+import unicodedata
+from collections import namedtuple
+
+INDEX_MAGIC = b"WXCITY01"
+# magic, number of cities, offset of the line table
+INDEX_HEADER = struct.Struct("<8sQQ")
+CITY_INDEX = "city.list.idx"
+
+# Most city IDs the group endpoint accepts per request
+GROUP_LIMIT = 20
+
+City = namedtuple("City", ["id", "name", "state", "country"])
+
+NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+
+def normalize_name(name):
+    """
+    Reduce a city name to its lookup key.
+
+    Args:
+        name (str): City name in any case, with or without accents
+
+    Returns:
+        str: Lowercase ASCII-folded name with single spaces, e.g. "sao paulo"
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(NON_ALPHANUMERIC.sub(" ", stripped.casefold()).split())
+
+
+def split_query(query):
+    """
+    Split an API-style query such as "London,GB" or "Springfield,IL,US".
+
+    Args:
+        query (str): City, optionally followed by ",state" and/or ",country"
+
+    Returns:
+        tuple: (normalized name, state or None, country code or None)
+    """
+    parts = [part.strip() for part in query.split(",")]
+    country = state = None
+    if len(parts) > 1 and len(parts[-1]) == 2 and parts[-1].isalpha():
+        country = parts.pop().upper()
+    if len(parts) > 1:
+        state = parts.pop().upper()
+    return normalize_name(",".join(parts)), state, country
+
+
+def read_city_list(path):
+    """
+    Read OpenWeatherMap's bulk city list (.json or .json.gz).
+
+    Args:
+        path (str): Path of city.list.json or city.list.json.gz
+
+    Returns:
+        list: Dicts with at least "id", "name" and "country"
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_index(cities, index_path=CITY_INDEX):
+    """
+    Write the lookup index for a list of cities.
+
+    Args:
+        cities (list): Dicts with "id", "name", "country" and optionally "state"
+        index_path (str): Where to write the index
+
+    Returns:
+        int: Number of cities indexed
+    """
+    rows = []
+    for city in cities:
+        key = normalize_name(city["name"])
+        if not key:
+            continue
+        fields = [key, city.get("country") or "", city.get("state") or "", str(city["id"]),
+                  city["name"]]
+        rows.append("\t".join(field.replace("\t", " ").replace("\n", " ") for field in fields))
+    rows.sort(key=lambda row: row.encode("utf-8"))
+
+    data = "".join(row + "\n" for row in rows).encode("utf-8")
+    offsets = array.array("I")
+    position = 0
+    for row in rows:
+        offsets.append(position)
+        position += len(row.encode("utf-8")) + 1
+
+    # Written under a temporary name so a running app never sees half an index
+    temporary = index_path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(rows), INDEX_HEADER.size + len(data)))
+        f.write(data)
+        f.write(offsets.tobytes())
+    os.replace(temporary, index_path)
+    return len(rows)
+
+
+class CityIndex:
+    """Memory-mapped, sorted index of city names."""
+
+    def __init__(self, index_path=CITY_INDEX):
+        """
+        Open an index written by build_index().
+
+        Args:
+            index_path (str): Path of the index
+
+        Raises:
+            ValueError: If the file isn't a city index
+        """
+        self.path = index_path
+        self.file = open(index_path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.map[:INDEX_HEADER.size].ljust(INDEX_HEADER.size, b"\0")
+        magic, self.count, table = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC or table + 4 * self.count != len(self.map):
+            self.close()
+            raise ValueError(f"{index_path} is not a city index (rebuild it with "
+                             f"'python weather_cities.py build')")
+        self.data_start = INDEX_HEADER.size
+        # Zero-copy view of the offsets (native byte order, as written by array)
+        self.offsets = memoryview(self.map)[table:table + 4 * self.count].cast("I")
+
+    def _starts(self, position, size):
+        """First `size` bytes of the line at a table position."""
+        start = self.data_start + self.offsets[position]
+        return self.map[start:start + size]
+
+    def _record(self, position):
+        """Parse the line at a table position."""
+        start = self.data_start + self.offsets[position]
+        line = self.map[start:self.map.find(b"\n", start)].decode("utf-8")
+        _, country, state, city_id, name = line.split("\t")
+        return City(int(city_id), name, state, country)
+
+    def _matches(self, prefix, limit):
+        """Records of the lines starting with `prefix`, found by binary search."""
+        size = len(prefix)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._starts(middle, size) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        matches = []
+        while low < self.count and len(matches) < limit and self._starts(low, size) == prefix:
+            matches.append(self._record(low))
+            low += 1
+        return matches
+
+    def lookup(self, query, limit=100):
+        """
+        Find the cities matching a name exactly (after normalizing).
+
+        Args:
+            query (str): City name, optionally with ",country" or
+                ",state,country" like the API's q parameter
+            limit (int): Most results returned
+
+        Returns:
+            list: City records, possibly several for common names
+        """
+        name, state, country = split_query(query)
+        if not name:
+            return []
+        prefix = name + "\t"
+        if country:
+            prefix += country + "\t"
+            if state:
+                prefix += state + "\t"
+        return self._matches(prefix.encode("utf-8"), limit)
+
+    def prefix(self, text, limit=10):
+        """
+        Find cities whose normalized name starts with `text`.
+
+        Args:
+            text (str): Beginning of a city name
+            limit (int): Most results returned
+
+        Returns:
+            list: City records in name order
+        """
+        key = normalize_name(text)
+        return self._matches(key.encode("utf-8"), limit) if key else []
+
+    def resolve_id(self, query):
+        """
+        City ID for a query, if it names exactly one city.
+
+        Args:
+            query (str): City name as typed, e.g. "Paris" or "Paris,US"
+
+        Returns:
+            int: The city's ID, or None if it's unknown or ambiguous
+        """
+        matches = self.lookup(query, limit=2)
+        return matches[0].id if len(matches) == 1 else None
+
+    def close(self):
+        """Unmap and close the index."""
+        if getattr(self, "offsets", None) is not None:
+            self.offsets.release()
+            self.offsets = None
+        self.map.close()
+        self.file.close()
+
+
+def main():
+    """Build the index or look cities up from the command line."""
+    parser = argparse.ArgumentParser(description="Offline OpenWeatherMap city resolver")
+    parser.add_argument("--index", default=CITY_INDEX, help=f"Index file (default: {CITY_INDEX})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build the index from city.list.json(.gz)")
+    build.add_argument("source", help="OpenWeatherMap bulk city list")
+    lookup = commands.add_parser("lookup", help="Look a city up")
+    lookup.add_argument("query", help='City, e.g. "London" or "London,GB"')
+    lookup.add_argument("--prefix", action="store_true", help="Match the beginning of names")
+    lookup.add_argument("--limit", type=int, default=10, help="Most prefix matches shown")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count = build_index(read_city_list(args.source), args.index)
+        print(f"Indexed {count} cities in {args.index} ({os.path.getsize(args.index) // 1024} KB)")
+        return
+
+    try:
+        index = CityIndex(args.index)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    matches = index.prefix(args.query, args.limit) if args.prefix else index.lookup(args.query)
+    for city in matches:
+        region = ",".join(part for part in (city.state, city.country) if part)
+        print(f"{city.id}\t{city.name}, {region}")
+    if not matches:
+        print("No matching city")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Request coalescing and rate limiting for the Weather App.
+
+- SingleFlight lets concurrent lookups of the same city share one request:
+  the first caller does the work and the others wait for its result.
+- RateLimiter is a token bucket shared by all of the app's threads. It can
+  start at the account's quota (--rate) or with no limit, and it adapts to
+  the API: a 429 pauses every thread until Retry-After has passed and cuts
+  the rate, which then creeps back up with each success, but no higher than
+  just below the rate that was refused. Throughput settles just under the
+  quota instead of bouncing off it. After a quiet minute at that ceiling it
+  is lifted a little, so a quota that grew (or a 429 that was a blip) doesn't
+  hold the rate down for good.
+- backoff() gives the jittered delays between retries, so threads that
+  failed together don't all retry at the same moment.
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Future
+
+# Retries after a 429, a 5xx or a network error, and the delays between them
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+# Pause after a 429 that doesn't say how long to wait
+THROTTLE_PAUSE = 1.0
+
+# After a 429 the rate is cut to this fraction of what was refused ...
+RATE_DECREASE = 0.7
+# ... and later never raised past this fraction of it
+RATE_CEILING = 0.95
+# After this many seconds without a 429 at the ceiling, it's raised by CEILING_PROBE
+PROBE_AFTER = 60.0
+CEILING_PROBE = 1.1
+# Lowest rate the limiter falls to, in requests per second
+MIN_RATE = 0.1
+# Recent requests remembered to measure the rate when no limit was set
+RATE_SAMPLES = 64
+
+
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """
+    Delay before a retry, with "full jitter": random between 0 and an exponential cap.
+
+    Args:
+        attempt (int): Retries so far (0 for the first)
+        base (float): Cap for the first retry, in seconds
+        cap (float): Longest delay, in seconds
+
+    Returns:
+        float: Seconds to wait
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value, now=None):
+    """
+    Read a Retry-After header, given either in seconds or as an HTTP date.
+
+    Args:
+        value (str): Header value, or None
+        now (float, optional): Current Unix time
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or unreadable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        """Initialize with nothing in flight."""
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, function):
+        """
+        Call `function()`, unless a call for `key` is already running.
+
+        Args:
+            key (str): What the call is for, e.g. a normalized city name
+            function (callable): Work to do if nobody is doing it yet
+
+        Returns:
+            The result of the call for `key` (its exception is raised in every caller)
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Future()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return flight.result()
+
+        try:
+            flight.set_result(function())
+        except BaseException as err:
+            flight.set_exception(err)
+        finally:
+            with self.lock:
+                del self.flights[key]
+        return flight.result()
+
+
+class RateLimiter:
+    """Adaptive token bucket shared by every thread making requests."""
+
+    def __init__(self, rate=None, burst=1):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float, optional): Most requests per second (the account quota,
+                never exceeded); None sends as fast as possible until the API answers 429
+            burst (int): Requests that may go out back to back after a quiet spell
+        """
+        self.limit = rate
+        self.rate = rate
+        self.ceiling = rate
+        self.probe_at = 0.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.recent = deque(maxlen=RATE_SAMPLES)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "waited": 0.0}
+
+    def acquire(self):
+        """Wait until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0 and self.rate is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    wait = 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+                if wait <= 0:
+                    if self.rate is not None:
+                        self.tokens -= 1
+                    self.recent.append(now)
+                    self.stats["requests"] += 1
+                    return
+                self.stats["waited"] += wait
+            time.sleep(wait)
+
+    def throttled(self, retry_after=None):
+        """
+        Slow down after a 429.
+
+        Args:
+            retry_after (float, optional): Seconds the API asked us to wait
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.stats["throttled"] += 1
+            pause = THROTTLE_PAUSE if retry_after is None else retry_after
+            if now < self.paused_until:
+                # Other requests sent at the same rate were refused too; cut only once
+                self.paused_until = max(self.paused_until, now + pause)
+                return
+            self.paused_until = now + pause
+            self.probe_at = self.paused_until + PROBE_AFTER
+            refused = self.rate if self.rate is not None else self.measured_rate()
+            if refused:
+                # The refused rate is the latest word on the quota, higher or lower than before
+                self.ceiling = max(MIN_RATE, refused * RATE_CEILING)
+                self.rate = max(MIN_RATE, refused * RATE_DECREASE)
+            # Otherwise (a 429 on the first requests) the rate is unknown: only pause
+            # Bursts could break the quota by themselves; from now on, space requests evenly
+            self.burst = 1
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+    def succeeded(self):
+        """Speed back up after a successful request (about one request per second, per second)."""
+        with self.lock:
+            if self.rate is None:
+                return
+            now = time.monotonic()
+            if self.rate >= self.ceiling and now >= self.probe_at:
+                # Quiet for a while at the ceiling: see whether the API allows more now
+                self.ceiling *= CEILING_PROBE
+                if self.limit is not None:
+                    self.ceiling = min(self.ceiling, self.limit)
+                self.probe_at = now + PROBE_AFTER
+            if self.rate < self.ceiling:
+                self.rate = min(self.ceiling, self.rate + 1 / self.rate)
+
+    def measured_rate(self):
+        """Requests per second over the last RATE_SAMPLES requests (None if unknown)."""
+        if len(self.recent) < 2 or self.recent[-1] <= self.recent[0]:
+            return None
+        return (len(self.recent) - 1) / (self.recent[-1] - self.recent[0])
+
+    def summary(self):
+        """
+        One-line description of the statistics.
+
+        Returns:
+            str: e.g. "rate limit: 240 requests, 2 throttled, 12.5s waited (all threads), now 3.8/s"
+        """
+        rate = "no limit" if self.rate is None else f"now {self.rate:.1f}/s"
+        return (f"rate limit: {self.stats['requests']} requests, {self.stats['throttled']} "
+                f"throttled, {self.stats['waited']:.1f}s waited (all threads), {rate}")
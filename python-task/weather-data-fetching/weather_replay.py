@@ -0,0 +1,246 @@
+"""
+Recorded API responses for the Weather App.
+
+WeatherApp sends every request through a requests transport adapter, so the
+network can be swapped out:
+
+- RecordingAdapter passes requests on to the API (or a stub server) and
+  saves each response in a FixtureStore.
+- ReplayAdapter answers from a FixtureStore without any network at all,
+  optionally adding latency and injecting errors (5xx, 429, timeouts,
+  dropped connections) at chosen rates.
+
+    python weather-app.py London Paris Tokyo --record fixtures.db
+    python weather-app.py London Paris Tokyo --replay fixtures.db
+
+The store is one SQLite file of zlib-compressed bodies, keyed by the request
+path and query without the API key, so fixtures can be shared safely and
+recordings from the real API replay against any base URL on the same path.
+"""
+
+import json
+import time
+import zlib
+import random
+import sqlite3
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Response headers worth keeping with a fixture
+RECORDED_HEADERS = ("Content-Type", "Retry-After")
+# Query parameters left out of fixture keys (never written to disk)
+SECRET_PARAMS = ("appid",)
+
+ERROR_KINDS = ("500", "502", "503", "429", "timeout", "reset")
+
+
+def fixture_key(url):
+    """
+    Key a request by its path and sorted query, without the API key.
+
+    Args:
+        url (str): Full request URL
+
+    Returns:
+        str: e.g. "/data/2.5/weather?q=London"
+    """
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query)
+                   if name not in SECRET_PARAMS)
+    return f"{parts.path}?{urlencode(query)}"
+
+
+def parse_errors(specs):
+    """
+    Parse error injection options such as "503:0.01" or "timeout:0.005".
+
+    Args:
+        specs (list): "kind:rate" strings; kinds are ERROR_KINDS
+
+    Returns:
+        dict: Kind -> fraction of requests
+
+    Raises:
+        ValueError: If a spec can't be parsed
+    """
+    errors = {}
+    for spec in specs or []:
+        kind, _, rate = spec.partition(":")
+        if kind not in ERROR_KINDS:
+            raise ValueError(f"Unknown error kind '{kind}' (use one of {', '.join(ERROR_KINDS)})")
+        try:
+            errors[kind] = float(rate)
+        except ValueError:
+            raise ValueError(f"'{spec}' should look like {kind}:0.01")
+    if sum(errors.values()) > 1:
+        raise ValueError("Error rates add up to more than 1")
+    return errors
+
+
+class FixtureStore:
+    """Recorded responses, in memory and in an SQLite file."""
+
+    def __init__(self, path):
+        """
+        Open (or create) a fixture file and load its responses.
+
+        Args:
+            path (str): SQLite file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                        "status INTEGER NOT NULL, headers TEXT NOT NULL, body BLOB NOT NULL)")
+        self.db.commit()
+        # key -> (status, headers, body); replay never touches the disk
+        self.responses = {
+            key: (status, json.loads(headers), zlib.decompress(body))
+            for key, status, headers, body in self.db.execute("SELECT * FROM responses")
+        }
+
+    def get(self, key):
+        """
+        Look a recorded response up.
+
+        Returns:
+            tuple: (status, headers dict, body bytes), or None if it wasn't recorded
+        """
+        return self.responses.get(key)
+
+    def put(self, key, status, headers, body):
+        """Record a response, replacing any earlier one for the same key."""
+        with self.lock:
+            self.responses[key] = (status, headers, body)
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                            (key, status, json.dumps(headers), zlib.compress(body, 9)))
+            self.db.commit()
+
+    def __len__(self):
+        return len(self.responses)
+
+    def close(self):
+        """Close the file."""
+        with self.lock:
+            self.db.close()
+
+
+def make_response(request, status, headers, body):
+    """Build a requests.Response as if it had come from the network."""
+    response = requests.Response()
+    response.status_code = status
+    try:
+        response.reason = HTTPStatus(status).phrase
+    except ValueError:
+        response.reason = ""
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class RecordingAdapter(BaseAdapter):
+    """Sends requests for real and records the responses."""
+
+    def __init__(self, store, **pool):
+        """
+        Initialize the adapter.
+
+        Args:
+            store (FixtureStore): Where responses are recorded
+            **pool: Passed on to the HTTPAdapter that does the sending
+        """
+        super().__init__()
+        self.store = store
+        self.adapter = HTTPAdapter(**pool)
+
+    def send(self, request, **kwargs):
+        response = self.adapter.send(request, **kwargs)
+        # Rate limits and server errors are passing trouble, not something to replay
+        if response.status_code != 429 and response.status_code < 500:
+            headers = {name: response.headers[name] for name in RECORDED_HEADERS
+                       if name in response.headers}
+            self.store.put(fixture_key(request.url), response.status_code, headers,
+                           response.content)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from recorded responses, with optional latency and errors."""
+
+    def __init__(self, store, latency=0.0, jitter=0.0, errors=None, seed=None):
+        """
+        Initialize the adapter.
+
+        Args:
+            store (FixtureStore): Recorded responses
+            latency (float): Seconds every request takes
+            jitter (float): Extra random seconds, up to this much, per request
+            errors (dict, optional): Error kind (see ERROR_KINDS) -> fraction of
+                requests that fail that way
+            seed (int, optional): Seed for the latency and error dice, for repeatable runs
+        """
+        super().__init__()
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = errors or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "missing": 0, "injected": 0}
+
+    def send(self, request, timeout=None, **kwargs):
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            roll = self.random.random()
+        error = None
+        for kind, rate in self.errors.items():
+            if roll < rate:
+                error = kind
+                break
+            roll -= rate
+
+        if error == "timeout":
+            # A timeout costs the whole timeout, like the real thing
+            limit = timeout[1] if isinstance(timeout, tuple) else timeout
+            time.sleep(limit or delay)
+            self.count("injected")
+            raise requests.exceptions.ReadTimeout("Injected timeout", request=request)
+        if delay:
+            time.sleep(delay)
+        if error == "reset":
+            self.count("injected")
+            raise requests.exceptions.ConnectionError("Injected connection reset", request=request)
+        if error:
+            self.count("injected")
+            headers = {"Content-Type": "application/json; charset=utf-8"}
+            if error == "429":
+                headers["Retry-After"] = "1"
+            body = json.dumps({"cod": int(error), "message": "Injected error"}).encode("utf-8")
+            return make_response(request, int(error), headers, body)
+
+        recorded = self.store.get(fixture_key(request.url))
+        if recorded is None:
+            self.count("missing")
+            body = json.dumps({"cod": "404", "message": "not recorded"}).encode("utf-8")
+            return make_response(request, 404, {"Content-Type": "application/json"}, body)
+        return make_response(request, *recorded)
+
+    def count(self, name):
+        """Add one to a statistic."""
+        with self.lock:
+            self.stats[name] += 1
+
+    def close(self):
+        pass
@@ -0,0 +1,208 @@
+"""
+Streaming batch runs for the Weather App.
+
+Reads cities one per line from a file or stdin and writes one NDJSON line
+per city as results come in:
+
+    python weather-app.py --input cities.txt --ndjson weather.ndjson
+
+Only a bounded window of cities is in flight at once. When the window is
+full, reading waits until the oldest result is written (backpressure), so
+memory stays the same for ten cities or ten million. Results are written in
+input order, which makes progress a single number: the input lines whose
+results are on disk. That number and the output size are saved to a
+checkpoint file every few seconds; a run that is interrupted or killed picks
+up from there, cutting off anything written after the last checkpoint so no
+city appears twice.
+"""
+
+import os
+import sys
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from weather_cities import GROUP_LIMIT
+
+# Seconds between checkpoint saves
+CHECKPOINT_INTERVAL = 2.0
+
+
+def read_cities(lines, skip=0):
+    """
+    Yield the cities in a stream of lines, skipping blanks and "#" comments.
+
+    Args:
+        lines (iterable): Lines of text, e.g. an open file
+        skip (int): Lines already done in an earlier run
+
+    Yields:
+        tuple: (line number, city)
+    """
+    for number, line in enumerate(lines, 1):
+        if number <= skip:
+            continue
+        city = line.strip()
+        if city and not city.startswith("#"):
+            yield number, city
+
+
+def chunked(items, size):
+    """Yield lists of up to `size` items without reading ahead any further."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Checkpoint:
+    """Progress of a streaming run, saved next to its output."""
+
+    def __init__(self, path, source):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            path (str): Checkpoint file
+            source (str): Name of the input, so a checkpoint isn't used for another one
+        """
+        self.path = path
+        self.source = source
+
+    def load(self):
+        """
+        Read the saved progress.
+
+        Returns:
+            tuple: (input lines done, bytes of output written), (0, 0) if there's none
+
+        Raises:
+            ValueError: If the checkpoint belongs to another input or is damaged
+        """
+        if not os.path.exists(self.path):
+            return 0, 0
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            lines, written = int(state["lines"]), int(state["output_bytes"])
+        except (OSError, ValueError, KeyError, TypeError):
+            raise ValueError(f"Checkpoint {self.path} is damaged; delete it to start over.")
+        if state.get("input") != self.source:
+            raise ValueError(f"Checkpoint {self.path} is for {state.get('input')}, not "
+                             f"{self.source}; delete it to start over.")
+        return lines, written
+
+    def save(self, lines, written):
+        """Save progress, replacing the old checkpoint in one step."""
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({"input": self.source, "lines": lines, "output_bytes": written}, f)
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        """Delete the checkpoint once the run is complete."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def stream_weather(weather_app, source="-", output="-", checkpoint_path=None, in_flight=None):
+    """
+    Fetch the weather for every city in `source`, writing NDJSON to `output`.
+
+    Each line is {"query": ..., "weather": ..., "error": ...}, as returned by
+    WeatherApp.fetch_many(). With a city index, cities go out in chunks of
+    GROUP_LIMIT, so most chunks cost a single request.
+
+    Args:
+        weather_app (WeatherApp): App used for fetching
+        source (str): Input file, one city per line, or "-" for stdin
+        output (str): NDJSON file, or "-" for stdout
+        checkpoint_path (str, optional): Checkpoint file (default: output +
+            ".checkpoint"); not used when writing to stdout
+        in_flight (int, optional): Most chunks fetched or waiting to be written at once
+            (default: twice the app's workers)
+
+    Returns:
+        dict: "cities" and "failed" counts for this run, "resumed" (input lines
+            skipped) and "seconds"
+
+    Raises:
+        ValueError: If an existing checkpoint can't be used
+    """
+    checkpoint = None
+    if output != "-":
+        checkpoint = Checkpoint(checkpoint_path or output + ".checkpoint", source)
+    done, written = checkpoint.load() if checkpoint else (0, 0)
+    if done and (not os.path.exists(output) or os.path.getsize(output) < written):
+        raise ValueError(f"{output} is shorter than its checkpoint says; delete "
+                         f"{checkpoint.path} to start over.")
+
+    if output == "-":
+        out = sys.stdout.buffer
+    else:
+        # Anything written after the last checkpoint is fetched again, so cut it off
+        out = open(output, "r+b" if done else "wb")
+        out.truncate(written)
+        out.seek(written)
+    lines = sys.stdin if source == "-" else open(source, encoding="utf-8")
+
+    chunk_size = GROUP_LIMIT if weather_app.cities else 1
+    in_flight = in_flight or 2 * weather_app.max_workers
+    stats = {"cities": 0, "failed": 0, "resumed": done, "seconds": 0.0}
+    started = last_saved = time.monotonic()
+    window = deque()
+
+    def fetch(chunk):
+        return chunk[-1][0], weather_app.fetch_many([city for _, city in chunk], max_workers=1)
+
+    def write_oldest():
+        nonlocal done, written, last_saved
+        last_line, results = window.popleft().result()
+        data = "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+        data = data.encode("utf-8")
+        out.write(data)
+        out.flush()
+        # Updated together, so a checkpoint never counts half a chunk
+        done, written = last_line, written + len(data)
+        stats["cities"] += len(results)
+        stats["failed"] += sum(result["error"] is not None for result in results)
+        if checkpoint and time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+            save()
+            last_saved = time.monotonic()
+
+    def save():
+        # The checkpoint must never get ahead of what's really on disk
+        os.fsync(out.fileno())
+        checkpoint.save(done, written)
+
+    executor = ThreadPoolExecutor(max_workers=weather_app.max_workers)
+    try:
+        for chunk in chunked(read_cities(lines, skip=done), chunk_size):
+            while len(window) >= in_flight:
+                write_oldest()
+            window.append(executor.submit(fetch, chunk))
+        while window:
+            write_oldest()
+    except BaseException:
+        for future in window:
+            future.cancel()
+        if checkpoint:
+            save()
+        raise
+    else:
+        if checkpoint:
+            checkpoint.remove()
+    finally:
+        executor.shutdown(wait=True)
+        if source != "-":
+            lines.close()
+        if output != "-":
+            out.close()
+
+    stats["seconds"] = time.monotonic() - started
+    return stats